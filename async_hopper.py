@@ -0,0 +1,216 @@
+"""
+Variante asynchrone (asyncio) du CoinPoker Hopper
+
+Plusieurs surveillances de tournois partagent une seule boucle d'événements.
+Les étapes bloquantes (cycle de recherche et d'inscription, analyse d'une capture
+continue) s'exécutent dans un pool de threads commun de taille fixe: aucun thread
+n'est dédié à une surveillance. Les attentes entre deux cycles, y compris entre
+deux captures continues, se font dans la boucle et n'occupent aucun thread du pool.
+Toutes les attentes sont annulables, un arrêt prend effet en quelques millisecondes.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from hopper import CoinPokerHopper
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Nombre de threads partagés par toutes les surveillances pour les étapes bloquantes
+EXECUTOR_WORKERS = 4
+
+
+class AsyncCoinPokerHopper(CoinPokerHopper):
+    def __init__(self, tournament_name, window_manager=None):
+        """
+        Initialise un hopper destiné à être exécuté dans une boucle asyncio
+
+        :param tournament_name: Nom du tournoi à rechercher et rejoindre
+        :param window_manager: WindowManager de la fenêtre à surveiller (None = première fenêtre CoinPoker trouvée)
+        """
+        super().__init__(tournament_name, window_manager)
+        self._loop = None
+        self._async_stop_event = None
+        # Réveille la boucle à chaque capture continue publiée, ainsi qu'à l'arrêt
+        self._frame_event = None
+
+    async def _async_wait(self, delay):
+        """
+        Attend le délai indiqué sans bloquer la boucle, interrompu par stop()
+
+        :return: True si le délai s'est écoulé, False si l'arrêt a été demandé
+        """
+        try:
+            await asyncio.wait_for(self._async_stop_event.wait(), timeout=delay)
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    def _wake_for_frame(self):
+        """Appelé par le producteur de captures (thread quelconque): réveille l'attente de la boucle"""
+        try:
+            self._loop.call_soon_threadsafe(self._frame_event.set)
+        except RuntimeError:
+            # Boucle déjà fermée
+            pass
+
+    async def _async_wait_for_next_cycle(self, delay, executor=None):
+        """
+        Version asynchrone de _wait_for_next_cycle
+
+        L'attente de chaque capture se fait dans la boucle; seule l'analyse d'une
+        capture occupe un thread du pool, le temps de cette analyse.
+
+        :param delay: Délai maximal en secondes
+        :param executor: Pool de threads pour l'analyse des captures
+        :return: True si l'attente s'est terminée normalement, False si l'arrêt a été demandé
+        """
+        grabber = self.window_manager.frame_grabber
+        if grabber is None or not self.background_mode:
+            return await self._async_wait(delay)
+
+        grabber.add_listener(self._wake_for_frame)
+        try:
+            deadline = self._loop.time() + delay
+            seq = 0
+            while not self._async_stop_event.is_set():
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    return True
+                if not grabber.running:
+                    return await self._async_wait(remaining)
+
+                # Événement effacé avant de relire la dernière capture: aucune publication n'est manquée
+                self._frame_event.clear()
+                frame = grabber.latest()
+                if frame is None or frame.seq <= seq:
+                    try:
+                        await asyncio.wait_for(self._frame_event.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                seq = frame.seq
+
+                position = await self._loop.run_in_executor(executor, self.check_frame, frame)
+                if position:
+                    self._pending_position = position
+                    return True
+            return False
+        finally:
+            grabber.remove_listener(self._wake_for_frame)
+
+    async def run_async(self, max_attempts=None, executor=None):
+        """
+        Version asynchrone de run()
+
+        :param max_attempts: Nombre maximum de tentatives (None = illimité)
+        :param executor: Pool de threads pour les étapes bloquantes (None = pool par défaut de la boucle)
+        """
+        self._loop = asyncio.get_running_loop()
+        self._async_stop_event = asyncio.Event()
+        self._frame_event = asyncio.Event()
+        if not self._armed:
+            self.arm()
+        elif self._stop_event.is_set():
+            # Arrêt demandé entre la création de la session et son démarrage
+            self._async_stop_event.set()
+
+        await self._loop.run_in_executor(executor, self.start_run)
+        attempts = 0
+
+        try:
+            while self.should_continue(attempts, max_attempts):
+                # Veille du calendrier: aucune tâche dans le pool de threads pendant l'attente
+                sleep = await self._loop.run_in_executor(executor, self.schedule_sleep)
+                if sleep > 0:
+                    await self._async_wait(sleep)
+                    continue
+
+                attempts += 1
+                delay = await self._loop.run_in_executor(executor, self.run_cycle, attempts, max_attempts)
+                if delay is None:
+                    break
+
+                delay = self.next_cycle_delay(delay)
+                if self.running:
+                    # Analyse des captures continues pendant l'attente (interrompue par stop())
+                    await self._async_wait_for_next_cycle(delay, executor)
+        except asyncio.CancelledError:
+            # Annulation de la tâche: les attentes bloquantes en cours sont interrompues
+            self._stop_event.set()
+            self.running = False
+            raise
+        finally:
+            self.finish_run()
+
+    def stop(self):
+        """Arrête la surveillance; peut être appelé depuis n'importe quel thread"""
+        super().stop()
+        if self._loop is not None and self._async_stop_event is not None:
+            self._loop.call_soon_threadsafe(self._async_stop_event.set)
+            self._loop.call_soon_threadsafe(self._frame_event.set)
+
+
+class WatcherLoop:
+    """Boucle d'événements unique exécutant plusieurs surveillances de tournois"""
+
+    def __init__(self, executor_workers=EXECUTOR_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="hopper-step")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="hopper-watchers", daemon=True)
+        self._watchers = {}
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def add(self, hopper, max_attempts=None):
+        """
+        Ajoute une surveillance à la boucle
+
+        :param hopper: Instance d'AsyncCoinPokerHopper
+        :param max_attempts: Nombre maximum de tentatives (None = illimité)
+        :return: concurrent.futures.Future terminé à la fin de la surveillance
+        """
+        # Session créée ici: un stop() reçu avant son démarrage dans la boucle est conservé
+        hopper.arm()
+        future = asyncio.run_coroutine_threadsafe(hopper.run_async(max_attempts, self._executor), self._loop)
+        self._watchers[id(hopper)] = (hopper, future)
+        future.add_done_callback(lambda _: self._watchers.pop(id(hopper), None))
+        return future
+
+    def watchers(self):
+        """Retourne la liste des hoppers en cours de surveillance"""
+        return [hopper for hopper, _ in list(self._watchers.values())]
+
+    def stop_all(self):
+        """Demande l'arrêt de toutes les surveillances"""
+        for hopper in self.watchers():
+            hopper.stop()
+
+    def close(self, timeout=5):
+        """Arrête toutes les surveillances puis la boucle d'événements"""
+        self.stop_all()
+        for _, future in list(self._watchers.values()):
+            try:
+                future.result(timeout=timeout)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'arrêt d'une surveillance: {str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=timeout)
+        self._executor.shutdown(wait=False)
+
+
+async def run_watchers(hoppers, max_attempts=None, executor_workers=EXECUTOR_WORKERS):
+    """
+    Exécute plusieurs surveillances dans la boucle asyncio courante
+
+    :param hoppers: Liste d'instances d'AsyncCoinPokerHopper
+    :param max_attempts: Nombre maximum de tentatives par surveillance (None = illimité)
+    :param executor_workers: Nombre de threads partagés pour les étapes bloquantes
+    """
+    with ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="hopper-step") as executor:
+        await asyncio.gather(*(hopper.run_async(max_attempts, executor) for hopper in hoppers))
@@ -0,0 +1,350 @@
+"""
+Couche plateforme: énumération des fenêtres, focus, capture, clics et défilement
+
+Toutes les interactions avec le bureau passent par le backend courant
+(get_backend). Le backend par défaut utilise pygetwindow, PIL.ImageGrab et
+pyautogui. SimulatedBackend remplace le bureau par un client CoinPoker simulé
+(lobby synthétique, voir utils.synthetic_lobby) qui réagit aux clics: le cycle
+complet (navigation, détection, REGISTER, dialogue ACCEPT, inscription) peut
+ainsi être exécuté et profilé sur une machine Linux sans écran.
+"""
+
+import time
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+from utils.lazy_import import lazy_import
+
+# Importés au premier usage
+gw = lazy_import("pygetwindow", "Le module pygetwindow est requis. Installez-le avec: pip install pygetwindow")
+ImageGrab = lazy_import("PIL.ImageGrab")
+Image = lazy_import("PIL.Image")
+pyautogui = lazy_import("pyautogui")
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Pixels parcourus par unité de défilement dans le client simulé
+SCROLL_PIXELS_PER_UNIT = 1
+
+# Hauteur de la barre d'onglets du client simulé
+TAB_BAR_HEIGHT = 40
+
+
+def _click_position(args):
+    """Position (x, y) des arguments d'un clic (mêmes conventions que pyautogui.click)"""
+    if len(args) == 1:
+        return tuple(args[0])
+    return (args[0], args[1])
+
+
+class DesktopBackend:
+    """Bureau réel (pygetwindow, PIL.ImageGrab, pyautogui)"""
+
+    name = "desktop"
+
+    def list_windows(self):
+        """Toutes les fenêtres ouvertes"""
+        return gw.getAllWindows()
+
+    def active_window(self):
+        """Fenêtre au premier plan (None si aucune)"""
+        return gw.getActiveWindow()
+
+    def activate(self, window):
+        """Restaure si nécessaire et met une fenêtre au premier plan"""
+        if window.isMinimized:
+            window.restore()
+        window.activate()
+
+    def grab(self, rect):
+        """
+        Capture une zone de l'écran
+
+        :param rect: Zone (gauche, haut, largeur, hauteur)
+        :return: Image PIL RGB
+        """
+        left, top, width, height = rect
+        return ImageGrab.grab(bbox=(left, top, left + width, top + height))
+
+    def screenshot(self, region=None):
+        """Capture tout l'écran, ou une région (gauche, haut, largeur, hauteur); image PIL RGB"""
+        return pyautogui.screenshot(region=region)
+
+    def position(self):
+        """Position (x, y) du curseur"""
+        return pyautogui.position()
+
+    def click(self, *args):
+        """Clique (mêmes arguments que pyautogui.click)"""
+        return pyautogui.click(*args)
+
+    def scroll(self, amount):
+        """Fait défiler (valeur négative = vers le bas)"""
+        return pyautogui.scroll(amount)
+
+
+class SimulatedWindow:
+    """Fenêtre du client simulé (attributs utilisés par WindowManager)"""
+
+    def __init__(self, backend, title, left, top, width, height, handle):
+        self._backend = backend
+        self._hWnd = handle
+        self.title = title
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.isMinimized = False
+
+    def restore(self):
+        self.isMinimized = False
+
+    def activate(self):
+        self._backend._active = self
+
+
+class SimulatedBackend:
+    """
+    Client CoinPoker simulé
+
+    La fenêtre affiche une barre d'onglets (onglet Tournaments) puis la partie
+    visible du lobby synthétique, qui défile avec scroll(). Un clic sur un bouton
+    REGISTERING ouvre le dialogue de confirmation; un clic sur ACCEPT inscrit le
+    tournoi de la ligne (son bouton est remplacé par le statut « REGISTERED »).
+    Les lignes inscriptibles des tournois surveillés n'affichent leur bouton
+    qu'après open_delay secondes, pour mesurer la latence d'inscription.
+    Une fenêtre d'erreur modale (show_error_popup) masque tout le client
+    jusqu'au clic sur son bouton OK, pour exercer la récupération du watchdog.
+    """
+
+    name = "simulated"
+
+    def __init__(self, lobby, accept_path, tab_path, window_origin=(500, 40), viewport_height=600, open_delay=0.0,
+                 popup_path=None, popup_delay=None):
+        """
+        :param lobby: Instance de SyntheticLobby (voir utils.synthetic_lobby.render_lobby)
+        :param accept_path: Chemin de l'image du bouton ACCEPT
+        :param tab_path: Chemin de l'image de l'onglet Tournaments
+        :param window_origin: Position (gauche, haut) de la fenêtre à l'écran
+        :param viewport_height: Hauteur de la partie visible du lobby
+        :param open_delay: Délai (en secondes) avant l'ouverture des inscriptions des tournois surveillés
+        :param popup_path: Chemin de l'image du bouton OK des fenêtres d'erreur
+        :param popup_delay: Délai (en secondes) avant l'apparition d'une fenêtre d'erreur (None = aucune)
+        """
+        self.lobby = lobby
+        self.accept = cv2.imread(accept_path)
+        self.tab = cv2.imread(tab_path)
+        button = cv2.imread(lobby.button_path)
+        self.button_size = (button.shape[1], button.shape[0])
+        self.viewport_height = min(viewport_height, lobby.frame.shape[0])
+        self.opens_at = time.perf_counter() + open_delay
+        self.popup_ok = cv2.imread(popup_path) if popup_path else None
+        self.popup_at = time.perf_counter() + popup_delay if popup_delay is not None and self.popup_ok is not None else None
+
+        width = lobby.frame.shape[1]
+        height = TAB_BAR_HEIGHT + self.viewport_height
+        self.window = SimulatedWindow(self, "CoinPoker - Lobby (simulé)", window_origin[0], window_origin[1], width, height, 1)
+        self.screen_size = (window_origin[0] + width + 100, window_origin[1] + height + 100)
+
+        self._lock = threading.Lock()
+        self._active = None
+        self._cursor = (0, 0)
+        self.scroll_offset = 0
+        # Ligne du lobby dont le dialogue de confirmation est ouvert (None = aucun dialogue)
+        self.dialog_row = None
+        # Fenêtre d'erreur affichée
+        self.popup_open = False
+        # Inscriptions effectuées: liste de tuples (nom du tournoi, instant time.perf_counter)
+        self.registrations = []
+        self._registered_rows = set()
+        # Journal des actions: liste de tuples (instant, type, détail)
+        self.events = []
+
+    # Fenêtres
+
+    def list_windows(self):
+        return [self.window]
+
+    def active_window(self):
+        return self._active
+
+    def activate(self, window):
+        window.restore()
+        window.activate()
+
+    # Fenêtre d'erreur
+
+    def show_error_popup(self):
+        """Affiche une fenêtre d'erreur modale (nécessite popup_path)"""
+        if self.popup_ok is None:
+            raise ValueError("Aucune image de bouton OK pour la fenêtre d'erreur")
+        with self._lock:
+            self.popup_open = True
+            self.dialog_row = None
+            self.events.append((time.perf_counter(), "popup", None))
+        logger.info("Client simulé: fenêtre d'erreur affichée")
+
+    def _update_popup(self):
+        """Affiche la fenêtre d'erreur programmée lorsque son délai est écoulé"""
+        if self.popup_at is not None and time.perf_counter() >= self.popup_at:
+            self.popup_at = None
+            self.show_error_popup()
+
+    def _popup_rect(self):
+        """Zone (gauche, haut, largeur, hauteur) du bouton OK de la fenêtre d'erreur dans la fenêtre"""
+        height, width = self.popup_ok.shape[:2]
+        return ((self.window.width - width) // 2, (self.window.height - height) // 2, width, height)
+
+    # Rendu
+
+    def _row_open(self, index):
+        row = self.lobby.rows[index]
+        return row.registering and index not in self._registered_rows and (
+            row.name is None or time.perf_counter() >= self.opens_at
+        )
+
+    def _dialog_rect(self):
+        """Zone (gauche, haut, largeur, hauteur) du bouton ACCEPT dans la fenêtre"""
+        height, width = self.accept.shape[:2]
+        return ((self.window.width - width) // 2, TAB_BAR_HEIGHT + (self.viewport_height - height) // 2, width, height)
+
+    def _render_window(self):
+        """Contenu BGR de la fenêtre dans l'état courant"""
+        from utils.synthetic_lobby import render_text, ROW_COLORS
+
+        if self.popup_open:
+            # Fenêtre d'erreur: le lobby et les onglets sont entièrement masqués
+            window = np.full((self.window.height, self.window.width, 3), (40, 34, 32), dtype=np.uint8)
+            left, top, width, height = self._popup_rect()
+            message = render_text("Connection lost", background=(40, 34, 32))
+            message_h, message_w = message.shape[:2]
+            window[top - message_h - 10:top - 10, (self.window.width - message_w) // 2:(self.window.width + message_w) // 2] = message
+            window[top:top + height, left:left + width] = self.popup_ok
+            return window
+
+        top = self.scroll_offset
+        view = self.lobby.frame[top:top + self.viewport_height].copy()
+        button_w, button_h = self.button_size
+        for index, row in enumerate(self.lobby.rows):
+            if row.button_center is None or self._row_open(index):
+                continue
+            x, y = row.button_center[0] - button_w // 2, row.button_center[1] - button_h // 2 - top
+            if y + button_h <= 0 or y >= self.viewport_height:
+                continue
+            label = "REGISTERED" if index in self._registered_rows else "SOON"
+            cell = render_text(label, size=(button_w, button_h), color=(120, 120, 120), background=ROW_COLORS[index % 2])
+            y0, y1 = max(0, y), min(self.viewport_height, y + button_h)
+            view[y0:y1, x:x + button_w] = cell[y0 - y:y1 - y]
+
+        window = np.zeros((self.window.height, self.window.width, 3), dtype=np.uint8)
+        window[:TAB_BAR_HEIGHT] = (24, 20, 18)
+        tab_h, tab_w = self.tab.shape[:2]
+        window[(TAB_BAR_HEIGHT - tab_h) // 2:(TAB_BAR_HEIGHT - tab_h) // 2 + tab_h, 10:10 + tab_w] = self.tab
+        window[TAB_BAR_HEIGHT:] = view
+
+        if self.dialog_row is not None:
+            left, dialog_top, width, height = self._dialog_rect()
+            cv2.rectangle(window, (left - 40, dialog_top - 50), (left + width + 40, dialog_top + height + 20), (70, 60, 55), -1)
+            window[dialog_top:dialog_top + height, left:left + width] = self.accept
+        return window
+
+    def _render_screen(self):
+        screen = np.full((self.screen_size[1], self.screen_size[0], 3), 12, dtype=np.uint8)
+        window = self._render_window()
+        left, top = self.window.left, self.window.top
+        screen[top:top + window.shape[0], left:left + window.shape[1]] = window
+        return screen
+
+    def grab(self, rect):
+        left, top, width, height = rect
+        self._update_popup()
+        with self._lock:
+            screen = self._render_screen()
+        return Image.fromarray(cv2.cvtColor(screen[top:top + height, left:left + width], cv2.COLOR_BGR2RGB))
+
+    def screenshot(self, region=None):
+        if region is None:
+            self._update_popup()
+            with self._lock:
+                screen = self._render_screen()
+            return Image.fromarray(cv2.cvtColor(screen, cv2.COLOR_BGR2RGB))
+        return self.grab(region)
+
+    # Entrées
+
+    def position(self):
+        return self._cursor
+
+    def click(self, *args):
+        x, y = _click_position(args)
+        self._cursor = (x, y)
+        with self._lock:
+            self.events.append((time.perf_counter(), "click", (x, y)))
+            # Coordonnées dans le lobby complet
+            wx, wy = x - self.window.left, y - self.window.top
+            if not (0 <= wx < self.window.width and 0 <= wy < self.window.height):
+                return
+
+            if self.popup_open:
+                # Fenêtre modale: seul le bouton OK réagit
+                left, top, width, height = self._popup_rect()
+                if left <= wx < left + width and top <= wy < top + height:
+                    self.popup_open = False
+                    logger.info("Client simulé: fenêtre d'erreur fermée")
+                return
+
+            if self.dialog_row is not None:
+                left, top, width, height = self._dialog_rect()
+                if left <= wx < left + width and top <= wy < top + height:
+                    row = self.lobby.rows[self.dialog_row]
+                    self._registered_rows.add(self.dialog_row)
+                    self.registrations.append((row.name, time.perf_counter()))
+                    logger.info(f"Client simulé: inscription au tournoi '{row.name}' confirmée")
+                self.dialog_row = None
+                return
+
+            ly = wy - TAB_BAR_HEIGHT + self.scroll_offset
+            if wy < TAB_BAR_HEIGHT:
+                return
+            button_w, button_h = self.button_size
+            for index, row in enumerate(self.lobby.rows):
+                if row.button_center is None or not self._row_open(index):
+                    continue
+                bx, by = row.button_center
+                if abs(wx - bx) <= button_w // 2 and abs(ly - by) <= button_h // 2:
+                    self.dialog_row = index
+                    return
+
+    def scroll(self, amount):
+        with self._lock:
+            self.events.append((time.perf_counter(), "scroll", amount))
+            limit = self.lobby.frame.shape[0] - self.viewport_height
+            self.scroll_offset = int(min(limit, max(0, self.scroll_offset - amount * SCROLL_PIXELS_PER_UNIT)))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Retourne le backend courant (le bureau réel par défaut)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = DesktopBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Remplace le backend utilisé par toutes les interactions avec le bureau
+
+    :param backend: Instance de DesktopBackend, SimulatedBackend ou équivalent (None = bureau réel)
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la détection sur des lobbies synthétiques de taille croissante
+
+Les lobbies sont composés à partir des images de référence (resources/images,
+images générées si absentes, voir utils.synthetic_lobby) avec les positions
+exactes des occurrences. Pour chaque nombre de lignes, le benchmark mesure :
+  - la recherche de toutes les occurrences (find_all_in_frame, chemin de
+    find_all_on_screen sans la capture) : durée, lignes/s, précision et rappel ;
+  - la recherche de tous les noms par empreinte des lignes (utils.row_index) :
+    construction de l'index et recherches, précision et rappel ;
+  - find_tournament_in_list sur chaque zone visible : durée moyenne et exactitude ;
+  - un balayage complet par défilement jusqu'à la première ligne inscriptible.
+
+Le cache de détection est désactivé par défaut pour mesurer le coût réel de
+chaque capture (--cache pour le réactiver).
+
+Exécution depuis la racine du projet :
+    python -m benchmarks.bench_lobby [--rows 50 100 200 400] [--noise 4] [--scale 1.0]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from utils.config_utils import load_tournaments
+from utils.image_utils import find_all_in_frame
+from utils.synthetic_lobby import prepare_lobby_images, render_lobby
+from utils.detection_cache import DetectionCache
+from utils.row_index import RowIndex, fingerprint_template
+from utils.template_matching import set_detection_cache
+from utils.threshold_tuning import MATCH_DISTANCE
+
+DEFAULT_NAMES = ["Synthetic Main Event", "Synthetic Turbo"]
+
+
+def _evaluate(detections, expected):
+    """
+    Compare des détections aux occurrences attendues
+
+    :return: Tuple (vrais positifs, faux positifs, faux négatifs)
+    """
+    unmatched = list(expected)
+    true_positives = 0
+    for x, y in detections:
+        nearest = min(unmatched, key=lambda label: (label[0] - x) ** 2 + (label[1] - y) ** 2, default=None)
+        if nearest is not None and (nearest[0] - x) ** 2 + (nearest[1] - y) ** 2 <= MATCH_DISTANCE ** 2:
+            unmatched.remove(nearest)
+            true_positives += 1
+    return true_positives, len(detections) - true_positives, len(unmatched)
+
+
+def _close(position, expected):
+    if position is None or expected is None:
+        return position is None and expected is None
+    return (position[0] - expected[0]) ** 2 + (position[1] - expected[1]) ** 2 <= MATCH_DISTANCE ** 2
+
+
+def _time(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def _make_hopper(tournament_name, images_dir):
+    from hopper import CoinPokerHopper
+
+    hopper = CoinPokerHopper(tournament_name)
+    hopper.images_dir = images_dir
+    plan = hopper.compile_plan()
+    # Les lobbies synthétiques placent le bouton dans sa colonne, sans offsets propres au tournoi
+    plan.offsets = None
+    return hopper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 100, 200, 400, 800], help="Nombres de lignes des lobbies")
+    parser.add_argument("--names", nargs="+", help="Tournois placés dans les lobbies (par défaut, ceux de la configuration)")
+    parser.add_argument("--noise", type=float, default=0.0, help="Écart type du bruit ajouté aux lobbies")
+    parser.add_argument("--scale", type=float, default=1.0, help="Facteur d'échelle des lobbies")
+    parser.add_argument("--viewport", type=int, default=600, help="Hauteur de la zone visible (pixels)")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre d'exécutions par mesure")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="Conserver le cache de détection entre les mesures")
+    parser.add_argument("--save", metavar="DOSSIER", help="Enregistre les lobbies et leurs annotations dans ce dossier")
+    args = parser.parse_args()
+
+    logging.getLogger("coinpoker_hopper").setLevel(logging.WARNING)
+    set_detection_cache(DetectionCache() if args.cache else None)
+
+    names = args.names or load_tournaments() or DEFAULT_NAMES
+    workdir = tempfile.mkdtemp(prefix="lobby_")
+    try:
+        name_paths, button_path = prepare_lobby_images(names, workdir)
+        hopper = _make_hopper(names[0], workdir)
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+
+        print(f"Tournois: {', '.join(names)} (recherché: '{names[0]}'), bruit {args.noise}, échelle {args.scale}")
+        print(f"\n{'lignes':>7} {'taille':>11} {'noms (ms)':>10} {'boutons (ms)':>13} {'lignes/s':>10} "
+              f"{'précision':>10} {'rappel':>8} {'index (ms)':>11} {'préc. idx':>10} {'rappel idx':>11} {'liste (ms)':>11} {'exact':>7} {'balayage (ms)':>14} {'zones':>6} {'trouvé':>7}")
+
+        for row_count in args.rows:
+            lobby = render_lobby(name_paths, button_path, row_count, noise=args.noise, scale=args.scale, seed=args.seed)
+            frame = lobby.frame
+            if args.save:
+                lobby.save(os.path.join(args.save, f"lobby_{row_count}.png"))
+            labels = lobby.labels()
+
+            # Toutes les occurrences des noms et des boutons sur le lobby complet
+            true_positives = false_positives = false_negatives = 0
+            names_cost = 0.0
+            for path in name_paths.values():
+                cost, detections = _time(lambda: find_all_in_frame(frame, path, None), args.repeat)
+                names_cost += cost
+                tp, fp, fn = _evaluate(detections, labels[os.path.basename(path)])
+                true_positives, false_positives, false_negatives = true_positives + tp, false_positives + fp, false_negatives + fn
+            buttons_cost, detections = _time(lambda: find_all_in_frame(frame, button_path, None), args.repeat)
+            tp, fp, fn = _evaluate(detections, labels[os.path.basename(button_path)])
+            true_positives, false_positives, false_negatives = true_positives + tp, false_positives + fp, false_negatives + fn
+            precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 1.0
+            recall = true_positives / (true_positives + false_negatives) if true_positives + false_negatives else 1.0
+            rows_per_second = row_count / (names_cost + buttons_cost) if names_cost + buttons_cost else 0.0
+
+            # Tous les noms par empreinte des lignes: un index par capture, quel que soit le nombre de noms
+            fingerprints = {path: fingerprint_template(path) for path in name_paths.values()}
+            index_cost, found = _time(
+                lambda: (lambda index: {path: index.lookup(fp) for path, fp in fingerprints.items()})(RowIndex(frame)),
+                args.repeat
+            )
+            index_tp = index_fp = index_fn = 0
+            for path, detections in found.items():
+                tp, fp, fn = _evaluate(detections, labels[os.path.basename(path)])
+                index_tp, index_fp, index_fn = index_tp + tp, index_fp + fp, index_fn + fn
+            index_precision = index_tp / (index_tp + index_fp) if index_tp + index_fp else 1.0
+            index_recall = index_tp / (index_tp + index_fn) if index_tp + index_fn else 1.0
+
+            # find_tournament_in_list sur chaque zone visible
+            viewports = lobby.viewports(min(args.viewport, frame.shape[0]), overlap=args.viewport // 4)
+            list_cost, exact = 0.0, 0
+            for top, view in viewports:
+                cost, position = _time(
+                    lambda: hopper.find_tournament_in_list(frame=view, captured_at=time.perf_counter(), report=False),
+                    args.repeat
+                )
+                list_cost += cost
+                exact += _close(position, lobby.first_registrable(names[0], top, top + view.shape[0]))
+
+            # Balayage par défilement jusqu'à la première zone où le tournoi est inscriptible
+            start = time.perf_counter()
+            scanned, found = 0, None
+            for top, view in viewports:
+                scanned += 1
+                position = hopper.find_tournament_in_list(frame=view, captured_at=time.perf_counter(), report=False)
+                if position is not None:
+                    found = (top, position)
+                    break
+            sweep_cost = time.perf_counter() - start
+            if found is None:
+                sweep_ok = lobby.first_registrable(names[0]) is None
+            else:
+                top, position = found
+                sweep_ok = _close(position, lobby.first_registrable(names[0], top, top + args.viewport))
+
+            print(f"{row_count:>7} {f'{frame.shape[1]}x{frame.shape[0]}':>11} {names_cost * 1000:>10.1f} "
+                  f"{buttons_cost * 1000:>13.1f} {rows_per_second:>10.0f} {precision:>10.3f} {recall:>8.3f} "
+                  f"{index_cost * 1000:>11.1f} {index_precision:>10.3f} {index_recall:>11.3f} "
+                  f"{list_cost * 1000 / len(viewports):>11.1f} {f'{exact}/{len(viewports)}':>7} "
+                  f"{sweep_cost * 1000:>14.1f} {scanned:>6} {'oui' if sweep_ok else 'NON':>7}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la corrélation par FFT et par bandes parallèles face à cv2.matchTemplate
+
+Utilise les captures enregistrées (resources/screenshots/window_capture_*.png)
+et les images de référence (resources/images/*.png). Sans captures disponibles,
+une image aléatoire de la taille d'un écran 4K est générée.
+
+Exécution depuis la racine du projet :
+    python -m benchmarks.bench_matching [--repeat N]
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.template_matching import (
+    Template, load_template, match_template_direct, match_template_fft, match_template_tiled
+)
+
+
+def _load_frames(pattern):
+    frames = []
+    for path in sorted(glob.glob(pattern)):
+        image = Image.open(path).convert("RGB")
+        frames.append((os.path.basename(path), cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)))
+    return frames
+
+
+def _load_templates(pattern, frames):
+    templates = [load_template(path) for path in sorted(glob.glob(pattern))]
+    if templates:
+        return templates
+
+    # Pas d'images de référence: extraire des templates des captures elles-mêmes
+    frame = frames[0][1]
+    generated = []
+    for w, h in ((40, 40), (100, 20), (300, 20)):
+        crop = np.ascontiguousarray(frame[100:100 + h, 200:200 + w])
+        generated.append(Template(f"synthetique_{w}x{h}", None, crop))
+    return generated
+
+
+def _time(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", default="resources/screenshots/window_capture_*.png")
+    parser.add_argument("--templates", default="resources/images/*.png")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--strips", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    frames = _load_frames(args.frames)
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [("aleatoire_3840x2160", rng.integers(0, 256, (2160, 3840, 3), dtype=np.uint8))]
+    templates = _load_templates(args.templates, frames)
+
+    print(f"{'capture':<32} {'template':<40} {'direct (ms)':>12} {'fft (ms)':>10} {'bandes (ms)':>12} {'écart max':>10}")
+    for frame_name, frame in frames:
+        for template in templates:
+            if template.height > frame.shape[0] or template.width > frame.shape[1]:
+                continue
+            direct_cost, direct_result = _time(lambda: match_template_direct(frame, template), args.repeat)
+            fft_cost, fft_result = _time(lambda: match_template_fft(frame, template), args.repeat)
+            tiled_cost, tiled_result = _time(lambda: match_template_tiled(frame, template, args.strips), args.repeat)
+            error = float(max(np.max(np.abs(direct_result - fft_result)), np.max(np.abs(direct_result - tiled_result))))
+            name = os.path.basename(template.key)
+            print(f"{frame_name[:32]:<32} {name[:40]:<40} {direct_cost * 1000:>12.1f} {fft_cost * 1000:>10.1f} {tiled_cost * 1000:>12.1f} {error:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
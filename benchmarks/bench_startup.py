@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark du temps de démarrage (imports et chargement de la configuration)
+
+Chaque mesure est effectuée dans un nouvel interpréteur lancé avec -X importtime:
+le détail indique, pour les modules les plus coûteux, le temps d'import cumulé.
+Le scénario « gui » correspond à ce qui précède l'affichage de la fenêtre
+(import de l'interface et lecture de la liste des tournois); le scénario
+« hopper » correspond au préchargement effectué en arrière-plan.
+
+Exécution depuis la racine du projet :
+    python -m benchmarks.bench_startup [--repeat N] [--top N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    "gui": "import gui; from utils.config_utils import load_tournaments; load_tournaments()",
+    "hopper": "import hopper",
+    "async_hopper": "import async_hopper",
+}
+
+
+def _run(code):
+    """
+    Exécute le code dans un nouvel interpréteur avec -X importtime
+
+    :return: Tuple (durée totale en secondes, lignes importtime, message d'erreur ou None)
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    lines = [line for line in process.stderr.splitlines() if line.startswith("import time:")]
+    error = None
+    if process.returncode != 0:
+        other = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+        error = other[-1] if other else f"code de retour {process.returncode}"
+    return elapsed, lines, error
+
+
+def _parse_importtime(lines):
+    """
+    Analyse la sortie de -X importtime
+
+    :return: Liste de tuples (module, temps propre en ms, temps cumulé en ms, profondeur)
+    """
+    entries = []
+    for line in lines:
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us = int(fields[0])
+            cumulative_us = int(fields[1])
+        except ValueError:
+            # Ligne d'en-tête
+            continue
+        name = fields[2]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), self_us / 1000, cumulative_us / 1000, depth))
+    return entries
+
+
+def _baseline(repeat):
+    """Durée de démarrage d'un interpréteur vide (en secondes)"""
+    return min(_run("pass")[0] for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre d'exécutions par scénario (le minimum est retenu)")
+    parser.add_argument("--top", type=int, default=15, help="Nombre de modules affichés par scénario")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", help="Scénario(s) à mesurer (tous par défaut)")
+    args = parser.parse_args()
+
+    baseline = _baseline(args.repeat)
+    print(f"Interpréteur vide: {1000 * baseline:.0f} ms")
+
+    for name in args.scenario or list(SCENARIOS):
+        runs = [_run(SCENARIOS[name]) for _ in range(args.repeat)]
+        elapsed, lines, error = min(runs, key=lambda run: run[0])
+        print(f"\nScénario '{name}': {1000 * elapsed:.0f} ms ({1000 * (elapsed - baseline):.0f} ms hors interpréteur)")
+        if error:
+            print(f"  Erreur: {error}")
+
+        entries = _parse_importtime(lines)
+        # Imports directs des modules importés par le scénario, puis modules les plus coûteux en propre
+        direct = sorted((entry for entry in entries if entry[3] == 1), key=lambda entry: entry[2], reverse=True)
+        heaviest = sorted(entries, key=lambda entry: entry[1], reverse=True)
+        for title, selection in (("Imports directs", direct), ("Modules les plus coûteux", heaviest)):
+            print(f"  {title}:")
+            print(f"    {'module':<40}{'cumulé (ms)':>14}{'propre (ms)':>14}")
+            for module, self_ms, cumulative_ms, _ in selection[:args.top]:
+                print(f"    {module:<40}{cumulative_ms:>14.1f}{self_ms:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Plan de détection précompilé pour un tournoi
+
+Le plan est construit une seule fois au démarrage de la surveillance: il résout
+les images de référence et les offsets disponibles, la stratégie d'inscription
+applicable et les seuils de confiance. La boucle de surveillance se contente
+ensuite d'exécuter le plan, sans accès au système de fichiers ni arbre de décision.
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+from utils.config_utils import load_tournament_offsets, load_tournaments
+from utils.template_matching import resolve_confidence, get_template_bundle
+from utils.row_index import fingerprint_template, hamming, DEFAULT_MAX_DISTANCE
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Stratégies d'inscription, par ordre de précision
+STRATEGY_OFFSETS = "offsets"                      # Méthode 1: offsets pré-configurés
+STRATEGY_SAME_ROW = "same_row"                    # Méthode 2: bouton REGISTERING sur la même ligne
+STRATEGY_CLICK_THEN_SEARCH = "click_then_search"  # Méthode 3: clic sur le tournoi puis recherche du bouton (repli de la méthode 2)
+
+# Seuils de confiance par défaut (remplacés par les seuils calibrés des images, voir resolve_confidence)
+LIST_CONFIDENCE = 0.8
+BUTTON_CHECK_CONFIDENCE = 0.7
+
+# Tolérance verticale (en pixels) pour considérer un bouton sur la même ligne qu'un tournoi
+ROW_TOLERANCE = 20
+
+# Nombre de mesures conservées par étape
+TIMING_HISTORY_SIZE = 200
+
+# Recherche des noms de tournois: correspondance de l'image du nom, ou empreinte des lignes (voir utils.row_index)
+NAME_LOOKUP_TEMPLATE = "template"
+NAME_LOOKUP_FINGERPRINT = "fingerprint"
+
+_name_lookup = NAME_LOOKUP_TEMPLATE
+
+
+def set_name_lookup(mode):
+    """
+    Choisit la méthode de recherche des noms de tournois des plans compilés ensuite
+
+    :param mode: NAME_LOOKUP_TEMPLATE ou NAME_LOOKUP_FINGERPRINT
+    """
+    global _name_lookup
+    _name_lookup = mode
+
+
+def tournament_file_prefix(tournament_name):
+    """Préfixe des fichiers associés à un tournoi (images de référence, offsets)"""
+    return tournament_name.lower().replace(' ', '_')
+
+
+class DetectionPlan:
+    def __init__(self, tournament_name, images_dir):
+        """
+        Plan de détection d'un tournoi (voir compile_detection_plan)
+
+        :param tournament_name: Nom du tournoi
+        :param images_dir: Dossier des images de référence
+        """
+        self.tournament_name = tournament_name
+        self.images_dir = images_dir
+
+        # Images de référence (None si absentes)
+        self.tournament_image = None
+        self.specific_button_image = None
+        self.registering_button_image = None
+        self.accept_button_image = None
+        self.tournaments_tab_image = None
+        self.logo_image = None
+
+        # Image utilisée pour vérifier le bouton à la position déduite des offsets
+        self.button_check_image = None
+
+        # Empreinte du nom et des autres noms surveillés proches (recherche par empreinte, None sinon)
+        self.name_fingerprint = None
+        self.rival_fingerprints = []
+
+        self.offsets = None
+        self.strategy = None
+        # Stratégie appliquée si la stratégie principale ne trouve pas le bouton au moment de l'inscription
+        self.fallback = None
+
+        # Paquet d'images actif à la compilation (recompilation si le profil change, voir is_stale)
+        self.bundle = None
+
+        self.tournament_confidence = LIST_CONFIDENCE
+        self.registering_confidence = LIST_CONFIDENCE
+        self.button_check_confidence = BUTTON_CHECK_CONFIDENCE
+        self.row_tolerance = ROW_TOLERANCE
+
+        # Durées mesurées par étape (en secondes)
+        self.timings = {}
+
+    def is_stale(self):
+        """Indique si le paquet d'images actif a changé depuis la compilation du plan"""
+        return self.bundle is not get_template_bundle()
+
+    @contextmanager
+    def timed(self, step):
+        """Mesure la durée d'une étape du plan"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            history = self.timings.setdefault(step, [])
+            history.append(time.perf_counter() - start)
+            if len(history) > TIMING_HISTORY_SIZE:
+                del history[0]
+
+    def timing_summary(self):
+        """
+        Résume les durées mesurées par étape
+
+        :return: Dictionnaire étape -> (nombre de mesures, durée moyenne en ms, durée max en ms)
+        """
+        return {
+            step: (len(values), 1000 * sum(values) / len(values), 1000 * max(values))
+            for step, values in self.timings.items() if values
+        }
+
+    def describe(self):
+        """Description courte du plan pour le statut"""
+        return (
+            f"stratégie={self.strategy or 'aucune'}{f' (repli {self.fallback})' if self.fallback else ''}, "
+            f"offsets={'oui' if self.offsets else 'non'}, "
+            f"bouton spécifique={'oui' if self.specific_button_image else 'non'}, "
+            f"noms={'empreinte' if self.name_fingerprint else 'image'}, "
+            f"seuils={self.tournament_confidence:.2f}/{self.registering_confidence:.2f}/{self.button_check_confidence:.2f}"
+        )
+
+
+def reference_image(images_dir, filename):
+    """
+    Chemin d'une image de référence si elle est disponible (fichier ou paquet actif)
+
+    :param images_dir: Dossier des images de référence
+    :param filename: Nom du fichier de l'image
+    :return: Chemin de l'image, None si elle est absente
+    """
+    path = f"{images_dir}/{filename}"
+    bundle = get_template_bundle()
+    return path if os.path.exists(path) or (bundle is not None and bundle.contains(path)) else None
+
+
+def compile_detection_plan(tournament_name, images_dir="resources/images"):
+    """
+    Construit le plan de détection d'un tournoi à partir des fichiers de configuration
+
+    :param tournament_name: Nom du tournoi
+    :param images_dir: Dossier des images de référence
+    :return: Instance de DetectionPlan
+    """
+    plan = DetectionPlan(tournament_name, images_dir)
+    prefix = tournament_file_prefix(tournament_name)
+
+    # Images et offsets du paquet actif, sinon fichiers individuels (voir utils.template_bundle)
+    bundle = get_template_bundle()
+    plan.bundle = bundle
+
+    plan.tournament_image = reference_image(images_dir, f"{prefix}.png")
+    plan.specific_button_image = reference_image(images_dir, f"{prefix}_register_button.png")
+    plan.registering_button_image = reference_image(images_dir, "registering_button.png")
+    plan.accept_button_image = reference_image(images_dir, "accept_button.png")
+    plan.tournaments_tab_image = reference_image(images_dir, "tournaments_tab.png")
+    plan.logo_image = reference_image(images_dir, "coinpoker_logo.png")
+    plan.offsets = (bundle.tournament_offsets(tournament_name) if bundle is not None else None) or load_tournament_offsets(tournament_name)
+    plan.button_check_image = plan.specific_button_image or plan.registering_button_image
+
+    # Seuils calibrés par image (config/template_thresholds.json), sinon seuils par défaut
+    plan.tournament_confidence = resolve_confidence(plan.tournament_image, default=LIST_CONFIDENCE)
+    plan.registering_confidence = resolve_confidence(plan.registering_button_image, default=LIST_CONFIDENCE)
+    plan.button_check_confidence = resolve_confidence(plan.button_check_image, default=BUTTON_CHECK_CONFIDENCE)
+
+    if _name_lookup == NAME_LOOKUP_FINGERPRINT:
+        if plan.tournament_image:
+            _compile_fingerprints(plan, images_dir)
+        else:
+            logger.warning(f"Image du nom du tournoi '{tournament_name}' absente, recherche par empreinte impossible")
+
+    if plan.offsets and plan.specific_button_image:
+        plan.strategy = STRATEGY_OFFSETS
+    elif plan.registering_button_image:
+        plan.strategy = STRATEGY_SAME_ROW
+        plan.fallback = STRATEGY_CLICK_THEN_SEARCH
+
+    logger.info(f"Plan de détection compilé pour '{tournament_name}': {plan.describe()}")
+    return plan
+
+
+def _compile_fingerprints(plan, images_dir):
+    """Empreinte du nom du tournoi et des autres tournois configurés qui pourraient être confondus avec lui"""
+    plan.name_fingerprint = fingerprint_template(plan.tournament_image)
+    if plan.name_fingerprint is None:
+        logger.warning(f"Aucun texte dans l'image du tournoi '{plan.tournament_name}', recherche par image")
+        return
+
+    # Images des autres tournois: fichiers ou paquet actif (le chargement des templates suit le paquet)
+    for name in load_tournaments():
+        if name == plan.tournament_name:
+            continue
+        path = reference_image(images_dir, f"{tournament_file_prefix(name)}.png")
+        if path is None:
+            continue
+        rival = fingerprint_template(path)
+        if rival is not None and hamming(rival.value, plan.name_fingerprint.value) <= 2 * DEFAULT_MAX_DISTANCE:
+            plan.rival_fingerprints.append(rival)
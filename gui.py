@@ -6,31 +6,76 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import logging
+import importlib
 from datetime import datetime
 
-from hopper import CoinPokerHopper
-from utils.config_utils import load_tournaments, save_tournaments
+from utils.config_utils import load_tournaments, save_tournaments, list_profiles
+from utils.profiling import get_profiler
 
 logger = logging.getLogger("coinpoker_hopper")
 
+# Période de synchronisation de la case du profilage avec l'état du profileur (en millisecondes)
+PROFILER_POLL_MS = 500
+
 class HopperGUI:
-    def __init__(self, root):
+    def __init__(self, root, template_profile=None):
         """
         Initialise l'interface graphique
         
         :param root: Fenêtre racine de Tkinter
+        :param template_profile: Profil d'images actif au démarrage (None = fichiers individuels)
         """
         self.root = root
         self.root.title("CoinPoker Tournament Hopper")
-        self.root.geometry("550x480")  # Plus grand pour accueillir la nouvelle option
+        self.root.geometry("550x560")  # Plus grand pour accueillir la nouvelle option
         self.root.resizable(True, True)
         
         self.hopper = None
         self.hopper_thread = None
         self.window_check_thread = None
+        # Surveillance de toutes les fenêtres CoinPoker: un hopper par fenêtre (voir window_registry),
+        # toutes les surveillances partageant une boucle asyncio et un pool de threads (voir async_hopper)
+        self.window_registry = None
+        self.watcher_loop = None
+        self.window_hoppers = []
+        
+        self.template_profile = template_profile
         
         self.create_widgets()
         self.load_tournaments()
+        
+        # Le module hopper (OpenCV, numpy, pyautogui...) est importé en arrière-plan
+        # une fois l'interface affichée, pour ne pas retarder son apparition
+        self.root.after(200, self.preload_hopper)
+        
+        # La case du profilage suit l'état réel du profileur (démarré aussi par --profile ou SIGUSR1)
+        self.root.after(PROFILER_POLL_MS, self.refresh_profiling)
+    
+    def preload_hopper(self):
+        """Importe le module hopper dans un thread pour que le premier démarrage soit immédiat"""
+        def preload():
+            try:
+                importlib.import_module("hopper")
+            except Exception as e:
+                logger.error(f"Erreur lors du préchargement du module hopper: {str(e)}")
+        threading.Thread(target=preload, name="hopper-preload", daemon=True).start()
+    
+    def get_hopper(self, tournament_name):
+        """
+        Retourne le hopper du tournoi, en réutilisant le hopper existant s'il est inactif
+        
+        :param tournament_name: Nom du tournoi
+        :return: Instance de CoinPokerHopper
+        """
+        from hopper import CoinPokerHopper
+        
+        hopper_idle = self.hopper_thread is None or not self.hopper_thread.is_alive()
+        if self.hopper and self.hopper.tournament_name == tournament_name and not self.hopper.running and hopper_idle:
+            return self.hopper
+        
+        self.hopper = CoinPokerHopper(tournament_name)
+        self.hopper.set_status_callback(self.update_status)
+        return self.hopper
     
     def create_widgets(self):
         """Crée les widgets de l'interface utilisateur"""
@@ -61,6 +106,15 @@ class HopperGUI:
         ttk.Button(buttons_frame, text="Ajouter", command=self.add_tournament).pack(side="left", padx=5)
         ttk.Button(buttons_frame, text="Supprimer", command=self.delete_tournament).pack(side="left", padx=5)
         
+        # Profil d'images (thème, résolution): changement possible pendant la surveillance
+        ttk.Label(tournament_frame, text="Profil d'images :").grid(row=3, column=0, sticky="w", padx=5, pady=5)
+        self.profile_name_var = tk.StringVar(value=self.template_profile or "")
+        self.profile_combobox = ttk.Combobox(
+            tournament_frame, textvariable=self.profile_name_var, values=list_profiles(), width=30, state="readonly"
+        )
+        self.profile_combobox.grid(row=3, column=1, sticky="ew", padx=5, pady=5)
+        self.profile_combobox.bind("<<ComboboxSelected>>", self.switch_template_profile)
+        
         # Section contrôles
         self.controls_frame = ttk.LabelFrame(main_frame, text="Contrôles", padding="10")
         self.controls_frame.pack(fill="x", padx=5, pady=5)
@@ -79,9 +133,17 @@ class HopperGUI:
         interval_entry = ttk.Entry(self.controls_frame, textvariable=self.interval_var, width=10)
         interval_entry.grid(row=1, column=1, sticky="w", padx=5, pady=5)
         
+        # Fréquence de la capture continue (mode arrière-plan)
+        ttk.Label(self.controls_frame, text="Captures/s :").grid(row=2, column=0, sticky="w", padx=5, pady=5)
+        self.capture_fps_var = tk.StringVar(value="0")
+        capture_fps_entry = ttk.Entry(self.controls_frame, textvariable=self.capture_fps_var, width=10)
+        capture_fps_entry.grid(row=2, column=1, sticky="w", padx=5, pady=5)
+        
+        ttk.Label(self.controls_frame, text="(0 = capture à chaque vérification)").grid(row=2, column=2, sticky="w", padx=5, pady=5)
+        
         # Options de surveillance de la fenêtre
         options_frame = ttk.Frame(self.controls_frame)
-        options_frame.grid(row=2, column=0, columnspan=3, sticky="w", padx=5, pady=5)
+        options_frame.grid(row=3, column=0, columnspan=3, sticky="w", padx=5, pady=5)
         
         # Mode arrière-plan (détection même sans avoir le focus)
         self.background_mode_var = tk.BooleanVar(value=True)
@@ -102,6 +164,25 @@ class HopperGUI:
         )
         window_check.pack(anchor="w", pady=2)
         
+        # Plusieurs clients CoinPoker ouverts côte à côte (un par compte)
+        self.all_windows_var = tk.BooleanVar(value=False)
+        all_windows_check = ttk.Checkbutton(
+            options_frame,
+            text="Surveiller toutes les fenêtres CoinPoker ouvertes",
+            variable=self.all_windows_var
+        )
+        all_windows_check.pack(anchor="w", pady=2)
+        
+        # Profilage à la demande, sans redémarrage (fichiers dans logs/)
+        self.profile_var = tk.BooleanVar(value=get_profiler().enabled)
+        profile_check = ttk.Checkbutton(
+            options_frame,
+            text="Profiler la surveillance (flame graph dans logs/)",
+            variable=self.profile_var,
+            command=self.toggle_profiling
+        )
+        profile_check.pack(anchor="w", pady=2)
+        
         # Info bulle explicative
         info_text = "Le mode arrière-plan permet de détecter les tournois même lorsque la fenêtre CoinPoker est cachée\n" \
                    "derrière d'autres fenêtres. La fenêtre sera remise au premier plan uniquement lorsqu'une\n" \
@@ -111,7 +192,7 @@ class HopperGUI:
         
         # Boutons de contrôle
         control_buttons_frame = ttk.Frame(self.controls_frame)
-        control_buttons_frame.grid(row=3, column=0, columnspan=3, pady=10)
+        control_buttons_frame.grid(row=4, column=0, columnspan=3, pady=10)
         
         self.start_button = ttk.Button(control_buttons_frame, text="Démarrer", command=self.start_hopper)
         self.start_button.pack(side="left", padx=5)
@@ -146,6 +227,39 @@ class HopperGUI:
             self.hopper.set_background_mode(background_mode)
             self.update_status(f"Mode de détection en arrière-plan {'activé' if background_mode else 'désactivé'}")
     
+    def toggle_profiling(self):
+        """Démarre ou arrête le profilage de toutes les surveillances en cours"""
+        profiler = get_profiler()
+        if self.profile_var.get():
+            profiler.start()
+            self.update_status("Profilage démarré")
+        else:
+            for path in profiler.stop():
+                self.update_status(f"Profil enregistré: {path}")
+    
+    def switch_template_profile(self, event=None):
+        """Active le paquet du profil choisi; les surveillances en cours recompilent leur plan au cycle suivant"""
+        profile = self.profile_name_var.get()
+        if not profile or profile == self.template_profile:
+            return
+        
+        from utils.template_bundle import activate_profile
+        bundle = activate_profile(profile)
+        if bundle is None:
+            self.update_status(f"Impossible d'activer le profil d'images '{profile}'")
+            self.profile_name_var.set(self.template_profile or "")
+            return
+        
+        self.template_profile = profile
+        self.update_status(f"Profil d'images actif: {bundle.describe()}")
+    
+    def refresh_profiling(self):
+        """Synchronise la case du profilage avec l'état du profileur"""
+        enabled = get_profiler().enabled
+        if self.profile_var.get() != enabled:
+            self.profile_var.set(enabled)
+        self.root.after(PROFILER_POLL_MS, self.refresh_profiling)
+    
     def update_status(self, message):
         """Met à jour la zone de statut avec un nouveau message"""
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -216,9 +330,8 @@ class HopperGUI:
             messagebox.showwarning("Aucune sélection", "Veuillez sélectionner un tournoi pour configurer les images.")
             return
         
-        # Initialiser le hopper avec le tournoi sélectionné
-        self.hopper = CoinPokerHopper(selected_tournament)
-        self.hopper.set_status_callback(self.update_status)
+        # Hopper du tournoi sélectionné (réutilisé s'il existe déjà)
+        self.get_hopper(selected_tournament)
         self.hopper.set_background_mode(self.background_mode_var.get())
         
         # Lancer la configuration des images
@@ -250,17 +363,34 @@ class HopperGUI:
             messagebox.showwarning("Paramètre invalide", "L'intervalle doit être un nombre.")
             return
         
-        # Initialiser le hopper avec le tournoi sélectionné
-        self.hopper = CoinPokerHopper(selected_tournament)
-        self.hopper.set_status_callback(self.update_status)
+        try:
+            capture_fps = float(self.capture_fps_var.get().strip())
+            if capture_fps < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Paramètre invalide", "Le nombre de captures par seconde doit être un nombre positif ou nul.")
+            return
+        
+        if self.all_windows_var.get():
+            if not self.start_window_hoppers(selected_tournament, max_attempts, check_interval, capture_fps):
+                return
+            self.start_button.config(state="disabled")
+            self.stop_button.config(state="normal")
+            self.setup_button.config(state="disabled")
+            return
+        
+        # Hopper du tournoi sélectionné (réutilisé s'il existe déjà)
+        self.get_hopper(selected_tournament)
         self.hopper.check_interval = check_interval
+        self.hopper.capture_fps = capture_fps
         
         # Configurer le mode de détection en arrière-plan
         background_mode = self.background_mode_var.get()
         self.hopper.set_background_mode(background_mode)
         self.update_status(f"Mode de détection en arrière-plan {'activé' if background_mode else 'désactivé'}")
         
-        # Démarrer le hopper dans un thread séparé
+        # Démarrer le hopper dans un thread séparé (un arrêt demandé avant son démarrage est conservé)
+        self.hopper.arm()
         self.hopper_thread = threading.Thread(target=self.hopper.run, args=(max_attempts,))
         self.hopper_thread.daemon = True
         self.hopper_thread.start()
@@ -279,10 +409,48 @@ class HopperGUI:
         
         self.update_status(f"Hopper démarré pour le tournoi '{selected_tournament}'.")
     
+    def start_window_hoppers(self, tournament_name, max_attempts, check_interval, capture_fps):
+        """
+        Démarre un hopper par fenêtre CoinPoker ouverte, dans la boucle de surveillances partagée
+        
+        :return: True si au moins une fenêtre est surveillée, False sinon
+        """
+        from window_registry import WindowRegistry
+        from async_hopper import AsyncCoinPokerHopper, WatcherLoop
+        
+        if self.window_registry is None:
+            self.window_registry = WindowRegistry()
+        hoppers = self.window_registry.create_hoppers(
+            tournament_name, hopper_class=AsyncCoinPokerHopper, capture_fps=capture_fps
+        )
+        if not hoppers:
+            messagebox.showwarning("Aucune fenêtre", "Aucune fenêtre CoinPoker ouverte n'a été trouvée.")
+            return False
+        
+        background_mode = self.background_mode_var.get()
+        for index, hopper in enumerate(hoppers, start=1):
+            label = f"Fenêtre {index}"
+            hopper.set_status_callback(lambda message, label=label: self.update_status(f"[{label}] {message}"))
+            hopper.check_interval = check_interval
+            hopper.set_background_mode(background_mode)
+        
+        # Une seule boucle d'événements pour toutes les fenêtres, créée au premier démarrage
+        if self.watcher_loop is None:
+            self.watcher_loop = WatcherLoop()
+        for hopper in hoppers:
+            self.watcher_loop.add(hopper, max_attempts)
+        self.window_hoppers = hoppers
+        
+        self.update_status(f"Hopper démarré pour le tournoi '{tournament_name}' dans {len(hoppers)} fenêtres CoinPoker.")
+        return True
+    
     def stop_hopper(self):
         """Arrête le hopper en cours d'exécution"""
-        if self.hopper and hasattr(self.hopper, 'running') and self.hopper.running:
-            self.hopper.stop()
+        running = [hopper for hopper in [self.hopper] + self.window_hoppers if hopper and hopper.running]
+        if running:
+            for hopper in running:
+                hopper.stop()
+            self.window_hoppers = []
             
             # Mettre à jour l'interface
             self.start_button.config(state="normal")
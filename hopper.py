@@ -6,44 +6,102 @@ import os
 import time
 import json
 import logging
-import pyautogui
+import threading
 import tkinter as tk
-from datetime import datetime
-import cv2
+
 import numpy as np
-from PIL import Image
 
 from window_manager import WindowManager
-from utils.image_utils import take_screenshot, find_on_screen, click_on_image, find_all_on_screen
-from utils.config_utils import save_tournament_offsets, load_tournament_offsets
+from input_dispatcher import (
+    get_input_dispatcher, PRIORITY_REGISTER, PRIORITY_NAVIGATION, PRIORITY_SCROLL, PRIORITY_REFOCUS
+)
+from utils.image_utils import (
+    find_on_screen, click_on_image, capture_frame, find_all_in_frame, find_rows_in_frame, check_regions_in_frame,
+    attach_frame_grabber, detach_frame_grabber
+)
+from utils.config_utils import save_tournament_offsets
+from utils.latency_tracker import LatencyTracker
+from utils.profiling import get_profiler
+from utils.scheduler import load_schedule
+from utils.frame_archive import (
+    get_frame_archive, OUTCOME_REGISTERED, OUTCOME_REGISTRATION_FAILED, OUTCOME_NOT_FOUND, OUTCOME_NAVIGATION_FAILED,
+    OUTCOME_NO_WINDOW, OUTCOME_ERROR
+)
+from backends import get_backend
+from state_watchdog import Watchdog
+from detection_plan import compile_detection_plan, tournament_file_prefix, STRATEGY_OFFSETS, STRATEGY_SAME_ROW, STRATEGY_CLICK_THEN_SEARCH
 
 logger = logging.getLogger("coinpoker_hopper")
 
+# Nombre maximal de nouveaux essais immédiats consécutifs après une récupération du watchdog
+MAX_IMMEDIATE_RETRIES = 3
+
+# Étapes facultatives de l'assistant de configuration: images des états du client (voir state_watchdog)
+STATE_IMAGE_STEPS = (
+    ("error_ok_button.png", "Bouton OK de la fenêtre d'erreur",
+     "si une fenêtre d'erreur est affichée, positionnez votre souris sur son bouton OK"),
+    ("cancel_button.png", "Bouton d'annulation du dialogue d'inscription",
+     "ouvrez le dialogue d'inscription d'un tournoi et positionnez votre souris sur son bouton d'annulation"),
+    ("table_lobby_button.png", "Bouton de retour au lobby d'une table",
+     "ouvrez une fenêtre de table et positionnez votre souris sur son bouton de retour au lobby"),
+    ("login_button.png", "Bouton de connexion",
+     "si l'écran de connexion est affiché, positionnez votre souris sur son bouton de connexion"),
+)
+
 class CoinPokerHopper:
-    def __init__(self, tournament_name):
+    def __init__(self, tournament_name, window_manager=None):
         """
         Initialise le hopper CoinPoker pour rechercher un tournoi spécifique
         
         :param tournament_name: Nom du tournoi à rechercher et rejoindre
+        :param window_manager: WindowManager de la fenêtre à surveiller (None = première fenêtre CoinPoker trouvée)
         """
         self.tournament_name = tournament_name
         self.check_interval = 5  # secondes entre chaque vérification
+        # Captures continues par seconde en mode arrière-plan (0 = capture à chaque cycle uniquement)
+        self.capture_fps = 0
+        # Décalage de la première capture continue (plusieurs fenêtres, voir WindowRegistry.capture_phase)
+        self.capture_phase = 0.0
         self.screenshots_dir = "resources/screenshots"
         self.images_dir = "resources/images"
         self.running = False
         self.status_callback = None
+        # Interrompt immédiatement toutes les attentes lorsque l'arrêt est demandé
+        self._stop_event = threading.Event()
+        # Session créée (voir arm) et pas encore terminée
+        self._armed = False
         
         # Initialiser le gestionnaire de fenêtres
-        self.window_manager = WindowManager()
+        self.window_manager = window_manager or WindowManager()
+        self.window_manager.stop_event = self._stop_event
+        # Toutes les actions souris et focus passent par le dispatcher d'entrées partagé
+        self.input_dispatcher = get_input_dispatcher()
         self.background_mode = True  # Activer la détection en arrière-plan par défaut
+        # Plan de détection, compilé au démarrage de la surveillance
+        self.plan = None
+        # Suivi de la latence d'inscription: instant de la première capture montrant
+        # le tournoi inscriptible, et jalons de l'inscription en cours
+        self.latency_tracker = LatencyTracker()
+        self._registering_seen_at = None
+        self._registration_timing = None
+        # Position du tournoi repérée par la capture continue entre deux cycles
+        self._pending_position = None
+        # Calendrier d'ouverture des inscriptions (None = surveillance continue, voir utils.scheduler)
+        self.schedule = None
+        self._scheduled_interval = None
+        # Reconnaissance de l'état du client et récupération après un échec (voir state_watchdog)
+        self.watchdog = Watchdog(self)
+        # Nouveaux essais immédiats consécutifs (bornés par MAX_IMMEDIATE_RETRIES)
+        self._immediate_retries = 0
+        # Résultat du cycle en cours, enregistré avec ses captures dans l'archive (voir utils.frame_archive)
+        self._cycle_outcome = None
         
         # Créer les dossiers nécessaires s'ils n'existent pas
         os.makedirs(self.screenshots_dir, exist_ok=True)
         os.makedirs(self.images_dir, exist_ok=True)
         
-        # Tentative initiale de trouver la fenêtre CoinPoker
-        if not self.window_manager.find_coinpoker_window():
-            logger.warning("Fenêtre CoinPoker non trouvée lors de l'initialisation")
+        # La fenêtre CoinPoker est recherchée au démarrage de la surveillance (voir start_run)
+        # ou à la première action qui en a besoin, pas à la création du hopper
     
     def set_status_callback(self, callback):
         """Définit une fonction de rappel pour mettre à jour le statut dans l'interface"""
@@ -60,14 +118,18 @@ class CoinPokerHopper:
         self.background_mode = enabled
         self.update_status(f"Mode de détection en arrière-plan {'activé' if enabled else 'désactivé'}")
     
-    def focus_coinpoker_window(self):
-        """Tente de mettre la fenêtre CoinPoker au premier plan"""
+    def focus_coinpoker_window(self, priority=PRIORITY_NAVIGATION):
+        """
+        Tente de mettre la fenêtre CoinPoker au premier plan
+        
+        :param priority: Priorité de la demande dans le dispatcher d'entrées
+        """
         try:
-            result = self.window_manager.focus_coinpoker_window()
+            result = self.window_manager.focus_coinpoker_window(priority=priority)
             if result:
                 self.update_status("Fenêtre CoinPoker mise au premier plan")
-                time.sleep(0.5)  # Petit délai pour s'assurer que la fenêtre est bien active
-                return True
+                # Délai d'affichage déjà attendu par le WindowManager; False si l'arrêt a été demandé entre-temps
+                return not self._stop_event.is_set()
             else:
                 # Fallback : essayer l'ancienne méthode avec le logo
                 logo_path = f"{self.images_dir}/coinpoker_logo.png"
@@ -75,9 +137,10 @@ class CoinPokerHopper:
                     coinpoker_logo = find_on_screen(logo_path)
                     
                     if coinpoker_logo:
-                        pyautogui.click(coinpoker_logo)
+                        self.input_dispatcher.click(coinpoker_logo, priority=priority)
                         self.update_status("Fenêtre CoinPoker mise au premier plan (méthode fallback)")
-                        time.sleep(0.5)
+                        if not self._wait(0.5):
+                            return False
                         # Mettre à jour la position de la fenêtre après l'avoir trouvée
                         self.window_manager.find_coinpoker_window()
                         return True
@@ -88,22 +151,105 @@ class CoinPokerHopper:
             self.update_status(f"Erreur lors de la mise au premier plan: {str(e)}")
             return False
     
+    def compile_plan(self):
+        """
+        Compile le plan de détection du tournoi (images, offsets, stratégie, seuils)
+        
+        :return: Instance de DetectionPlan
+        """
+        self.plan = compile_detection_plan(self.tournament_name, self.images_dir)
+        self.update_status(f"Plan de détection: {self.plan.describe()}")
+        return self.plan
+    
+    def refresh_plan(self):
+        """
+        Recompile le plan et les marqueurs d'état si le profil d'images a changé depuis leur compilation
+        
+        Appelé au début de chaque cycle: un changement de profil en cours de surveillance
+        (voir utils.template_bundle.activate_profile) est pris en compte dès le cycle suivant.
+        
+        :return: True si le plan a été recompilé
+        """
+        if self.plan is None or not self.plan.is_stale():
+            return False
+        timings = self.plan.timings
+        self.update_status("Profil d'images changé, recompilation du plan de détection")
+        self.compile_plan()
+        self.plan.timings = timings
+        self.watchdog.compile(self.images_dir)
+        self._pending_position = None
+        return True
+    
+    def get_plan(self):
+        """Retourne le plan de détection, en le compilant à la première utilisation"""
+        if self.plan is None:
+            self.compile_plan()
+        return self.plan
+    
+    def _search_window_manager(self):
+        """WindowManager à utiliser pour les recherches (None = écran visible)"""
+        return self.window_manager if self.background_mode else None
+    
+    def _capture(self):
+        """
+        Capture la zone de recherche: la fenêtre en mode arrière-plan, l'écran visible sinon
+        
+        :return: Tuple (image BGR, window_manager ayant servi à la capture ou None, instant de la capture)
+        """
+        window_manager = self._search_window_manager()
+        if window_manager is not None and not window_manager.window_rect:
+            window_manager = None
+        
+        # Dernière capture continue si elle est récente
+        if window_manager is not None and window_manager.frame_grabber is not None:
+            latest = window_manager.frame_grabber.fresh()
+            if latest is not None:
+                return latest.image, window_manager, latest.timestamp
+        
+        captured_at = time.perf_counter()
+        frame = capture_frame(window_manager)
+        if frame is None:
+            # Capture de la fenêtre impossible: recherche sur tout l'écran
+            window_manager = None
+            captured_at = time.perf_counter()
+            frame = capture_frame()
+        return frame, window_manager, captured_at
+    
+    def _find_all(self, image_path, confidence, frame=None, source=None):
+        """
+        Cherche toutes les occurrences d'une image, selon le mode de détection
+        
+        :param frame: Capture BGR déjà effectuée (voir _capture), réutilisée si fournie
+        :param source: WindowManager ayant effectué la capture (None = écran)
+        """
+        if frame is None:
+            frame, source, _ = self._capture()
+        return find_all_in_frame(frame, image_path, confidence, source)
+    
+    def _click_image(self, image_path, priority=PRIORITY_NAVIGATION, first_hit=True):
+        """
+        Cherche et clique sur une image, selon le mode de détection
+        
+        :param first_hit: True pour les images présentes au plus une fois (arrêt à la première correspondance
+                          franche); False pour les images présentes plusieurs fois (meilleure correspondance)
+        """
+        if image_path is None:
+            return None
+        return click_on_image(image_path, window_manager=self._search_window_manager(), priority=priority,
+                              first_hit=first_hit)
+    
     def navigate_to_tournaments(self):
         """Navigue vers l'onglet des tournois"""
+        plan = self.get_plan()
         try:
             # Cliquer sur l'onglet Tournaments
-            if self.background_mode:
-                tournaments_tab = click_on_image(
-                    f"{self.images_dir}/tournaments_tab.png", 
-                    window_manager=self.window_manager
-                )
-            else:
-                tournaments_tab = click_on_image(f"{self.images_dir}/tournaments_tab.png")
+            with plan.timed("navigation"):
+                tournaments_tab = self._click_image(plan.tournaments_tab_image)
             
             if tournaments_tab:
                 self.update_status("Navigation vers l'onglet tournois réussie")
-                time.sleep(1)  # Attendre le chargement de la page
-                return True
+                # Attendre le chargement de la page (False si l'arrêt est demandé)
+                return self._wait(1)
             else:
                 self.update_status("Bouton Tournaments non trouvé")
                 return False
@@ -111,348 +257,275 @@ class CoinPokerHopper:
             self.update_status(f"Erreur lors de la navigation vers les tournois: {str(e)}")
             return False
     
-    def find_tournament_in_list(self):
+    def _buttons_at_offsets(self, tournament_positions, frame, source):
+        """
+        Vérifie, en une seule passe sur la capture courante, la présence du bouton
+        REGISTERING à la position déduite des offsets de chaque occurrence
+        
+        :param tournament_positions: Detections des occurrences du tournoi (coordonnées écran)
+        :param frame: Capture BGR courante
+        :param source: WindowManager ayant effectué la capture (None = écran)
+        :return: Liste de booléens, un par occurrence
+        """
+        plan = self.plan
+        # En mode arrière-plan, seul le bouton spécifique au tournoi est vérifié;
+        # sinon, le bouton spécifique ou à défaut le bouton générique
+        button_image = plan.specific_button_image if self.background_mode else plan.button_check_image
+        if not button_image:
+            return [False] * len(tournament_positions)
+        
+        # Positions écran des boutons déduites des offsets du tournoi
+        expected_positions = tournament_positions.translate(plan.offsets["x_offset"], plan.offsets["y_offset"])
+        return check_regions_in_frame(
+            frame, expected_positions, button_image, plan.button_check_confidence, source
+        )
+    
+    def find_tournament_in_list(self, frame=None, source=None, captured_at=None, report=True):
         """
         Recherche le tournoi dans la liste visible à l'écran et vérifie que le bouton REGISTERING est disponible
         
+        :param frame: Capture BGR à analyser (None = nouvelle capture)
+        :param source: WindowManager ayant effectué la capture (None = écran)
+        :param captured_at: Instant (time.perf_counter) de la capture fournie
+        :param report: Si False, les messages de statut ne sont que journalisés (analyse des captures continues)
         :return: Position (x, y) du tournoi si trouvé et inscriptible, None sinon
         """
+        plan = self.get_plan()
+        status = self.update_status if report else logger.debug
         try:
             # Chercher toutes les occurrences du nom du tournoi
-            tournament_image = f"{self.images_dir}/{self.tournament_name.lower().replace(' ', '_')}.png"
-            
-            if not os.path.exists(tournament_image):
-                self.update_status(f"Image de référence pour le tournoi '{self.tournament_name}' non trouvée")
+            if not plan.tournament_image:
+                status(f"Image de référence pour le tournoi '{self.tournament_name}' non trouvée")
                 return None
             
-            if self.background_mode:
-                # En mode arrière-plan, utiliser le window_manager pour la recherche
-                tournament_positions = find_all_on_screen(
-                    tournament_image, 
-                    confidence=0.8, 
-                    window_manager=self.window_manager
-                )
-            else:
-                # En mode normal, rechercher sur l'écran visible
-                tournament_positions = [
-                    pyautogui.center(pos) for pos in list(
-                        pyautogui.locateAllOnScreen(tournament_image, confidence=0.8)
-                    )
-                ]
+            # Une seule capture (fenêtre ou écran) sert à toutes les recherches de ce cycle
+            if frame is None:
+                with plan.timed("capture"):
+                    frame, source, captured_at = self._capture()
+            
+            with plan.timed("recherche_tournoi"):
+                if plan.name_fingerprint is not None:
+                    # Index des lignes de la capture partagé par tous les tournois surveillés
+                    tournament_positions = find_rows_in_frame(frame, plan.name_fingerprint, source, plan.rival_fingerprints)
+                else:
+                    tournament_positions = self._find_all(plan.tournament_image, plan.tournament_confidence, frame, source)
             
             if not tournament_positions:
-                self.update_status(f"Tournoi '{self.tournament_name}' non trouvé dans la liste actuelle")
+                status(f"Tournoi '{self.tournament_name}' non trouvé dans la liste actuelle")
                 return None
                 
-            self.update_status(f"Trouvé {len(tournament_positions)} occurrences du tournoi '{self.tournament_name}'")
+            status(
+                f"Trouvé {len(tournament_positions)} occurrences du tournoi '{self.tournament_name}' "
+                f"(score max {float(tournament_positions.scores.max()):.3f})"
+            )
             
-            # Pour chaque occurrence du tournoi, vérifier si un bouton REGISTERING est disponible sur la même ligne
-            for tournament_center in tournament_positions:
-                tournament_y = tournament_center[1]
-                
-                self.update_status(f"Vérification de l'occurrence à la position {tournament_center}")
-                
-                # Vérifier s'il existe des offsets spécifiques pour ce tournoi
-                offsets = load_tournament_offsets(self.tournament_name)
-                
-                if offsets:
-                    # Utiliser les offsets préconfigurés pour vérifier si le bouton est disponible
-                    expected_button_x = tournament_center[0] + offsets["x_offset"]
-                    expected_button_y = tournament_center[1] + offsets["y_offset"]
-                    expected_button_position = (expected_button_x, expected_button_y)
-                    
-                    # En mode arrière-plan, convertir en coordonnées relatives si nécessaire
-                    if self.background_mode and self.window_manager.window_rect:
-                        relative_pos = self.window_manager.convert_to_window_coordinates(
-                            expected_button_x, expected_button_y
-                        )
-                        if relative_pos:
-                            rel_x, rel_y = relative_pos
-                            # Prendre une petite capture autour de cette position
-                            window_image = self.window_manager.capture_window_area()
-                            if window_image:
-                                # Extraire la région d'intérêt
-                                region_x = max(0, rel_x - 50)
-                                region_y = max(0, rel_y - 10)
-                                region_width = 100
-                                region_height = 20
-                                
-                                region = window_image.crop((
-                                    region_x, 
-                                    region_y, 
-                                    min(window_image.width, region_x + region_width), 
-                                    min(window_image.height, region_y + region_height)
-                                ))
-                                
-                                # Sauvegarder pour vérification
-                                region_path = f"{self.screenshots_dir}/button_check_temp.png"
-                                region.save(region_path)
-                                
-                                # Vérifier si cette région contient un bouton REGISTERING
-                                specific_button_file = f"{self.images_dir}/{self.tournament_name.lower().replace(' ', '_')}_register_button.png"
-                                
-                                if os.path.exists(specific_button_file):
-                                    # Utiliser OpenCV pour la correspondance de template
-                                    needle = Image.open(specific_button_file)
-                                    haystack_cv = cv2.cvtColor(np.array(region), cv2.COLOR_RGB2BGR)
-                                    needle_cv = cv2.cvtColor(np.array(needle), cv2.COLOR_RGB2BGR)
-                                    
-                                    result = cv2.matchTemplate(haystack_cv, needle_cv, cv2.TM_CCOEFF_NORMED)
-                                    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-                                    
-                                    if max_val >= 0.7:
-                                        self.update_status(f"Bouton REGISTERING trouvé pour l'occurrence du tournoi à {tournament_center}")
-                                        return tournament_center
-                    
-                    # Si on n'a pas pu vérifier en mode arrière-plan ou si le mode est désactivé
-                    if not self.background_mode:
-                        # Prendre une petite capture d'écran autour de cette position pour vérifier
-                        region = (
-                            expected_button_x - 50, 
-                            expected_button_y - 10, 
-                            100, 
-                            20
-                        )
-                        
-                        try:
-                            # Vérifier si cette région contient un bouton REGISTERING
-                            button_region = pyautogui.screenshot(region=region)
-                            button_region.save(f"{self.screenshots_dir}/button_check_temp.png")
-                            
-                            # Comparer avec l'image de référence du bouton REGISTERING
-                            specific_button_file = f"{self.images_dir}/{self.tournament_name.lower().replace(' ', '_')}_register_button.png"
-                            
-                            if os.path.exists(specific_button_file):
-                                # Comparer avec le bouton spécifique
-                                register_pos = pyautogui.locate(
-                                    specific_button_file, 
-                                    f"{self.screenshots_dir}/button_check_temp.png", 
-                                    confidence=0.7
-                                )
-                            else:
-                                # Comparer avec le bouton générique
-                                register_pos = pyautogui.locate(
-                                    f"{self.images_dir}/registering_button.png", 
-                                    f"{self.screenshots_dir}/button_check_temp.png", 
-                                    confidence=0.7
-                                )
-                            
-                            if register_pos:
-                                self.update_status(f"Bouton REGISTERING trouvé pour l'occurrence du tournoi à {tournament_center}")
-                                return tournament_center
-                        except:
-                            pass
-                
-                # Méthode alternative : rechercher un bouton REGISTERING sur la même ligne
-                registering_button_image = f"{self.images_dir}/registering_button.png"
-                if not os.path.exists(registering_button_image):
-                    self.update_status("Image de référence pour le bouton REGISTERING non trouvée")
-                    return None
-                
-                if self.background_mode:
-                    # En mode arrière-plan, utiliser le window_manager pour la recherche
-                    all_registering_buttons = find_all_on_screen(
-                        registering_button_image, 
-                        confidence=0.8, 
-                        window_manager=self.window_manager
-                    )
-                else:
-                    # En mode normal, rechercher sur l'écran visible
-                    all_registering_buttons = [
-                        pyautogui.center(pos) for pos in list(
-                            pyautogui.locateAllOnScreen(registering_button_image, confidence=0.8)
-                        )
-                    ]
+            # Vérification des offsets de toutes les occurrences en une passe sur la capture courante
+            if plan.offsets:
+                with plan.timed("verification_bouton"):
+                    offset_hits = self._buttons_at_offsets(tournament_positions, frame, source)
                 
-                if all_registering_buttons:
-                    # Trouver le bouton le plus proche sur la même ligne (± 20 pixels)
-                    for button_center in all_registering_buttons:
-                        y_diff = abs(button_center[1] - tournament_y)
-                        
-                        if y_diff < 20:  # Tolérance de 20 pixels verticalement
-                            self.update_status(f"Bouton REGISTERING trouvé sur la même ligne pour l'occurrence du tournoi à {tournament_center}")
-                            return tournament_center
-            
-            self.update_status(f"Aucune occurrence du tournoi '{self.tournament_name}' avec bouton REGISTERING disponible trouvée")
+                # Utiliser les offsets préconfigurés pour vérifier si le bouton est disponible
+                if any(offset_hits):
+                    tournament_center = tournament_positions[offset_hits.index(True)]
+                    status(f"Bouton REGISTERING trouvé pour l'occurrence du tournoi à {tournament_center}")
+                    return self._registering_seen(tournament_center, captured_at)
+            
+            # Méthode alternative : rechercher un bouton REGISTERING sur la même ligne
+            if not plan.registering_button_image:
+                status("Image de référence pour le bouton REGISTERING non trouvée")
+                return None
+            
+            with plan.timed("recherche_boutons"):
+                all_registering_buttons = self._find_all(plan.registering_button_image, plan.registering_confidence, frame, source)
+            
+            # Apparier toutes les occurrences aux boutons de la même ligne (± tolérance verticale) en une opération
+            matches = tournament_positions.join_by_row(all_registering_buttons, plan.row_tolerance)
+            matched = np.flatnonzero(matches >= 0)
+            if len(matched):
+                tournament_center = tournament_positions[int(matched[0])]
+                status(f"Bouton REGISTERING trouvé sur la même ligne pour l'occurrence du tournoi à {tournament_center}")
+                return self._registering_seen(tournament_center, captured_at)
+            
+            status(f"Aucune occurrence du tournoi '{self.tournament_name}' avec bouton REGISTERING disponible trouvée")
             return None
                 
         except Exception as e:
-            self.update_status(f"Erreur lors de la recherche du tournoi: {str(e)}")
+            status(f"Erreur lors de la recherche du tournoi: {str(e)}")
             return None
     
+    def _registering_seen(self, tournament_center, captured_at):
+        """Retient l'instant de la première capture montrant le tournoi inscriptible"""
+        if self._registering_seen_at is None:
+            self._registering_seen_at = captured_at
+        return tournament_center
+    
+    def _mark_registration(self, name):
+        """Enregistre un jalon de l'inscription en cours (voir utils.latency_tracker)"""
+        if self._registration_timing is not None:
+            self._registration_timing.mark(name)
+    
     def register_for_tournament(self, tournament_position):
         """
         Tente de s'inscrire au tournoi
         
+        Toute la séquence (focus, clics, confirmation) est exécutée dans une session
+        du dispatcher d'entrées: aucun autre thread ne peut changer le focus ou
+        cliquer avant la fin de l'inscription.
+        
         :param tournament_position: Position (x, y) du tournoi dans la liste
         :return: True si réussi, False sinon
         """
+        plan = self.get_plan()
+        timing = self.latency_tracker.begin(self.tournament_name, self._registering_seen_at, plan.strategy)
+        timing.mark("detected")
+        self._registration_timing = timing
         try:
-            # Récupérer les offsets pour ce tournoi s'ils existent
-            offsets = load_tournament_offsets(self.tournament_name)
-            specific_button_file = f"{self.images_dir}/{self.tournament_name.lower().replace(' ', '_')}_register_button.png"
+            with self.input_dispatcher.session(), plan.timed("inscription"):
+                registered = self._register_for_tournament(tournament_position)
+        finally:
+            self._registration_timing = None
+        
+        if not registered:
+            outcome = "failed"
+        elif "accept_clicked" in timing.marks:
+            outcome = "confirmed"
+        else:
+            outcome = "no_confirmation"
+        self.latency_tracker.finish(timing, outcome)
+        
+        if registered:
+            self._registering_seen_at = None
+        return registered
+    
+    def _confirm_registration(self):
+        """Clique sur le bouton ACCEPT si une confirmation est nécessaire"""
+        # Arrêt demandé avant l'affichage du dialogue: inscription non confirmée
+        if not self._wait(1):
+            self.update_status("Arrêt demandé avant la confirmation de l'inscription")
+            return False
+        
+        with self.plan.timed("confirmation"):
+            accept_button = self._click_image(self.plan.accept_button_image, priority=PRIORITY_REGISTER)
+        
+        if accept_button:
+            self._mark_registration("accept_clicked")
+            self.update_status(f"Inscription au tournoi '{self.tournament_name}' confirmée!")
+        else:
+            self.update_status("Pas de bouton de confirmation trouvé, l'inscription peut être déjà complète")
+        return True
+    
+    def _click_then_search(self, tournament_position, failure_message):
+        """
+        Méthode 3: cliquer sur le tournoi puis chercher le bouton d'inscription
+        
+        :param tournament_position: Position (x, y) du tournoi dans la liste
+        :param failure_message: Message de statut si le bouton n'est pas trouvé
+        :return: True si réussi, False sinon
+        """
+        self.update_status("Tentative de clic sur le tournoi puis recherche du bouton d'inscription")
+        
+        with self.plan.timed(STRATEGY_CLICK_THEN_SEARCH):
+            self.input_dispatcher.click(tournament_position, priority=PRIORITY_REGISTER)
+            if not self._wait(0.5):
+                return False
             
+            # Chercher le bouton après avoir sélectionné le tournoi: un bouton par ligne inscriptible,
+            # la première correspondance franche serait celle de la ligne trouvée au cycle précédent
+            register_button = self._click_image(
+                self.plan.registering_button_image, priority=PRIORITY_REGISTER, first_hit=False
+            )
+        
+        if register_button:
+            self._mark_registration("register_clicked")
+            return self._confirm_registration()
+        
+        self.update_status(failure_message)
+        return False
+    
+    def _register_fallback(self, tournament_position, failure_message):
+        """
+        Applique la stratégie de repli du plan lorsque le bouton n'est pas trouvé sur la ligne du tournoi
+        
+        :param tournament_position: Position (x, y) du tournoi dans la liste
+        :param failure_message: Message de statut si le repli échoue
+        :return: True si réussi, False sinon
+        """
+        if self.plan.fallback == STRATEGY_CLICK_THEN_SEARCH:
+            return self._click_then_search(tournament_position, failure_message)
+        self.update_status(failure_message)
+        return False
+    
+    def _register_for_tournament(self, tournament_position):
+        """Séquence d'inscription, exécutée dans une session du dispatcher d'entrées"""
+        plan = self.plan
+        try:
             # En mode arrière-plan, mettre la fenêtre au premier plan avant de cliquer
             if self.background_mode:
-                self.focus_coinpoker_window()
+                with plan.timed("focus"):
+                    self.focus_coinpoker_window(priority=PRIORITY_REGISTER)
+                if self._stop_event.is_set():
+                    return False
+                self._mark_registration("focused")
             
-            if offsets and os.path.exists(specific_button_file):
+            if plan.strategy == STRATEGY_OFFSETS:
                 # Méthode 1: Utiliser les offsets pré-configurés (méthode la plus précise)
                 self.update_status("Utilisation des offsets pré-configurés pour trouver le bouton d'inscription")
                 
                 # Calculer la position exacte du bouton en fonction des offsets
-                register_button_x = tournament_position[0] + offsets["x_offset"]
-                register_button_y = tournament_position[1] + offsets["y_offset"]
+                register_button_x = tournament_position[0] + plan.offsets["x_offset"]
+                register_button_y = tournament_position[1] + plan.offsets["y_offset"]
                 register_button_position = (register_button_x, register_button_y)
                 
                 self.update_status(f"Position calculée du bouton: {register_button_position}")
                 
                 # Cliquer sur la position calculée
-                pyautogui.click(register_button_position)
-                time.sleep(1)
-                
-                # Chercher le bouton ACCEPT si une confirmation est nécessaire
-                if self.background_mode:
-                    accept_button = click_on_image(f"{self.images_dir}/accept_button.png", window_manager=self.window_manager)
-                else:
-                    accept_button = click_on_image(f"{self.images_dir}/accept_button.png")
-                
-                if accept_button:
-                    self.update_status(f"Inscription au tournoi '{self.tournament_name}' confirmée!")
-                    return True
-                else:
-                    self.update_status("Pas de bouton de confirmation trouvé, l'inscription peut être déjà complète")
-                    return True
-                
-            else:
-                # Méthode 2: Rechercher spécifiquement le bouton REGISTERING sur la même ligne
-                self.update_status("Pas d'offsets pré-configurés, recherche du bouton REGISTERING sur la même ligne")
-                
-                # Récupérer la position Y du tournoi pour s'assurer de cliquer sur le bouton REGISTERING de la même ligne
-                tournament_y = tournament_position[1]
-                
-                # Chercher le bouton REGISTERING à droite du tournoi sur la même ligne
-                self.update_status(f"Recherche du bouton REGISTERING sur la ligne Y={tournament_y}")
-                
-                # Chercher tous les boutons REGISTERING visibles
-                registering_button_image = f"{self.images_dir}/registering_button.png"
-                if not os.path.exists(registering_button_image):
-                    self.update_status("Image de référence pour le bouton REGISTERING non trouvée")
-                    return False
-                
-                if self.background_mode:
-                    # En mode arrière-plan, utiliser le window_manager pour la recherche
-                    all_registering_buttons = find_all_on_screen(
-                        registering_button_image, 
-                        confidence=0.8, 
-                        window_manager=self.window_manager
-                    )
-                else:
-                    # En mode normal, rechercher sur l'écran visible
-                    all_registering_buttons = [
-                        pyautogui.center(pos) for pos in list(
-                            pyautogui.locateAllOnScreen(registering_button_image, confidence=0.8)
-                        )
-                    ]
-                
-                if all_registering_buttons:
-                    self.update_status(f"Trouvé {len(all_registering_buttons)} boutons REGISTERING au total")
-                    
-                    # Filtrer pour trouver celui qui est sur la même ligne que le nom du tournoi
-                    correct_button = None
-                    closest_y_diff = float('inf')
-                    
-                    for button_center in all_registering_buttons:
-                        y_diff = abs(button_center[1] - tournament_y)
-                        
-                        # Si ce bouton est plus proche verticalement que les précédents
-                        if y_diff < closest_y_diff and y_diff < 20:  # Tolérance de 20 pixels
-                            closest_y_diff = y_diff
-                            correct_button = button_center
-                    
-                    if correct_button:
-                        self.update_status(f"Bouton REGISTERING trouvé sur la même ligne à la position {correct_button}")
-                        
-                        # Cliquer sur le bouton correct
-                        pyautogui.click(correct_button)
-                        time.sleep(1)
-                        
-                        # Chercher le bouton ACCEPT si une confirmation est nécessaire
-                        if self.background_mode:
-                            accept_button = click_on_image(f"{self.images_dir}/accept_button.png", window_manager=self.window_manager)
-                        else:
-                            accept_button = click_on_image(f"{self.images_dir}/accept_button.png")
-                        
-                        if accept_button:
-                            self.update_status(f"Inscription au tournoi '{self.tournament_name}' confirmée!")
-                            return True
-                        else:
-                            self.update_status("Pas de bouton de confirmation trouvé, l'inscription peut être déjà complète")
-                            return True
-                    else:
-                        self.update_status("Aucun bouton REGISTERING trouvé sur la même ligne que le tournoi")
-                        
-                        # Méthode 3: Dernière alternative - cliquer sur le tournoi puis chercher le bouton
-                        self.update_status("Tentative de clic sur le tournoi puis recherche du bouton d'inscription")
-                        pyautogui.click(tournament_position)
-                        time.sleep(0.5)
-                        
-                        # Essayer à nouveau de trouver le bouton après avoir sélectionné le tournoi
-                        if self.background_mode:
-                            register_button = click_on_image(f"{self.images_dir}/registering_button.png", window_manager=self.window_manager)
-                        else:
-                            register_button = click_on_image(f"{self.images_dir}/registering_button.png")
-                        
-                        if register_button:
-                            time.sleep(1)
-                            
-                            # Chercher le bouton ACCEPT si une confirmation est nécessaire
-                            if self.background_mode:
-                                accept_button = click_on_image(f"{self.images_dir}/accept_button.png", window_manager=self.window_manager)
-                            else:
-                                accept_button = click_on_image(f"{self.images_dir}/accept_button.png")
-                            
-                            if accept_button:
-                                self.update_status(f"Inscription au tournoi '{self.tournament_name}' confirmée!")
-                                return True
-                            else:
-                                self.update_status("Pas de bouton de confirmation trouvé, l'inscription peut être déjà complète")
-                                return True
-                        else:
-                            self.update_status("Bouton d'inscription non trouvé après sélection du tournoi")
-                            return False
-                else:
-                    self.update_status("Aucun bouton REGISTERING trouvé à l'écran")
-                    
-                    # Méthode 3: Essayer de cliquer sur le tournoi d'abord
-                    self.update_status("Tentative de clic sur le tournoi puis recherche du bouton d'inscription")
-                    pyautogui.click(tournament_position)
-                    time.sleep(0.5)
-                    
-                    # Chercher le bouton après avoir sélectionné le tournoi
-                    if self.background_mode:
-                        register_button = click_on_image(f"{self.images_dir}/registering_button.png", window_manager=self.window_manager)
-                    else:
-                        register_button = click_on_image(f"{self.images_dir}/registering_button.png")
-                    
-                    if register_button:
-                        time.sleep(1)
-                        
-                        # Chercher le bouton ACCEPT si une confirmation est nécessaire
-                        if self.background_mode:
-                            accept_button = click_on_image(f"{self.images_dir}/accept_button.png", window_manager=self.window_manager)
-                        else:
-                            accept_button = click_on_image(f"{self.images_dir}/accept_button.png")
-                        
-                        if accept_button:
-                            self.update_status(f"Inscription au tournoi '{self.tournament_name}' confirmée!")
-                            return True
-                        else:
-                            self.update_status("Pas de bouton de confirmation trouvé, l'inscription peut être déjà complète")
-                            return True
-                    else:
-                        self.update_status("Bouton d'inscription non trouvé même après sélection du tournoi")
-                        return False
+                self.input_dispatcher.click(register_button_position, priority=PRIORITY_REGISTER)
+                self._mark_registration("register_clicked")
+                return self._confirm_registration()
+            
+            # Méthode 2: Rechercher spécifiquement le bouton REGISTERING sur la même ligne
+            self.update_status("Pas d'offsets pré-configurés, recherche du bouton REGISTERING sur la même ligne")
+            
+            # Récupérer la position Y du tournoi pour s'assurer de cliquer sur le bouton REGISTERING de la même ligne
+            tournament_y = tournament_position[1]
+            
+            # Chercher le bouton REGISTERING à droite du tournoi sur la même ligne
+            self.update_status(f"Recherche du bouton REGISTERING sur la ligne Y={tournament_y}")
+            
+            if plan.strategy != STRATEGY_SAME_ROW:
+                self.update_status("Image de référence pour le bouton REGISTERING non trouvée")
+                return False
+            
+            # Chercher tous les boutons REGISTERING visibles
+            with plan.timed("recherche_boutons"):
+                all_registering_buttons = self._find_all(plan.registering_button_image, plan.registering_confidence)
+            
+            if not all_registering_buttons:
+                self.update_status("Aucun bouton REGISTERING trouvé à l'écran")
+                return self._register_fallback(
+                    tournament_position, "Bouton d'inscription non trouvé même après sélection du tournoi"
+                )
+            
+            self.update_status(f"Trouvé {len(all_registering_buttons)} boutons REGISTERING au total")
+            
+            # Boutons de la ligne du nom du tournoi (± tolérance verticale), puis le plus proche verticalement
+            row_buttons = all_registering_buttons.filter_band(tournament_y - plan.row_tolerance + 1, tournament_y + plan.row_tolerance)
+            if len(row_buttons) > 1:
+                self.update_status(f"{len(row_buttons)} boutons REGISTERING sur la ligne Y={tournament_y}, le plus proche est retenu")
+            correct_button = row_buttons.nearest_in_row(tournament_y, plan.row_tolerance)
+            
+            if not correct_button:
+                self.update_status("Aucun bouton REGISTERING trouvé sur la même ligne que le tournoi")
+                return self._register_fallback(
+                    tournament_position, "Bouton d'inscription non trouvé après sélection du tournoi"
+                )
+            
+            self.update_status(f"Bouton REGISTERING trouvé sur la même ligne à la position {correct_button}")
+            
+            # Cliquer sur le bouton correct
+            self.input_dispatcher.click(correct_button, priority=PRIORITY_REGISTER)
+            self._mark_registration("register_clicked")
+            return self._confirm_registration()
         except Exception as e:
             self.update_status(f"Erreur lors de l'inscription au tournoi: {str(e)}")
             return False
@@ -460,18 +533,19 @@ class CoinPokerHopper:
     def scroll_tournament_list(self):
         """Fait défiler la liste des tournois vers le bas"""
         try:
-            # Si en mode arrière-plan, mettre la fenêtre au premier plan avant de défiler
-            if self.background_mode:
-                self.focus_coinpoker_window()
-            
-            # Trouver la zone de la liste des tournois
-            # Pour simplifier, nous utiliserons une position approximative
-            
-            # Cliquer dans la liste pour la mettre au premier plan
-            pyautogui.click(x=400, y=500)  # Ajuster ces coordonnées selon l'interface
-            
-            # Faire défiler vers le bas
-            pyautogui.scroll(-300)  # Valeur négative pour défiler vers le bas
+            with self.input_dispatcher.session():
+                # Si en mode arrière-plan, mettre la fenêtre au premier plan avant de défiler
+                if self.background_mode:
+                    self.focus_coinpoker_window(priority=PRIORITY_SCROLL)
+                
+                # Trouver la zone de la liste des tournois
+                # Pour simplifier, nous utiliserons une position approximative
+                
+                # Cliquer dans la liste pour la mettre au premier plan
+                self.input_dispatcher.click(400, 500, priority=PRIORITY_SCROLL)  # Ajuster ces coordonnées selon l'interface
+                
+                # Faire défiler vers le bas
+                self.input_dispatcher.scroll(-300)  # Valeur négative pour défiler vers le bas
             
             self.update_status("Défilement de la liste des tournois effectué")
             return True
@@ -490,8 +564,8 @@ class CoinPokerHopper:
         if not os.path.exists(self.images_dir):
             os.makedirs(self.images_dir)
         
-        # Fonction pour afficher les instructions dans une fenêtre modale
-        def show_instruction(message, next_step):
+        # Fonction pour afficher les instructions dans une fenêtre modale (skip_step: étape facultative)
+        def show_instruction(message, next_step, skip_step=None):
             if parent_window:
                 dialog = tk.Toplevel(parent_window)
                 dialog.title("Instructions")
@@ -502,8 +576,12 @@ class CoinPokerHopper:
                 lbl = tk.Label(dialog, text=message, wraplength=530, justify="left", padx=10, pady=10)
                 lbl.pack(fill="both", expand=True)
                 
-                btn = tk.Button(dialog, text="Prêt", command=lambda: [dialog.destroy(), next_step()])
-                btn.pack(pady=10)
+                buttons = tk.Frame(dialog)
+                buttons.pack(pady=10)
+                btn = tk.Button(buttons, text="Prêt", command=lambda: [dialog.destroy(), next_step()])
+                btn.pack(side="left", padx=5)
+                if skip_step:
+                    tk.Button(buttons, text="Passer", command=lambda: [dialog.destroy(), skip_step()]).pack(side="left", padx=5)
                 
                 # Centrer la fenêtre
                 dialog.update_idletasks()
@@ -516,18 +594,22 @@ class CoinPokerHopper:
                 parent_window.wait_window(dialog)
             else:
                 print(message)
-                input("Appuyez sur Entrée quand vous êtes prêt...")
-                next_step()
+                if skip_step:
+                    answer = input("Appuyez sur Entrée quand vous êtes prêt, ou tapez 'p' pour passer...")
+                    (skip_step if answer.strip().lower() == "p" else next_step)()
+                else:
+                    input("Appuyez sur Entrée quand vous êtes prêt...")
+                    next_step()
         
         # Définir les étapes
         def capture_logo():
             # Donner du temps à l'utilisateur pour positionner la souris
             time.sleep(2)
-            logo_position = pyautogui.position()
+            logo_position = get_backend().position()
             
             # Capture une zone autour du curseur
             logo_region = (logo_position[0] - 20, logo_position[1] - 20, 40, 40)
-            logo_image = pyautogui.screenshot(region=logo_region)
+            logo_image = get_backend().screenshot(region=logo_region)
             logo_image.save(f"{self.images_dir}/coinpoker_logo.png")
             
             self.update_status("Logo CoinPoker capturé")
@@ -535,9 +617,9 @@ class CoinPokerHopper:
         
         def capture_tournaments():
             time.sleep(2)
-            tournaments_position = pyautogui.position()
+            tournaments_position = get_backend().position()
             tournaments_region = (tournaments_position[0] - 50, tournaments_position[1] - 15, 100, 30)
-            tournaments_image = pyautogui.screenshot(region=tournaments_region)
+            tournaments_image = get_backend().screenshot(region=tournaments_region)
             tournaments_image.save(f"{self.images_dir}/tournaments_tab.png")
             
             self.update_status("Onglet Tournaments capturé")
@@ -550,9 +632,9 @@ class CoinPokerHopper:
         
         def capture_registering():
             time.sleep(2)
-            registering_position = pyautogui.position()
+            registering_position = get_backend().position()
             registering_region = (registering_position[0] - 50, registering_position[1] - 10, 100, 20)
-            registering_image = pyautogui.screenshot(region=registering_region)
+            registering_image = get_backend().screenshot(region=registering_region)
             registering_image.save(f"{self.images_dir}/registering_button.png")
             
             self.update_status("Bouton REGISTERING capturé")
@@ -563,9 +645,9 @@ class CoinPokerHopper:
         
         def capture_accept():
             time.sleep(2)
-            accept_position = pyautogui.position()
+            accept_position = get_backend().position()
             accept_region = (accept_position[0] - 40, accept_position[1] - 15, 80, 30)
-            accept_image = pyautogui.screenshot(region=accept_region)
+            accept_image = get_backend().screenshot(region=accept_region)
             accept_image.save(f"{self.images_dir}/accept_button.png")
             
             self.update_status("Bouton ACCEPT capturé")
@@ -580,12 +662,12 @@ class CoinPokerHopper:
         
         def capture_tournament():
             time.sleep(2)
-            tournament_position = pyautogui.position()
+            tournament_position = get_backend().position()
             
             # Capturer une zone plus large autour du nom du tournoi pour une meilleure reconnaissance
             tournament_region = (tournament_position[0] - 150, tournament_position[1] - 10, 300, 20)
-            tournament_image = pyautogui.screenshot(region=tournament_region)
-            tournament_image.save(f"{self.images_dir}/{self.tournament_name.lower().replace(' ', '_')}.png")
+            tournament_image = get_backend().screenshot(region=tournament_region)
+            tournament_image.save(f"{self.images_dir}/{tournament_file_prefix(self.tournament_name)}.png")
             
             self.update_status(f"Tournoi '{self.tournament_name}' capturé")
             
@@ -599,7 +681,7 @@ class CoinPokerHopper:
         
         def capture_specific_register_button(tournament_position):
             time.sleep(2)
-            register_button_position = pyautogui.position()
+            register_button_position = get_backend().position()
             
             # Enregistrer la différence horizontale entre le nom du tournoi et son bouton REGISTERING
             x_offset = register_button_position[0] - tournament_position[0]
@@ -610,13 +692,41 @@ class CoinPokerHopper:
             
             # Capturer l'image du bouton spécifique
             register_button_region = (register_button_position[0] - 50, register_button_position[1] - 10, 100, 20)
-            register_button_image = pyautogui.screenshot(region=register_button_region)
-            register_button_image.save(f"{self.images_dir}/{self.tournament_name.lower().replace(' ', '_')}_register_button.png")
+            register_button_image = get_backend().screenshot(region=register_button_region)
+            register_button_image.save(f"{self.images_dir}/{tournament_file_prefix(self.tournament_name)}_register_button.png")
             
             self.update_status(f"Bouton REGISTERING spécifique au tournoi '{self.tournament_name}' capturé")
             self.update_status(f"Offset entre le nom du tournoi et son bouton: X={x_offset}, Y={y_offset}")
-            self.update_status("Configuration des images de référence terminée!")
             
+            # Les images et offsets ont changé: le plan sera recompilé
+            self.plan = None
+            
+            capture_state_images(list(STATE_IMAGE_STEPS))
+        
+        def capture_state_images(steps, number=8):
+            # Étapes facultatives: images de reconnaissance de l'état du client (voir state_watchdog)
+            if not steps:
+                finish()
+                return
+            (filename, label, message), rest = steps[0], steps[1:]
+            
+            def capture():
+                time.sleep(2)
+                position = get_backend().position()
+                region = (position[0] - 40, position[1] - 15, 80, 30)
+                get_backend().screenshot(region=region).save(f"{self.images_dir}/{filename}")
+                self.update_status(f"{label} capturé")
+                capture_state_images(rest, number + 1)
+            
+            show_instruction(
+                f"{number}. Facultatif: {message}, puis cliquez sur 'Prêt'. Cliquez sur 'Passer' si cet écran n'est pas "
+                f"disponible pour le moment.",
+                capture,
+                skip_step=lambda: capture_state_images(rest, number + 1)
+            )
+        
+        def finish():
+            self.update_status("Configuration des images de référence terminée!")
             if parent_window:
                 tk.messagebox.showinfo("Configuration terminée", "La configuration des images de référence est terminée avec succès!")
         
@@ -624,78 +734,285 @@ class CoinPokerHopper:
         show_instruction("1. Assurez-vous que CoinPoker est ouvert et visible. Cliquez sur 'Prêt' quand vous êtes prêt...", 
                          lambda: show_instruction("2. Positionnez votre souris sur le logo CoinPoker et cliquez sur 'Prêt'", capture_logo))
     
-    def run(self, max_attempts=None):
+    def _wait(self, delay):
         """
-        Démarre le processus de surveillance et d'inscription au tournoi
+        Attend le délai indiqué, ou moins si l'arrêt est demandé entre-temps
         
-        :param max_attempts: Nombre maximum de tentatives (None = illimité)
+        :param delay: Délai en secondes
+        :return: True si le délai s'est écoulé, False si l'arrêt a été demandé
+        """
+        return not self._stop_event.wait(delay)
+    
+    def _wait_for_next_cycle(self, delay):
+        """
+        Attend le prochain cycle; avec la capture continue, analyse chaque nouvelle capture
+        pendant l'attente et l'écourte dès que le tournoi est inscriptible
+        
+        :param delay: Délai maximal en secondes
+        :return: True si l'attente s'est terminée normalement, False si l'arrêt a été demandé
+        """
+        grabber = self.window_manager.frame_grabber
+        if grabber is None or not self.background_mode:
+            return self._wait(delay)
+        
+        deadline = time.perf_counter() + delay
+        seq = 0
+        while not self._stop_event.is_set():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return True
+            if not grabber.running:
+                return self._wait(remaining)
+            
+            # Attente par tranches courtes pour rester réactif à stop()
+            frame = grabber.wait_for_new(seq, min(remaining, 2 * grabber.period))
+            if frame is None:
+                continue
+            seq = frame.seq
+            
+            position = self.check_frame(frame)
+            if position:
+                self._pending_position = position
+                return True
+        return False
+    
+    def check_frame(self, frame):
+        """
+        Analyse une capture continue reçue pendant l'attente du prochain cycle
+        
+        :param frame: Instance de Frame (voir utils.frame_grabber)
+        :return: Position du tournoi s'il est inscriptible, None sinon
+        """
+        if not self.window_manager.window_rect:
+            return None
+        return self.find_tournament_in_list(frame.image, self.window_manager, frame.timestamp, report=False)
+    
+    def arm(self):
+        """
+        Réinitialise l'état d'arrêt d'une nouvelle session, au moment où elle est créée
+        
+        À appeler avant de confier la session à un thread ou à une boucle asyncio: un stop()
+        reçu avant que la session ne commence réellement n'est alors pas perdu.
         """
         self.running = True
-        attempts = 0
+        self._stop_event.clear()
+        self._armed = True
+    
+    def start_run(self):
+        """Prépare une session de surveillance (commun à run et aux variantes asynchrones)"""
+        if not self._armed:
+            self.arm()
         
         self.update_status(f"Démarrage de la surveillance pour le tournoi '{self.tournament_name}'")
         
+        # Résoudre une fois pour toutes les images, offsets et stratégie à utiliser
+        self.compile_plan()
+        self.watchdog.compile(self.images_dir)
+        self._pending_position = None
+        self._immediate_retries = 0
+        
         # Trouver et enregistrer la fenêtre CoinPoker au démarrage
         if not self.window_manager.find_coinpoker_window():
             self.update_status("Fenêtre CoinPoker non trouvée. Vérifiez que l'application est ouverte.")
             # On ne quitte pas immédiatement, on essaiera de la trouver à chaque itération
         
-        while self.running and (max_attempts is None or attempts < max_attempts):
-            try:
-                attempts += 1
-                self.update_status(f"Tentative {attempts}/{max_attempts if max_attempts else 'illimité'}")
-                
+        # Capture continue de la fenêtre, en parallèle de la détection
+        if self.capture_fps > 0:
+            attach_frame_grabber(self.window_manager, self.capture_fps, self.capture_phase)
+        
+        self.schedule = load_schedule(self.tournament_name)
+        self._scheduled_interval = None
+        if self.schedule:
+            self.update_status(f"Calendrier du tournoi: inscriptions attendues {self.schedule.lead.total_seconds() / 60:.0f} min avant chaque début ({self.schedule.recurrence})")
+    
+    def _set_capture_fps(self, fps):
+        """Démarre, arrête ou adapte la capture continue de la fenêtre"""
+        grabber = self.window_manager.frame_grabber
+        if fps <= 0:
+            detach_frame_grabber(self.window_manager)
+        elif grabber is None or abs(grabber.period * fps - 1) > 1e-6:
+            attach_frame_grabber(self.window_manager, fps, self.capture_phase)
+    
+    def schedule_sleep(self):
+        """
+        Applique le calendrier du tournoi avant un cycle
+        
+        En dehors des périodes d'ouverture des inscriptions, la capture continue est
+        arrêtée et la durée de veille est retournée; sinon, l'intervalle et la fréquence
+        de capture du cycle sont adaptés à la proximité de l'ouverture attendue.
+        
+        :return: Durée de veille en secondes avant le prochain cycle (0 = cycle immédiat)
+        """
+        if self.schedule is None:
+            return 0
+        decision = self.schedule.decide(self.check_interval, self.capture_fps)
+        self._set_capture_fps(decision.capture_fps)
+        if decision.sleep > 0:
+            self.update_status(
+                f"Inscriptions attendues à {decision.opens_at:%d/%m %H:%M}: veille de {decision.sleep / 60:.0f} min"
+            )
+            return decision.sleep
+        self._scheduled_interval = decision.check_interval
+        return 0
+    
+    def next_cycle_delay(self, delay):
+        """Délai avant le prochain cycle, raccourci par le calendrier autour de l'ouverture attendue"""
+        if self._scheduled_interval is None:
+            return delay
+        return min(delay, self._scheduled_interval)
+    
+    def should_continue(self, attempts, max_attempts):
+        """Indique si une nouvelle tentative doit être effectuée"""
+        return self.running and (max_attempts is None or attempts < max_attempts)
+    
+    def run_cycle(self, attempts, max_attempts=None):
+        """
+        Effectue une tentative de recherche et d'inscription
+        
+        :param attempts: Numéro de la tentative
+        :param max_attempts: Nombre maximum de tentatives (None = illimité)
+        :return: Délai en secondes avant la prochaine tentative, ou None si la surveillance est terminée
+        """
+        archive = get_frame_archive()
+        cycle_id = archive.begin_cycle() if archive is not None else None
+        self.window_manager.archive_tournament = self.tournament_name
+        self.window_manager.archive_cycle = cycle_id
+        self._cycle_outcome = OUTCOME_ERROR
+        try:
+            # Profilé par cProfile lorsque ce mode est actif (voir utils.profiling)
+            with get_profiler().cycle():
+                delay = self._run_cycle(attempts, max_attempts)
+            if delay != 0:
+                self._immediate_retries = 0
+            return delay
+        finally:
+            # Captures du cycle étiquetées par son résultat, pour l'analyse après coup
+            if archive is not None:
+                archive.end_cycle(cycle_id, self.tournament_name, self._cycle_outcome)
+    
+    def archive_event(self, kind, detail=None):
+        """Journalise un événement dans l'archive des captures, rattaché au cycle en cours"""
+        archive = get_frame_archive()
+        if archive is not None:
+            archive.log_event(kind, self.tournament_name, self.window_manager.archive_cycle, detail)
+    
+    def _run_cycle(self, attempts, max_attempts):
+        try:
+            self.update_status(f"Tentative {attempts}/{max_attempts if max_attempts else 'illimité'}")
+            self.refresh_plan()
+            
+            # Tournoi déjà repéré par la capture continue pendant l'attente: inscription immédiate
+            tournament_position = self._pending_position
+            self._pending_position = None
+            
+            if tournament_position is None:
                 # Si nous n'avons pas encore trouvé la fenêtre, essayer à nouveau
                 if not self.window_manager.window_rect and not self.window_manager.find_coinpoker_window():
                     self.update_status("Fenêtre CoinPoker non trouvée. Nouvel essai dans quelques secondes...")
-                    time.sleep(self.check_interval)
-                    continue
+                    self._cycle_outcome = OUTCOME_NO_WINDOW
+                    return self.check_interval
                 
                 # Si nous ne sommes pas en mode arrière-plan, mettre la fenêtre au premier plan
                 if not self.background_mode and not self.focus_coinpoker_window():
                     self.update_status("Impossible de mettre la fenêtre CoinPoker au premier plan. Nouvel essai dans quelques secondes...")
-                    time.sleep(self.check_interval)
-                    continue
+                    self._cycle_outcome = OUTCOME_NO_WINDOW
+                    return self.check_interval
                 
-                # Naviguer vers la liste des tournois
-                if not self.navigate_to_tournaments():
+                # Naviguer vers la liste des tournois; en cas d'échec, le watchdog identifie l'état du client
+                # (dialogue, erreur, table...), applique l'action de récupération et la navigation est retentée
+                if not self.navigate_to_tournaments() and not (self.watchdog.recover() and self.navigate_to_tournaments()):
                     self.update_status("Navigation vers les tournois échouée. Nouvel essai dans quelques secondes...")
-                    time.sleep(self.check_interval)
-                    continue
+                    self._cycle_outcome = OUTCOME_NAVIGATION_FAILED
+                    return self.check_interval
+                self.watchdog.confirm_lobby()
                 
                 # Trouver le tournoi dans la liste
                 tournament_position = self.find_tournament_in_list()
+            else:
+                self.update_status("Tournoi repéré par la capture continue pendant l'attente")
+            
+            if tournament_position:
+                self.update_status(f"Tournoi '{self.tournament_name}' trouvé à la position {tournament_position}")
                 
-                if tournament_position:
-                    self.update_status(f"Tournoi '{self.tournament_name}' trouvé à la position {tournament_position}")
-                    
-                    # Tenter de s'inscrire au tournoi
-                    if self.register_for_tournament(tournament_position):
-                        self.update_status(f"Inscription au tournoi '{self.tournament_name}' réussie!")
-                        self.running = False
-                        break
-                    else:
-                        self.update_status("Échec de l'inscription. Nouvel essai dans quelques secondes...")
+                # Tenter de s'inscrire au tournoi
+                if self.register_for_tournament(tournament_position):
+                    self.update_status(f"Inscription au tournoi '{self.tournament_name}' réussie!")
+                    self._cycle_outcome = OUTCOME_REGISTERED
+                    self.running = False
+                    return None
+                self._cycle_outcome = OUTCOME_REGISTRATION_FAILED
+                if self._immediate_retries < MAX_IMMEDIATE_RETRIES and self.watchdog.recover():
+                    # Dialogue ou fenêtre inattendue refermé: nouvel essai sans attendre
+                    self.update_status("Échec de l'inscription, état du client rétabli. Nouvel essai immédiat...")
+                    self._immediate_retries += 1
+                    return 0
                 else:
-                    self.update_status(f"Tournoi '{self.tournament_name}' non trouvé dans la vue actuelle.")
-                    
-                    # Faire défiler la liste pour chercher dans d'autres sections
-                    self.scroll_tournament_list()
+                    self.update_status("Échec de l'inscription. Nouvel essai dans quelques secondes...")
+            else:
+                self.update_status(f"Tournoi '{self.tournament_name}' non trouvé dans la vue actuelle.")
+                self._cycle_outcome = OUTCOME_NOT_FOUND
+                # Le tournoi n'est plus inscriptible: la prochaine détection redémarre la mesure
+                self._registering_seen_at = None
                 
-            except Exception as e:
-                self.update_status(f"Erreur: {str(e)}")
+                # Faire défiler la liste pour chercher dans d'autres sections
+                self.scroll_tournament_list()
             
-            # Attendre avant la prochaine tentative
-            if self.running:
-                self.update_status(f"Prochaine vérification dans {self.check_interval} secondes...")
-                time.sleep(self.check_interval)
+        except Exception as e:
+            self.update_status(f"Erreur: {str(e)}")
+            self._cycle_outcome = OUTCOME_ERROR
         
+        # Attendre avant la prochaine tentative
+        if self.running:
+            self.update_status(f"Prochaine vérification dans {self.check_interval} secondes...")
+        return self.check_interval
+    
+    def finish_run(self):
+        """Termine une session de surveillance"""
+        detach_frame_grabber(self.window_manager)
         self.update_status("Surveillance terminée")
+        if self.plan:
+            for step, (count, mean_ms, max_ms) in self.plan.timing_summary().items():
+                logger.info(f"Étape '{step}': {count} mesures, moyenne {mean_ms:.1f} ms, max {max_ms:.1f} ms")
+        self.watchdog.log_summary()
+        self._armed = False
+        for kind, stats in self.input_dispatcher.latency_stats().items():
+            logger.info(
+                f"Latence des actions '{kind}': {stats['count']} actions, attente moyenne {stats['wait_ms_mean']:.1f} ms "
+                f"(max {stats['wait_ms_max']:.1f} ms), exécution moyenne {stats['run_ms_mean']:.1f} ms"
+            )
         self.running = False
     
+    def run(self, max_attempts=None):
+        """
+        Démarre le processus de surveillance et d'inscription au tournoi
+        
+        :param max_attempts: Nombre maximum de tentatives (None = illimité)
+        """
+        self.start_run()
+        attempts = 0
+        
+        while self.should_continue(attempts, max_attempts):
+            # Veille sans capture ni détection en dehors des périodes d'ouverture du calendrier
+            sleep = self.schedule_sleep()
+            if sleep > 0:
+                self._wait(sleep)
+                continue
+            
+            attempts += 1
+            delay = self.run_cycle(attempts, max_attempts)
+            if delay is None:
+                break
+            
+            # Attente interrompue immédiatement par stop()
+            if self.running:
+                self._wait_for_next_cycle(self.next_cycle_delay(delay))
+        
+        self.finish_run()
+    
     def stop(self):
         """Arrête le processus de surveillance"""
         self.running = False
+        self._stop_event.set()
         self.update_status("Arrêt demandé")
     
     def check_window_focus(self):
@@ -707,5 +1024,6 @@ class CoinPokerHopper:
         while self.running:
             if not self.background_mode and not self.window_manager.is_coinpoker_window_focused():
                 self.update_status("La fenêtre CoinPoker n'est plus au premier plan, restauration...")
-                self.focus_coinpoker_window()
-            time.sleep(5)  # Vérifier toutes les 5 secondes
+                # Priorité la plus basse: jamais au milieu d'une inscription ou d'un défilement
+                self.focus_coinpoker_window(priority=PRIORITY_REFOCUS)
+            self._wait(5)  # Vérifier toutes les 5 secondes
@@ -0,0 +1,218 @@
+"""
+Module de sérialisation des actions d'entrée (clics, défilement, focus)
+
+Toutes les actions souris et les changements de focus passent par un unique
+thread propriétaire, dans l'ordre de leur priorité. Une session (par exemple
+une inscription) peut réserver ce thread: les actions des autres threads sont
+alors mises en attente jusqu'à la fin de la session, ce qui empêche la
+surveillance du focus ou un autre hopper de cliquer au milieu d'une inscription.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from backends import get_backend
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Priorités (la plus petite valeur est exécutée en premier)
+PRIORITY_REGISTER = 0
+PRIORITY_NAVIGATION = 1
+PRIORITY_SCROLL = 2
+PRIORITY_REFOCUS = 3
+
+# Nombre de mesures de latence conservées par type d'action
+LATENCY_HISTORY_SIZE = 500
+
+
+class InputAction:
+    """Action d'entrée en attente d'exécution"""
+
+    __slots__ = ("priority", "sequence", "kind", "func", "args", "session", "key", "future", "submitted_at")
+
+    def __init__(self, priority, sequence, kind, func, args, session, key):
+        self.priority = priority
+        self.sequence = sequence
+        self.kind = kind
+        self.func = func
+        self.args = args
+        self.session = session
+        self.key = key
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class InputDispatcher:
+    def __init__(self):
+        self._queue = []
+        self._deferred = []
+        self._pending_keys = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._session_lock = threading.Lock()
+        self._session_token = None
+        self._local = threading.local()
+        # Latences par type d'action: liste de tuples (attente, exécution) en secondes
+        self._latencies = {}
+
+        self._thread = threading.Thread(target=self._run, name="input-dispatcher", daemon=True)
+        self._thread.start()
+
+    @contextmanager
+    def session(self):
+        """
+        Réserve le dispatcher pour une suite d'actions du thread courant
+
+        Pendant la session, seules les actions soumises par ce thread sont
+        exécutées; les autres attendent la fin de la session.
+        """
+        if getattr(self._local, "session", None) is not None:
+            # Session déjà ouverte par ce thread (appels imbriqués)
+            yield
+            return
+
+        self._session_lock.acquire()
+        token = object()
+        self._local.session = token
+        with self._condition:
+            self._session_token = token
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._session_token = None
+                for action in self._deferred:
+                    heapq.heappush(self._queue, action)
+                self._deferred = []
+                self._condition.notify()
+            self._local.session = None
+            self._session_lock.release()
+
+    def submit(self, kind, func, *args, priority=PRIORITY_NAVIGATION, key=None, wait=True):
+        """
+        Soumet une action au thread propriétaire des entrées
+
+        :param kind: Type d'action (pour les statistiques de latence)
+        :param func: Fonction à exécuter
+        :param priority: Priorité de l'action
+        :param key: Clé de déduplication: une action de même clé déjà en attente est réutilisée
+        :param wait: Si True, attend l'exécution et retourne le résultat; sinon retourne un Future
+        :return: Résultat de l'action, ou Future si wait est False
+        """
+        if threading.current_thread() is self._thread:
+            # Action déclenchée depuis une autre action: exécution immédiate
+            return func(*args)
+
+        session = getattr(self._local, "session", None)
+        with self._condition:
+            action = self._pending_keys.get(key) if key is not None else None
+            if action is None or action.session is not session:
+                action = InputAction(priority, next(self._sequence), kind, func, args, session, key)
+                if key is not None:
+                    self._pending_keys[key] = action
+                heapq.heappush(self._queue, action)
+                self._condition.notify()
+            elif priority < action.priority and action in self._queue:
+                # Une demande plus urgente remonte l'action déjà en attente
+                action.priority = priority
+                heapq.heapify(self._queue)
+
+        if wait:
+            return action.future.result()
+        return action.future
+
+    def click(self, *args, priority=PRIORITY_NAVIGATION, wait=True):
+        """Clique via le backend courant (mêmes arguments que pyautogui.click)"""
+        return self.submit("click", lambda *click_args: get_backend().click(*click_args), *args, priority=priority, wait=wait)
+
+    def scroll(self, amount, priority=PRIORITY_SCROLL, wait=True):
+        """Fait défiler via le backend courant"""
+        return self.submit("scroll", lambda value: get_backend().scroll(value), amount, priority=priority, wait=wait)
+
+    def focus(self, window_manager, priority=PRIORITY_NAVIGATION, wait=True):
+        """
+        Met la fenêtre d'un WindowManager au premier plan
+
+        Les demandes de focus redondantes pour une même fenêtre sont fusionnées.
+        """
+        return self.submit(
+            "focus", window_manager.activate_window,
+            priority=priority, key=("focus", id(window_manager)), wait=wait
+        )
+
+    def latency_stats(self):
+        """
+        Retourne les statistiques de latence par type d'action
+
+        :return: Dictionnaire type -> {count, wait_ms_mean, wait_ms_max, run_ms_mean, run_ms_p95}
+        """
+        with self._condition:
+            latencies = {kind: list(values) for kind, values in self._latencies.items()}
+
+        stats = {}
+        for kind, values in latencies.items():
+            waits = sorted(v[0] for v in values)
+            runs = sorted(v[1] for v in values)
+            stats[kind] = {
+                "count": len(values),
+                "wait_ms_mean": 1000 * sum(waits) / len(waits),
+                "wait_ms_max": 1000 * waits[-1],
+                "run_ms_mean": 1000 * sum(runs) / len(runs),
+                "run_ms_p95": 1000 * runs[min(len(runs) - 1, int(0.95 * len(runs)))],
+            }
+        return stats
+
+    def _next_action(self):
+        """Attend et retourne la prochaine action exécutable"""
+        with self._condition:
+            while True:
+                while self._queue:
+                    action = heapq.heappop(self._queue)
+                    if self._session_token is not None and action.session is not self._session_token:
+                        self._deferred.append(action)
+                        continue
+                    if action.key is not None and self._pending_keys.get(action.key) is action:
+                        del self._pending_keys[action.key]
+                    return action
+                self._condition.wait()
+
+    def _run(self):
+        """Boucle du thread propriétaire des entrées"""
+        while True:
+            action = self._next_action()
+            started = time.perf_counter()
+            try:
+                result = action.func(*action.args)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'action d'entrée '{action.kind}': {str(e)}")
+                action.future.set_exception(e)
+            else:
+                action.future.set_result(result)
+            finished = time.perf_counter()
+
+            with self._condition:
+                history = self._latencies.setdefault(action.kind, [])
+                history.append((started - action.submitted_at, finished - started))
+                if len(history) > LATENCY_HISTORY_SIZE:
+                    del history[0]
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_input_dispatcher():
+    """Retourne le dispatcher d'entrées partagé par tout le processus"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = InputDispatcher()
+        return _dispatcher
@@ -3,24 +3,363 @@
 Point d'entrée principal de l'application CoinPoker Tournament Hopper
 """
 
-import tkinter as tk
-from gui import HopperGUI
+import argparse
 import os
+import time
 from logger import setup_logging
 
+# Tournoi surveillé dans le client simulé (--simulate)
+SIMULATED_TOURNAMENT = "Simulation Main Event"
+
+def parse_arguments():
+    """Analyse les arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="CoinPoker Tournament Hopper")
+    parser.add_argument(
+        "--detection-workers",
+        type=int,
+        default=0,
+        help="Nombre de processus dédiés à la détection d'images (0 = détection dans le processus principal)"
+    )
+    parser.add_argument(
+        "--latency-report",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="TOURNOI",
+        help="Affiche les percentiles de latence d'inscription (optionnellement pour un seul tournoi) puis quitte"
+    )
+    parser.add_argument(
+        "--calibrate",
+        nargs="+",
+        metavar="IMAGE",
+        help="Calibre les images de référence indiquées (rognage optimal et seuil suggéré) puis quitte"
+    )
+    parser.add_argument(
+        "--tune-thresholds",
+        action="store_true",
+        help="Ajuste le seuil de confiance de chaque image de référence sur les captures annotées puis quitte"
+    )
+    parser.add_argument(
+        "--frames",
+        default="resources/screenshots/window_capture_*.png",
+        help="Motif des captures enregistrées utilisées pour la calibration et l'ajustement des seuils"
+    )
+    parser.add_argument(
+        "--simulate",
+        nargs="?",
+        const=200,
+        type=int,
+        default=None,
+        metavar="LIGNES",
+        help="Exécute la surveillance complète sur un client CoinPoker simulé (lobby de LIGNES lignes) puis quitte"
+    )
+    parser.add_argument(
+        "--simulate-delay",
+        type=float,
+        default=0.0,
+        help="Délai (en secondes) avant l'ouverture des inscriptions dans le client simulé"
+    )
+    parser.add_argument(
+        "--simulate-popup",
+        type=float,
+        default=None,
+        metavar="S",
+        help="Affiche une fenêtre d'erreur dans le client simulé après S secondes (récupération par le watchdog)"
+    )
+    parser.add_argument(
+        "--simulate-attempts",
+        type=int,
+        default=20,
+        help="Nombre maximum de tentatives dans le client simulé"
+    )
+    parser.add_argument(
+        "--row-fingerprints",
+        action="store_true",
+        help="Reconnaît les noms des tournois par empreinte des lignes de la liste (un index par capture, "
+             "quel que soit le nombre de tournois) au lieu d'une correspondance d'image par tournoi"
+    )
+    parser.add_argument(
+        "--build-bundle",
+        nargs="?",
+        const="default",
+        default=None,
+        metavar="PROFIL",
+        help="Construit le paquet d'images de référence du profil (resources/bundles/PROFIL.npz) puis quitte"
+    )
+    parser.add_argument(
+        "--bundle-scale",
+        type=float,
+        default=1.0,
+        help="Facteur d'échelle des images et offsets du paquet construit (résolution du profil)"
+    )
+    parser.add_argument(
+        "--template-profile",
+        default="default",
+        metavar="PROFIL",
+        help="Profil dont le paquet d'images de référence est utilisé, s'il existe"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="sampling",
+        choices=["sampling", "cprofile"],
+        default=None,
+        help="Profile la surveillance dès le démarrage (piles échantillonnées ou cProfile par cycle, fichiers dans logs/)"
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        default=0.01,
+        help="Intervalle d'échantillonnage du profilage (en secondes)"
+    )
+    parser.add_argument(
+        "--archive-retention",
+        type=float,
+        default=24,
+        metavar="HEURES",
+        help="Durée de conservation des captures archivées (en heures)"
+    )
+    parser.add_argument(
+        "--archive-max-mb",
+        type=float,
+        default=500,
+        help="Taille maximale de l'archive des captures (en Mo, 0 = archivage désactivé)"
+    )
+    parser.add_argument(
+        "--archive-events",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="TOURNOI",
+        help="Affiche les derniers événements de l'archive des captures (optionnellement pour un seul tournoi) puis quitte"
+    )
+    parser.add_argument(
+        "--archive-export",
+        type=int,
+        metavar="EVENEMENT",
+        help="Exporte en PNG les captures qui entourent un événement de l'archive puis quitte"
+    )
+    parser.add_argument(
+        "--archive-margin",
+        type=float,
+        default=5.0,
+        help="Secondes exportées avant et après l'événement (--archive-export)"
+    )
+    return parser.parse_args()
+
+def show_archive(args):
+    """Affiche les événements de l'archive des captures, ou exporte les captures autour d'un événement"""
+    from utils.frame_archive import get_frame_archive
+
+    archive = get_frame_archive()
+    if archive is None:
+        print("Archivage des captures désactivé")
+        return
+    if args.archive_export is None:
+        for event in archive.events(tournament=args.archive_events or None):
+            print(event.describe())
+        stats = archive.stats()
+        print(f"{stats['frames']} captures dans {stats['chunks']} blocs, {stats['bytes'] / 1024 / 1024:.1f} Mo")
+        return
+
+    event = archive.event(args.archive_export)
+    if event is None:
+        print(f"Événement {args.archive_export} introuvable")
+        return
+    records = archive.frames_around(event.timestamp, args.archive_margin, args.archive_margin, event.tournament)
+    written = archive.export(records)
+    print(f"{event.describe()}: {len(written)} captures exportées dans resources/screenshots")
+
+def calibrate_images(image_paths, frames_pattern):
+    """Calibre des images de référence sur les captures enregistrées et affiche le résultat"""
+    from utils.template_calibration import load_frames, calibrate_template, apply_calibration
+
+    frames = [frame for _, frame in load_frames(frames_pattern)]
+    if not frames:
+        print(f"Aucune capture trouvée ({frames_pattern})")
+        return
+
+    for image_path in image_paths:
+        result = calibrate_template(image_path, frames)
+        if result is None:
+            print(f"{image_path}: absente des captures, non calibrée")
+            continue
+        print(result.describe())
+        if not result.unique:
+            print(f"{image_path}: correspondance non unique, image conservée")
+            continue
+        apply_calibration(result)
+
+def run_simulation(rows, open_delay, max_attempts, popup_delay=None, archive_retention=None, archive_max_mb=None):
+    """
+    Exécute le hopper sur un client CoinPoker simulé et affiche les durées mesurées
+
+    :param archive_retention: Rétention de l'archive des captures en heures (None = valeur par défaut)
+    :param archive_max_mb: Taille maximale de l'archive en Mo (None = valeur par défaut, 0 = pas d'archive)
+    """
+    import shutil
+    import tempfile
+    from backends import SimulatedBackend, set_backend
+    from hopper import CoinPokerHopper
+    from utils.latency_tracker import LatencyTracker, latency_report, format_latency_report
+    from utils.synthetic_lobby import prepare_lobby_images, prepare_client_images, prepare_popup_image, render_lobby
+    from utils.frame_archive import FrameArchive, set_frame_archive, DEFAULT_RETENTION_HOURS, DEFAULT_MAX_MB
+
+    workdir = tempfile.mkdtemp(prefix="simulation_")
+    archive = None
+    try:
+        name_paths, button_path = prepare_lobby_images([SIMULATED_TOURNAMENT], workdir)
+        accept_path, tab_path = prepare_client_images(workdir)
+        lobby = render_lobby(name_paths, button_path, rows)
+        popup_path = prepare_popup_image(workdir) if popup_delay is not None else None
+        backend = SimulatedBackend(
+            lobby, accept_path, tab_path, open_delay=open_delay, popup_path=popup_path, popup_delay=popup_delay
+        )
+        set_backend(backend)
+        # Archive propre à la simulation, avec les limites de la ligne de commande
+        max_mb = DEFAULT_MAX_MB if archive_max_mb is None else archive_max_mb
+        if max_mb > 0:
+            retention = DEFAULT_RETENTION_HOURS if archive_retention is None else archive_retention
+            archive = FrameArchive(os.path.join(workdir, "archive"), retention, max_mb)
+            set_frame_archive(archive)
+
+        hopper = CoinPokerHopper(SIMULATED_TOURNAMENT)
+        hopper.images_dir = workdir
+        hopper.window_manager.screenshots_dir = workdir
+        hopper.check_interval = 1
+        latency_path = os.path.join(workdir, "registration_latency.jsonl")
+        hopper.latency_tracker = LatencyTracker(latency_path)
+
+        start = time.perf_counter()
+        hopper.run(max_attempts)
+        elapsed = time.perf_counter() - start
+
+        print(f"\nClient simulé: {rows} lignes, {len(backend.events)} actions, durée totale {elapsed:.1f} s")
+        for name, registered_at in backend.registrations:
+            print(f"Inscription au tournoi '{name}' après {registered_at - start:.2f} s")
+        if not backend.registrations:
+            print("Aucune inscription effectuée")
+        print("\nDurées par étape:")
+        for step, (count, mean_ms, max_ms) in hopper.get_plan().timing_summary().items():
+            print(f"  {step:<24}{count:>4} mesures, moyenne {mean_ms:8.1f} ms, max {max_ms:8.1f} ms")
+        print()
+        print(format_latency_report(latency_report(latency_path)))
+
+        if archive is not None:
+            archive.flush()
+            stats = archive.stats()
+            print(f"\nArchive des captures: {stats['frames']} captures, {stats['bytes'] / 1024:.0f} Ko")
+            for event in archive.events():
+                print(f"  {event.describe()} - {len(archive.frames_for_cycle(event.cycle_id))} captures du cycle")
+            archive.close()
+    finally:
+        if archive is not None:
+            set_frame_archive(None)
+        set_backend(None)
+        shutil.rmtree(workdir, ignore_errors=True)
+
 def main():
     """Fonction principale pour démarrer l'application"""
+    args = parse_arguments()
+
+    if args.latency_report is not None:
+        from utils.latency_tracker import latency_report, format_latency_report
+        print(format_latency_report(latency_report(tournament_name=args.latency_report or None)))
+        return
+
+    if args.calibrate:
+        calibrate_images(args.calibrate, args.frames)
+        return
+
+    if args.tune_thresholds:
+        from utils.threshold_tuning import tune_thresholds
+        results = tune_thresholds(args.frames)
+        for result in results:
+            print(result.describe())
+        if not results:
+            print("Aucune image de référence annotée dans les captures")
+        return
+
+    if args.build_bundle:
+        from utils.template_bundle import build_bundle
+        print(f"Paquet écrit: {build_bundle(args.build_bundle, scale=args.bundle_scale)}")
+        return
+
+    # Archive des captures: rétention et taille maximale (ouverte à la première capture)
+    from utils.frame_archive import configure_frame_archive, close_frame_archive
+    configure_frame_archive(retention_hours=args.archive_retention, max_mb=args.archive_max_mb)
+
+    if args.archive_events is not None or args.archive_export is not None:
+        try:
+            show_archive(args)
+        finally:
+            close_frame_archive()
+        return
+
     # Configuration du logging
     setup_logging()
 
+    # Paquet d'images de référence du profil, projeté en mémoire (fichiers individuels s'il n'existe pas)
+    from utils.config_utils import bundle_path
+    template_profile = None
+    if os.path.exists(bundle_path(args.template_profile)):
+        from utils.template_bundle import activate_profile
+        if activate_profile(args.template_profile) is not None:
+            template_profile = args.template_profile
+
+    if args.row_fingerprints:
+        from detection_plan import set_name_lookup, NAME_LOOKUP_FINGERPRINT
+        set_name_lookup(NAME_LOOKUP_FINGERPRINT)
+
+    # Profilage: dès le démarrage avec --profile, ou à la demande (interface, signal SIGUSR1)
+    from utils.profiling import get_profiler, install_signal_toggle
+    profiler = get_profiler()
+    install_signal_toggle(args.profile or "sampling", args.profile_interval)
+    if args.profile:
+        profiler.start(args.profile, args.profile_interval)
+
+    try:
+        run_application(args, template_profile)
+    finally:
+        profiler.stop()
+        close_frame_archive()
+
+def run_application(args, template_profile=None):
+    """
+    Lance la simulation ou l'interface graphique
+
+    :param args: Arguments de la ligne de commande
+    :param template_profile: Profil d'images actif (None = fichiers individuels)
+    """
+    if args.simulate is not None:
+        run_simulation(
+            args.simulate, args.simulate_delay, args.simulate_attempts, args.simulate_popup,
+            args.archive_retention, args.archive_max_mb
+        )
+        return
+
     # Création des dossiers requis s'ils n'existent pas
     os.makedirs("resources/images", exist_ok=True)
     os.makedirs("resources/screenshots", exist_ok=True)
 
-    # Lancement de l'interface graphique
-    root = tk.Tk()
-    app = HopperGUI(root)
-    root.mainloop()
+    # Pool de processus de détection optionnel, partagé par tous les hoppers
+    detection_pool = None
+    if args.detection_workers > 0:
+        from utils.detection_pool import DetectionPool
+        from utils.image_utils import set_detection_pool
+        detection_pool = DetectionPool(args.detection_workers)
+        set_detection_pool(detection_pool)
+
+    # Lancement de l'interface graphique (les modules de détection sont importés en arrière-plan)
+    import tkinter as tk
+    from gui import HopperGUI
+    try:
+        root = tk.Tk()
+        app = HopperGUI(root, template_profile=template_profile)
+        root.mainloop()
+    finally:
+        if detection_pool:
+            detection_pool.shutdown()
 
 if __name__ == "__main__":
     main()
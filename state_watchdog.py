@@ -0,0 +1,203 @@
+"""
+Reconnaissance de l'état du client CoinPoker et récupération rapide
+
+Lorsqu'un cycle échoue (onglet Tournaments introuvable, inscription échouée), le
+watchdog classe la capture courante d'après les images de référence
+caractéristiques de chaque état, puis applique aussitôt l'action de récupération
+connue: le cycle reprend immédiatement au lieu d'échouer à chaque vérification
+tant qu'une fenêtre inattendue masque le lobby.
+
+Images utilisées (dossier d'images du hopper; les images absentes sont ignorées) :
+  - error_ok_button.png : fenêtre d'erreur, fermée par un clic sur son bouton OK
+  - accept_button.png : dialogue d'inscription inattendu, fermé par cancel_button.png
+  - login_button.png : client déconnecté (reconnexion manuelle, aucune action)
+  - table_lobby_button.png : fenêtre de table, retour au lobby par ce bouton
+  - tournaments_tab.png : lobby
+"""
+
+import time
+import logging
+
+from input_dispatcher import PRIORITY_NAVIGATION
+from detection_plan import reference_image
+from utils.image_utils import find_in_frame
+
+logger = logging.getLogger("coinpoker_hopper")
+
+STATE_LOBBY = "lobby"
+STATE_REGISTRATION_DIALOG = "registration_dialog"
+STATE_TABLE = "table"
+STATE_ERROR_POPUP = "error_popup"
+STATE_LOGGED_OUT = "logged_out"
+STATE_UNKNOWN = "unknown"
+
+# Image caractéristique de chaque état, par ordre de priorité: les fenêtres modales masquent le lobby
+STATE_MARKERS = (
+    (STATE_ERROR_POPUP, "error_ok_button.png"),
+    (STATE_REGISTRATION_DIALOG, "accept_button.png"),
+    (STATE_LOGGED_OUT, "login_button.png"),
+    (STATE_TABLE, "table_lobby_button.png"),
+    (STATE_LOBBY, "tournaments_tab.png"),
+)
+
+# Image sur laquelle cliquer pour quitter un état (None = l'image caractéristique elle-même)
+RECOVERY_CLICKS = {
+    STATE_ERROR_POPUP: None,
+    STATE_REGISTRATION_DIALOG: "cancel_button.png",
+    STATE_TABLE: None,
+}
+
+# Dossiers d'images dont les images manquantes ont été signalées (une fois par processus, quel que soit le nombre de surveillances)
+_reported_dirs = set()
+
+# Délai (en secondes) laissé au client pour réagir à une action de récupération
+RECOVERY_SETTLE_DELAY = 0.5
+
+
+class Watchdog:
+    def __init__(self, hopper):
+        """
+        Surveillance de l'état du client pour un hopper
+
+        :param hopper: Instance de CoinPokerHopper (capture, clics, statut)
+        """
+        self.hopper = hopper
+        self.markers = []
+        self.recovery_images = {}
+        # Début de la période passée hors du lobby (None = client dans un état normal)
+        self._bad_since = None
+        self._last_state = None
+        # Occurrences de chaque état anormal, récupérations effectuées et durée cumulée hors du lobby
+        self.occurrences = {}
+        self.recoveries = 0
+        self.bad_time = 0.0
+
+    def compile(self, images_dir):
+        """
+        Résout les images de référence disponibles (au démarrage de chaque surveillance)
+
+        :param images_dir: Dossier des images de référence
+        """
+        self.markers = [
+            (state, path) for state, path in
+            ((state, reference_image(images_dir, filename)) for state, filename in STATE_MARKERS)
+            if path
+        ]
+        self.recovery_images = {
+            state: reference_image(images_dir, filename) for state, filename in RECOVERY_CLICKS.items() if filename
+        }
+        self._bad_since = None
+        self._last_state = None
+        logger.info(f"Watchdog: états reconnus {', '.join(state for state, _ in self.markers) or 'aucun'}")
+
+        # États non reconnus ou sans action de récupération faute d'image (voir l'assistant "Configurer images")
+        if images_dir in _reported_dirs:
+            return
+        _reported_dirs.add(images_dir)
+        missing = [f"{state} ({filename})" for state, filename in STATE_MARKERS if state not in dict(self.markers)]
+        missing += [
+            f"récupération {state} ({filename})" for state, filename in RECOVERY_CLICKS.items()
+            if filename and not self.recovery_images.get(state)
+        ]
+        if missing:
+            logger.warning(f"Watchdog: images absentes dans {images_dir}, états non gérés: {', '.join(missing)}")
+
+    def classify(self, frame, source=None):
+        """
+        Identifie l'état du client sur une capture
+
+        :param frame: Capture BGR (voir CoinPokerHopper._capture)
+        :param source: WindowManager ayant effectué la capture (None = écran)
+        :return: Tuple (état, position écran de l'image caractéristique ou None)
+        """
+        if frame is not None:
+            for state, path in self.markers:
+                position = find_in_frame(frame, path, window_manager=source)
+                if position:
+                    return state, position
+        return STATE_UNKNOWN, None
+
+    def _click(self, position, source):
+        """Clique sur une position écran, la fenêtre du client étant mise au premier plan si nécessaire"""
+        dispatcher = self.hopper.input_dispatcher
+        with dispatcher.session():
+            if source is not None:
+                source.focus_coinpoker_window(priority=PRIORITY_NAVIGATION)
+            dispatcher.click(position, priority=PRIORITY_NAVIGATION)
+
+    def _enter(self, state):
+        """Enregistre l'entrée dans un état anormal"""
+        if state != self._last_state:
+            self.occurrences[state] = self.occurrences.get(state, 0) + 1
+            self._last_state = state
+        if self._bad_since is None:
+            self._bad_since = time.perf_counter()
+
+    def recover(self, frame=None, source=None):
+        """
+        Identifie l'état du client et applique l'action de récupération correspondante
+
+        :param frame: Capture BGR déjà effectuée (une nouvelle capture est effectuée sinon)
+        :param source: WindowManager ayant effectué la capture (None = écran)
+        :return: True si une action de récupération a été appliquée (le cycle peut être repris
+                 immédiatement), False si le client est dans le lobby ou ne peut pas être rétabli
+        """
+        if frame is None:
+            frame, source, _ = self.hopper._capture()
+        state, position = self.classify(frame, source)
+        if state == STATE_LOBBY:
+            return False
+        self._enter(state)
+        self.hopper.archive_event("client_state", state)
+
+        if state == STATE_LOGGED_OUT:
+            self.hopper.update_status("Client CoinPoker déconnecté: reconnexion manuelle nécessaire")
+            return False
+
+        if state == STATE_UNKNOWN:
+            # Fenêtre déplacée ou recréée: nouvelle recherche de la fenêtre. Seul un changement de position
+            # ou de taille constitue une récupération; sinon, le cycle suivant attend check_interval
+            window_manager = self.hopper.window_manager
+            previous_rect = window_manager.window_rect
+            if not window_manager.find_coinpoker_window():
+                self.hopper.update_status("État du client non reconnu et fenêtre CoinPoker introuvable")
+                return False
+            if window_manager.window_rect == previous_rect:
+                self.hopper.update_status("État du client non reconnu, aucune action de récupération connue")
+                return False
+            self.hopper.update_status("État du client non reconnu: fenêtre CoinPoker déplacée, position mise à jour")
+            self.recoveries += 1
+            return True
+
+        if state in self.recovery_images:
+            image_path = self.recovery_images[state]
+            if image_path is None:
+                self.hopper.update_status(f"Dialogue inattendu ({state}) sans image de fermeture (cancel_button.png)")
+                return False
+            position = find_in_frame(frame, image_path, window_manager=source)
+            if position is None:
+                self.hopper.update_status(f"Bouton de fermeture du dialogue ({state}) non trouvé")
+                return False
+
+        self._click(position, source)
+        self.recoveries += 1
+        self.hopper.update_status(f"État du client: {state}, action de récupération appliquée")
+        # False si l'arrêt est demandé pendant l'attente
+        return self.hopper._wait(RECOVERY_SETTLE_DELAY)
+
+    def confirm_lobby(self):
+        """Signale le retour au lobby (navigation réussie): termine la période passée hors du lobby"""
+        if self._bad_since is None:
+            return
+        duration = time.perf_counter() - self._bad_since
+        self.bad_time += duration
+        logger.info(f"Watchdog: retour au lobby après {duration:.1f} s (dernier état: {self._last_state})")
+        self._bad_since = None
+        self._last_state = None
+
+    def log_summary(self):
+        """Journalise les états anormaux rencontrés pendant la surveillance"""
+        for state, count in self.occurrences.items():
+            logger.info(f"Watchdog: état '{state}' rencontré {count} fois")
+        if self.occurrences:
+            logger.info(f"Watchdog: {self.recoveries} récupérations, {self.bad_time:.1f} s passées hors du lobby")
@@ -11,41 +11,74 @@ logger = logging.getLogger("coinpoker_hopper")
 CONFIG_DIR = "config"
 TOURNAMENTS_FILE = f"{CONFIG_DIR}/tournaments.json"
 
+# Paquets d'images de référence par profil (voir utils.template_bundle)
+BUNDLES_DIR = "resources/bundles"
+
 def ensure_config_dir():
     """Crée le répertoire de configuration s'il n'existe pas"""
     os.makedirs(CONFIG_DIR, exist_ok=True)
 
-def load_tournaments():
+def load_tournament_entries():
     """
-    Charge la liste des tournois depuis le fichier de configuration
+    Charge les entrées des tournois depuis le fichier de configuration
     
-    :return: Liste des noms de tournois
+    Une entrée est soit le nom du tournoi, soit un dictionnaire {"name": ..., "schedule": {...}}
+    (voir utils.scheduler).
+    
+    :return: Liste de dictionnaires contenant au moins la clé "name"
     """
     ensure_config_dir()
     
     try:
         if os.path.exists(TOURNAMENTS_FILE):
             with open(TOURNAMENTS_FILE, "r") as f:
-                tournaments = json.load(f)
-                return tournaments
+                entries = json.load(f)
+                return [entry if isinstance(entry, dict) else {"name": entry} for entry in entries]
         else:
             return []
     except Exception as e:
         logger.error(f"Erreur lors du chargement des tournois: {str(e)}")
         return []
 
+def load_tournaments():
+    """
+    Charge la liste des tournois depuis le fichier de configuration
+    
+    :return: Liste des noms de tournois
+    """
+    return [entry["name"] for entry in load_tournament_entries()]
+
+def load_tournament_schedule(tournament_name):
+    """
+    Charge le calendrier d'un tournoi
+    
+    :param tournament_name: Nom du tournoi
+    :return: Dictionnaire du calendrier (start, lead_minutes, recurrence...), ou None si absent
+    """
+    for entry in load_tournament_entries():
+        if entry["name"] == tournament_name:
+            return entry.get("schedule")
+    return None
+
 def save_tournaments(tournaments):
     """
     Sauvegarde la liste des tournois dans le fichier de configuration
     
+    Les calendriers et autres paramètres des tournois conservés sont préservés.
+    
     :param tournaments: Liste des noms de tournois à sauvegarder
     :return: True si réussi, False sinon
     """
-    ensure_config_dir()
+    existing = {entry["name"]: entry for entry in load_tournament_entries()}
+    entries = []
+    for name in tournaments:
+        entry = existing.get(name, {"name": name})
+        # Les tournois sans paramètres restent enregistrés sous forme de simple nom
+        entries.append(entry if len(entry) > 1 else name)
     
     try:
         with open(TOURNAMENTS_FILE, "w") as f:
-            json.dump(tournaments, f)
+            json.dump(entries, f)
         return True
     except Exception as e:
         logger.error(f"Erreur lors de la sauvegarde des tournois: {str(e)}")
@@ -94,3 +127,52 @@ def load_tournament_offsets(tournament_name):
     except Exception as e:
         logger.error(f"Erreur lors du chargement des offsets: {str(e)}")
         return None
+
+TEMPLATE_THRESHOLDS_FILE = f"{CONFIG_DIR}/template_thresholds.json"
+
+def load_template_thresholds():
+    """
+    Charge les seuils de confiance calibrés par image de référence
+    
+    :return: Dictionnaire nom de fichier de l'image -> paramètres (threshold, expected_score...)
+    """
+    try:
+        if os.path.exists(TEMPLATE_THRESHOLDS_FILE):
+            with open(TEMPLATE_THRESHOLDS_FILE, "r") as f:
+                return json.load(f)
+        return {}
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement des seuils des images: {str(e)}")
+        return {}
+
+def save_template_threshold(template_name, values):
+    """
+    Enregistre les paramètres calibrés d'une image de référence (fusionnés avec les existants)
+    
+    :param template_name: Nom du fichier de l'image (par exemple "accept_button.png")
+    :param values: Dictionnaire de paramètres (threshold, expected_score...)
+    :return: True si réussi, False sinon
+    """
+    ensure_config_dir()
+    
+    thresholds = load_template_thresholds()
+    thresholds.setdefault(template_name, {}).update(values)
+    
+    try:
+        with open(TEMPLATE_THRESHOLDS_FILE, "w") as f:
+            json.dump(thresholds, f, indent=2)
+        logger.info(f"Seuil de l'image '{template_name}' sauvegardé")
+        return True
+    except Exception as e:
+        logger.error(f"Erreur lors de la sauvegarde du seuil de l'image: {str(e)}")
+        return False
+
+def bundle_path(profile, bundles_dir=BUNDLES_DIR):
+    """Chemin du paquet d'images de référence d'un profil"""
+    return os.path.join(bundles_dir, f"{profile}.npz")
+
+def list_profiles(bundles_dir=BUNDLES_DIR):
+    """Profils disponibles (paquets présents dans bundles_dir)"""
+    if not os.path.isdir(bundles_dir):
+        return []
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(bundles_dir) if name.endswith(".npz"))
@@ -0,0 +1,139 @@
+"""
+Cache des résultats de détection par bande de capture
+
+Entre deux cycles, la majeure partie du lobby (en-tête, onglets, la plupart des
+lignes) est identique au pixel près. La capture est découpée en blocs de lignes
+dont on calcule une empreinte une seule fois par capture; le résultat de la
+correspondance d'un template sur une bande est mis en cache sous la clé
+(template, position de la bande, empreintes des blocs couverts). Seules les
+bandes modifiées sont recalculées.
+"""
+
+import hashlib
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Hauteur (en lignes de pixels) des blocs dont on calcule l'empreinte
+HASH_BLOCK_ROWS = 16
+
+# Hauteur (en lignes de la carte de corrélation) des bandes mises en cache
+BAND_ROWS = 64
+
+# Mémoire maximale occupée par le cache (en octets, estimation)
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Taille estimée d'une entrée vide et d'une position détectée
+_ENTRY_OVERHEAD = 200
+_LOCATION_BYTES = 16
+
+
+def frame_block_hashes(frame):
+    """
+    Calcule l'empreinte de chaque bloc de HASH_BLOCK_ROWS lignes d'une capture
+
+    :param frame: Image numpy
+    :return: Liste d'empreintes (bytes)
+    """
+    frame = np.ascontiguousarray(frame)
+    return [
+        hashlib.blake2b(frame[start:start + HASH_BLOCK_ROWS].data, digest_size=8).digest()
+        for start in range(0, frame.shape[0], HASH_BLOCK_ROWS)
+    ]
+
+
+class DetectionCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Cache LRU des résultats de correspondance par bande
+
+        :param max_bytes: Mémoire maximale occupée par le cache (estimation)
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        # Empreintes de la dernière capture vue (une capture est hachée une seule fois)
+        self._frame_ref = None
+        self._frame_hashes = None
+
+    def block_hashes(self, frame):
+        """Retourne les empreintes des blocs de la capture, calculées une seule fois par capture"""
+        with self._lock:
+            if self._frame_ref is not None and self._frame_ref() is frame:
+                return self._frame_hashes
+
+        hashes = frame_block_hashes(frame)
+        with self._lock:
+            self._frame_ref = weakref.ref(frame)
+            self._frame_hashes = hashes
+        return hashes
+
+    def band_key(self, hashes, template, frame_width, r0, r1, *extra):
+        """
+        Clé d'une bande de la carte de corrélation couvrant les lignes [r0, r1)
+
+        La bande dépend des lignes [r0, r1 + hauteur du template - 1) de la capture.
+        """
+        first_block = r0 // HASH_BLOCK_ROWS
+        last_block = (r1 + template.height - 2) // HASH_BLOCK_ROWS
+        return (template.key, template.mtime, frame_width, r0, r1) + extra + tuple(hashes[first_block:last_block + 1])
+
+    def get(self, key):
+        """Retourne la valeur en cache (et la marque comme récente), ou None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        """
+        Ajoute une valeur au cache en évinçant les entrées les moins récentes si nécessaire
+
+        :param size: Taille estimée de la valeur (en octets)
+        """
+        size += _ENTRY_OVERHEAD
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._frame_ref = None
+            self._frame_hashes = None
+
+    def stats(self):
+        """Retourne les statistiques du cache (entrées, mémoire, succès, échecs)"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def locations_size(locations):
+    """Taille estimée d'un tableau de positions en cache"""
+    return len(locations) * _LOCATION_BYTES
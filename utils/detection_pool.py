@@ -0,0 +1,241 @@
+"""
+Pool de processus de détection partagé entre plusieurs hoppers
+
+Les captures sont transmises aux processus via multiprocessing.shared_memory
+(aucune copie par pickle), les processus retournent uniquement les détections.
+Le processus principal reste le seul à effectuer les actions (clics, défilement,
+focus). Chaque processus a sa propre file de tâches et son propre canal de
+résultats: si l'un d'eux plante, même au milieu d'un envoi, il est redémarré et
+ses tâches en cours sont relancées sur un autre processus, sans affecter les autres.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from utils.template_matching import get_template_bundle
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Nombre de relances d'une tâche dont le processus a planté
+MAX_TASK_RETRIES = 2
+
+# Intervalle (en secondes) de vérification de l'état des processus
+WATCH_INTERVAL = 0.5
+
+
+def _worker_main(worker_index, task_queue, result_conn):
+    """Boucle principale d'un processus de détection"""
+    from utils.template_matching import locate_all, locate_best, locate_first, set_tile_workers
+    from utils.template_bundle import activate_bundle, active_bundle_path
+
+    # Un seul thread par processus: le parallélisme vient du nombre de processus
+    set_tile_workers(1)
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        task_id, shm_name, shape, dtype, requests, bundle_path = task
+        try:
+            # Même paquet d'images que le processus principal (projeté en mémoire, pages partagées)
+            if bundle_path != active_bundle_path():
+                activate_bundle(bundle_path)
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                results = []
+                for image_path, confidence, mode in requests:
+                    if mode == "best":
+                        results.append(locate_best(frame, image_path, confidence))
+                    elif mode == "first":
+                        results.append(locate_first(frame, image_path, confidence))
+                    else:
+                        results.append(locate_all(frame, image_path, confidence))
+                del frame
+            finally:
+                shm.close()
+            result_conn.send((task_id, worker_index, results, None))
+        except Exception as e:
+            result_conn.send((task_id, worker_index, None, str(e)))
+
+
+class DetectionPool:
+    def __init__(self, workers=None):
+        """
+        Démarre les processus de détection
+
+        :param workers: Nombre de processus (par défaut, le nombre de coeurs)
+        """
+        self._context = multiprocessing.get_context("spawn")
+        self.workers_count = workers or multiprocessing.cpu_count()
+        self._workers = [None] * self.workers_count
+        self._task_queues = [None] * self.workers_count
+        # Canal de résultats propre à chaque processus: un processus tué pendant un envoi
+        # ne peut pas bloquer les envois des autres (pas de verrou partagé)
+        self._result_conns = [None] * self.workers_count
+        # Tâches en cours: task_id -> [future, shm, message, index du processus, relances]
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._next_worker = itertools.cycle(range(self.workers_count))
+        self._running = True
+
+        for index in range(self.workers_count):
+            self._start_worker(index)
+
+        self._collector = threading.Thread(target=self._collect_results, name="detection-pool-results", daemon=True)
+        self._collector.start()
+        self._watcher = threading.Thread(target=self._watch_workers, name="detection-pool-watch", daemon=True)
+        self._watcher.start()
+
+        logger.info(f"Pool de détection démarré avec {self.workers_count} processus")
+
+    def _start_worker(self, index):
+        """Démarre (ou redémarre) le processus d'indice donné"""
+        task_queue = self._context.Queue()
+        result_reader, result_writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, task_queue, result_writer),
+            name=f"detection-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        result_writer.close()
+
+        previous_reader = self._result_conns[index]
+        if previous_reader is not None:
+            previous_reader.close()
+        self._task_queues[index] = task_queue
+        self._result_conns[index] = result_reader
+        self._workers[index] = process
+
+    def _dispatch(self, task_id):
+        """Envoie une tâche en attente au prochain processus vivant"""
+        entry = self._pending[task_id]
+        for _ in range(self.workers_count):
+            index = next(self._next_worker)
+            if self._workers[index].is_alive():
+                entry[3] = index
+                self._task_queues[index].put(entry[2])
+                return
+        raise RuntimeError("Aucun processus de détection disponible")
+
+    def submit(self, frame, requests):
+        """
+        Soumet une capture et une liste de recherches au pool
+
+        :param frame: Image BGR (numpy)
+        :param requests: Liste de tuples (chemin de l'image, confiance, "best" ou "all")
+        :return: Future dont le résultat est la liste des détections, dans l'ordre des recherches
+        """
+        if not self._running:
+            raise RuntimeError("Le pool de détection est arrêté")
+
+        frame = np.ascontiguousarray(frame)
+        shm = shared_memory.SharedMemory(create=True, size=max(frame.nbytes, 1))
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)[...] = frame
+
+        future = Future()
+        task_id = next(self._task_ids)
+        bundle = get_template_bundle()
+        message = (task_id, shm.name, frame.shape, frame.dtype.str, list(requests), bundle.path if bundle else None)
+        with self._lock:
+            self._pending[task_id] = [future, shm, message, None, 0]
+            try:
+                self._dispatch(task_id)
+            except Exception as e:
+                self._finish(task_id, error=str(e))
+        return future
+
+    def detect(self, frame, requests, timeout=None):
+        """Version bloquante de submit()"""
+        return self.submit(frame, requests).result(timeout=timeout)
+
+    def _finish(self, task_id, results=None, error=None):
+        """Termine une tâche et libère sa mémoire partagée (appelé sous verrou)"""
+        entry = self._pending.pop(task_id, None)
+        if entry is None:
+            return
+        future, shm = entry[0], entry[1]
+        shm.close()
+        shm.unlink()
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        else:
+            future.set_result(results)
+
+    def _collect_results(self):
+        """Thread de réception des résultats des processus"""
+        while self._running:
+            with self._lock:
+                readers = [conn for conn in self._result_conns if conn is not None and not conn.closed]
+            try:
+                ready = wait(readers, timeout=WATCH_INTERVAL)
+            except OSError:
+                # Canal fermé par un redémarrage pendant l'attente
+                continue
+
+            for conn in ready:
+                try:
+                    task_id, worker_index, results, error = conn.recv()
+                except (EOFError, OSError):
+                    # Processus arrêté: le thread de surveillance le redémarre et relance ses tâches
+                    with self._lock:
+                        if conn in self._result_conns:
+                            self._result_conns[self._result_conns.index(conn)] = None
+                            conn.close()
+                    continue
+                with self._lock:
+                    self._finish(task_id, results, error)
+
+    def _watch_workers(self):
+        """Thread de surveillance: redémarre les processus morts et relance leurs tâches"""
+        while self._running:
+            time.sleep(WATCH_INTERVAL)
+            with self._lock:
+                if not self._running:
+                    break
+                for index, process in enumerate(self._workers):
+                    if process.is_alive():
+                        continue
+
+                    logger.warning(f"Processus de détection {index} arrêté (code {process.exitcode}), redémarrage")
+                    self._start_worker(index)
+
+                    for task_id in [tid for tid, entry in self._pending.items() if entry[3] == index]:
+                        entry = self._pending[task_id]
+                        entry[4] += 1
+                        if entry[4] > MAX_TASK_RETRIES:
+                            self._finish(task_id, error="Le processus de détection a planté à plusieurs reprises")
+                            continue
+                        try:
+                            self._dispatch(task_id)
+                        except Exception as e:
+                            self._finish(task_id, error=str(e))
+
+    def shutdown(self):
+        """Arrête tous les processus et libère les mémoires partagées restantes"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            for task_queue in self._task_queues:
+                task_queue.put(None)
+            for task_id in list(self._pending):
+                self._finish(task_id, error="Le pool de détection a été arrêté")
+
+        for process in self._workers:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        logger.info("Pool de détection arrêté")
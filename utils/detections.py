@@ -0,0 +1,149 @@
+"""
+Détections sous forme de tableau structuré numpy
+
+Chaque détection est une ligne (x, y, w, h, score, template_id) d'un tableau
+structuré: x et y sont le centre de la correspondance, w et h la taille de
+l'image de référence. Un objet Detections s'itère comme une liste de centres
+(x, y), ce qui le rend utilisable partout où une liste de positions l'était,
+tout en conservant les scores et en permettant les appariements par ligne
+(nom du tournoi / bouton REGISTERING) en une opération vectorielle.
+"""
+
+import zlib
+
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([
+    ("x", np.int32),
+    ("y", np.int32),
+    ("w", np.int32),
+    ("h", np.int32),
+    ("score", np.float32),
+    ("template_id", np.uint32),
+])
+
+
+def template_id(template_key):
+    """
+    Identifiant numérique d'une image de référence, dérivé de sa clé
+
+    L'identifiant ne dépend que de la clé (CRC32 de sa représentation): il est
+    identique dans tous les processus, y compris ceux du pool de détection.
+
+    :param template_key: Clé de l'image de référence (chemin du fichier, ou clé du paquet actif)
+    :return: Entier non signé sur 32 bits
+    """
+    return zlib.crc32(repr(template_key).encode())
+
+
+class Detections:
+    """Ensemble de détections, itérable comme une liste de centres (x, y)"""
+
+    __slots__ = ("records",)
+
+    def __init__(self, records=None):
+        """
+        :param records: Tableau structuré de type DETECTION_DTYPE (None = aucune détection)
+        """
+        self.records = np.zeros(0, dtype=DETECTION_DTYPE) if records is None else records
+
+    @classmethod
+    def from_locations(cls, locations, scores, template, identifier=None):
+        """
+        Construit les détections à partir des coins supérieurs gauches d'un template
+
+        :param locations: Tableau (N, 2) de positions (ligne, colonne) du coin supérieur gauche
+        :param scores: Tableau (N,) des scores de correspondance
+        :param template: Instance de Template (taille et clé de l'image)
+        :param identifier: Identifiant de l'image (par défaut, template_id(template.key))
+        :return: Instance de Detections
+        """
+        locations = np.asarray(locations).reshape(-1, 2)
+        records = np.zeros(len(locations), dtype=DETECTION_DTYPE)
+        records["x"] = locations[:, 1] + template.width // 2
+        records["y"] = locations[:, 0] + template.height // 2
+        records["w"] = template.width
+        records["h"] = template.height
+        records["score"] = scores
+        records["template_id"] = template_id(template.key) if identifier is None else identifier
+        return cls(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __bool__(self):
+        return len(self.records) > 0
+
+    def __iter__(self):
+        for x, y in zip(self.records["x"].tolist(), self.records["y"].tolist()):
+            yield (x, y)
+
+    def __getitem__(self, index):
+        """Centre (x, y) pour un indice entier; Detections pour une tranche, un masque ou des indices"""
+        if isinstance(index, (int, np.integer)):
+            record = self.records[index]
+            return (int(record["x"]), int(record["y"]))
+        return Detections(self.records[index])
+
+    def __repr__(self):
+        return f"Detections({list(self)})"
+
+    @property
+    def x(self):
+        return self.records["x"]
+
+    @property
+    def y(self):
+        return self.records["y"]
+
+    @property
+    def scores(self):
+        return self.records["score"]
+
+    @property
+    def centers(self):
+        """Tableau (N, 2) des centres (x, y)"""
+        return np.column_stack((self.records["x"], self.records["y"]))
+
+    def translate(self, dx, dy):
+        """Détections décalées de (dx, dy), par exemple de la capture vers l'écran"""
+        records = self.records.copy()
+        records["x"] += dx
+        records["y"] += dy
+        return Detections(records)
+
+    def filter_band(self, y_min, y_max):
+        """Détections dont le centre est dans la bande horizontale [y_min, y_max)"""
+        y = self.records["y"]
+        return Detections(self.records[(y >= y_min) & (y < y_max)])
+
+    def nearest_in_row(self, y, tolerance):
+        """
+        Détection la plus proche verticalement d'une ligne
+
+        :param y: Ordonnée de la ligne
+        :param tolerance: Écart vertical maximal (exclu)
+        :return: Centre (x, y) de la détection la plus proche, None si aucune n'est dans la tolérance
+        """
+        if not len(self.records):
+            return None
+        distances = np.abs(self.records["y"] - y)
+        index = int(np.argmin(distances))
+        if distances[index] >= tolerance:
+            return None
+        return self[index]
+
+    def join_by_row(self, other, tolerance):
+        """
+        Associe à chaque détection la détection de other la plus proche sur la même ligne
+
+        :param other: Instance de Detections (par exemple les boutons REGISTERING)
+        :param tolerance: Écart vertical maximal (exclu)
+        :return: Tableau (N,) d'indices dans other, -1 pour les détections sans correspondance
+        """
+        if not len(self.records) or not len(other.records):
+            return np.full(len(self.records), -1, dtype=np.int64)
+        distances = np.abs(self.records["y"][:, None] - other.records["y"][None, :])
+        nearest = np.argmin(distances, axis=1)
+        matched = distances[np.arange(len(nearest)), nearest] < tolerance
+        return np.where(matched, nearest, -1)
@@ -0,0 +1,448 @@
+"""
+Archive des captures de la fenêtre CoinPoker
+
+Les captures de la fenêtre sont compressées (PNG) puis ajoutées à des fichiers
+de blocs (chunk_*.bin) par un thread d'écriture: la capture n'attend ni la
+compression ni le disque. Un index sqlite associe à chaque capture son instant,
+le cycle de surveillance, le tournoi et le résultat du cycle; les événements
+(résultat de chaque cycle, récupérations du watchdog...) y sont journalisés.
+Les blocs les plus anciens sont supprimés au-delà de la durée de rétention ou
+de la taille maximale de l'archive: l'espace disque reste borné.
+
+Analyse d'un échec d'inscription :
+    archive = get_frame_archive()
+    event = archive.events(kind=OUTCOME_REGISTRATION_FAILED)[-1]
+    for record in archive.frames_around(event.timestamp, before=5, after=2):
+        image = archive.read(record)
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from utils.lazy_import import lazy_import
+
+# Importés à la première capture archivée: la configuration de l'archive ne ralentit pas le démarrage
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+logger = logging.getLogger("coinpoker_hopper")
+
+DEFAULT_ARCHIVE_DIR = "resources/archive"
+INDEX_FILE = "index.sqlite"
+
+# Rétention par défaut (en heures) et taille maximale par défaut de l'archive (en Mo)
+DEFAULT_RETENTION_HOURS = 24
+DEFAULT_MAX_MB = 500
+
+# Un bloc est fermé au-delà de cette taille (en octets) ou de cette durée (en secondes)
+CHUNK_MAX_BYTES = 32 * 1024 * 1024
+CHUNK_MAX_SECONDS = 600
+
+# Compression PNG (0-9): rapide, l'archive est bornée en taille
+PNG_COMPRESSION = 1
+
+# Captures en attente d'écriture; au-delà, les nouvelles captures ne sont pas archivées
+QUEUE_SIZE = 64
+
+# Résultats des cycles de surveillance
+OUTCOME_REGISTERED = "registered"
+OUTCOME_REGISTRATION_FAILED = "registration_failed"
+OUTCOME_NOT_FOUND = "not_found"
+OUTCOME_NAVIGATION_FAILED = "navigation_failed"
+OUTCOME_NO_WINDOW = "no_window"
+OUTCOME_ERROR = "error"
+
+# Résultats des cycles terminés conservés en mémoire pour étiqueter les captures encore en attente d'écriture
+_PENDING_OUTCOMES = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    cycle_id INTEGER,
+    tournament TEXT,
+    outcome TEXT,
+    chunk TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frames_timestamp ON frames (timestamp);
+CREATE INDEX IF NOT EXISTS frames_cycle ON frames (cycle_id);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    cycle_id INTEGER,
+    tournament TEXT,
+    kind TEXT NOT NULL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+"""
+
+
+class FrameRecord:
+    """Entrée de l'index pour une capture archivée"""
+
+    __slots__ = ("id", "timestamp", "cycle_id", "tournament", "outcome", "chunk", "offset", "length")
+
+    def __init__(self, id, timestamp, cycle_id, tournament, outcome, chunk, offset, length):
+        self.id = id
+        # Instant de la capture (time.time)
+        self.timestamp = timestamp
+        self.cycle_id = cycle_id
+        self.tournament = tournament
+        self.outcome = outcome
+        # Bloc contenant la capture et position des données PNG dans le bloc
+        self.chunk = chunk
+        self.offset = offset
+        self.length = length
+
+
+class ArchiveEvent:
+    """Événement journalisé dans l'archive"""
+
+    __slots__ = ("id", "timestamp", "cycle_id", "tournament", "kind", "detail")
+
+    def __init__(self, id, timestamp, cycle_id, tournament, kind, detail):
+        self.id = id
+        self.timestamp = timestamp
+        self.cycle_id = cycle_id
+        self.tournament = tournament
+        self.kind = kind
+        self.detail = detail
+
+    def describe(self):
+        when = datetime.fromtimestamp(self.timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        detail = f" ({self.detail})" if self.detail else ""
+        return f"#{self.id} {when} cycle {self.cycle_id} '{self.tournament}': {self.kind}{detail}"
+
+
+class FrameArchive:
+    def __init__(self, directory=DEFAULT_ARCHIVE_DIR, retention_hours=DEFAULT_RETENTION_HOURS, max_mb=DEFAULT_MAX_MB):
+        """
+        Archive des captures (voir get_frame_archive)
+
+        :param directory: Dossier des blocs et de l'index
+        :param retention_hours: Durée de conservation des captures, en heures
+        :param max_mb: Taille maximale des blocs, en Mo
+        """
+        self.directory = directory
+        self.retention = retention_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        row = self._db.execute(
+            "SELECT MAX(id) FROM (SELECT MAX(cycle_id) AS id FROM frames UNION ALL SELECT MAX(cycle_id) FROM events)"
+        ).fetchone()
+        self._next_cycle = (row[0] or 0) + 1
+        self._outcomes = OrderedDict()
+
+        # Bloc en cours d'écriture (utilisé uniquement par le thread d'écriture)
+        self._chunk = None
+        self._chunk_file = None
+        self._chunk_started = 0.0
+        self.dropped = 0
+
+        self._evict()
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._write_loop, name="frame-archive", daemon=True)
+        self._thread.start()
+
+    # Écriture
+
+    def add(self, image, tournament=None, cycle_id=None, timestamp=None):
+        """
+        Archive une capture (compression et écriture dans le thread d'écriture)
+
+        :param image: Image PIL RGB ou image BGR (numpy)
+        :param tournament: Tournoi surveillé lors de la capture
+        :param cycle_id: Cycle de surveillance (voir begin_cycle)
+        :param timestamp: Instant de la capture (time.time, par défaut maintenant)
+        :return: True si la capture est en attente d'écriture, False si la file est pleine
+        """
+        try:
+            self._queue.put_nowait((timestamp or time.time(), image, tournament, cycle_id))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'archivage d'une capture: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, timestamp, image, tournament, cycle_id):
+        if not isinstance(image, np.ndarray):
+            image = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+        ok, data = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION])
+        if not ok:
+            raise ValueError("Compression de la capture impossible")
+
+        if self._chunk_file is None or self._chunk_file.tell() + len(data) > CHUNK_MAX_BYTES or \
+                time.time() - self._chunk_started > CHUNK_MAX_SECONDS:
+            self._rotate()
+        offset = self._chunk_file.tell()
+        self._chunk_file.write(data.tobytes())
+        # Données lisibles avant leur apparition dans l'index
+        self._chunk_file.flush()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO frames (timestamp, cycle_id, tournament, outcome, chunk, offset, length) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (timestamp, cycle_id, tournament, self._outcomes.get(cycle_id), self._chunk, offset, len(data))
+            )
+            self._db.commit()
+
+    def _rotate(self):
+        """Ferme le bloc courant, supprime les blocs expirés et ouvre un nouveau bloc"""
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+            self._chunk_file, self._chunk = None, None
+        self._evict()
+        self._chunk_started = time.time()
+        self._chunk = f"chunk_{int(self._chunk_started * 1000)}.bin"
+        self._chunk_file = open(os.path.join(self.directory, self._chunk), "ab")
+
+    def _evict(self):
+        """Supprime les blocs plus anciens que la rétention, puis les plus anciens au-delà de la taille maximale"""
+        chunks = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith("chunk_") and name.endswith(".bin") and name != self._chunk:
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                chunks.append((name, path, stat.st_size, stat.st_mtime))
+
+        current = self._chunk_file.tell() if self._chunk_file is not None else 0
+        total = current + sum(size for _, _, size, _ in chunks)
+        expired_before = time.time() - self.retention
+        evicted = []
+        for name, path, size, mtime in chunks:
+            if mtime >= expired_before and total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            evicted.append(name)
+
+        with self._lock:
+            if evicted:
+                self._db.executemany("DELETE FROM frames WHERE chunk = ?", [(name,) for name in evicted])
+            self._db.execute("DELETE FROM events WHERE timestamp < ?", (expired_before,))
+            self._db.commit()
+        if evicted:
+            logger.info(f"Archive des captures: {len(evicted)} blocs supprimés ({total / 1024 / 1024:.1f} Mo conservés)")
+
+    # Cycles et événements
+
+    def begin_cycle(self):
+        """Numéro d'un nouveau cycle de surveillance (unique dans l'archive)"""
+        with self._lock:
+            cycle_id = self._next_cycle
+            self._next_cycle += 1
+        return cycle_id
+
+    def end_cycle(self, cycle_id, tournament, outcome, detail=None):
+        """
+        Enregistre le résultat d'un cycle: étiquette ses captures et journalise l'événement
+
+        :param outcome: Résultat du cycle (OUTCOME_*)
+        """
+        with self._lock:
+            self._outcomes[cycle_id] = outcome
+            while len(self._outcomes) > _PENDING_OUTCOMES:
+                self._outcomes.popitem(last=False)
+            self._db.execute("UPDATE frames SET outcome = ? WHERE cycle_id = ?", (outcome, cycle_id))
+        self.log_event(outcome, tournament, cycle_id, detail)
+
+    def log_event(self, kind, tournament=None, cycle_id=None, detail=None):
+        """
+        Journalise un événement (les captures qui l'entourent peuvent ensuite être retrouvées)
+
+        :param kind: Type d'événement (résultat d'un cycle, état du client...)
+        :param detail: Précision facultative
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO events (timestamp, cycle_id, tournament, kind, detail) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), cycle_id, tournament, kind, detail)
+            )
+            self._db.commit()
+
+    # Requêtes
+
+    def flush(self):
+        """Attend l'écriture des captures en attente"""
+        self._queue.join()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def events(self, kind=None, tournament=None, since=None, limit=100):
+        """
+        Derniers événements journalisés, du plus ancien au plus récent
+
+        :param kind: Type d'événement (None = tous)
+        :param tournament: Tournoi (None = tous)
+        :param since: Instant minimal (time.time)
+        :param limit: Nombre maximal d'événements
+        :return: Liste d'instances de ArchiveEvent
+        """
+        conditions, params = [], []
+        for column, value in (("kind", kind), ("tournament", tournament)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(f"SELECT * FROM events {where} ORDER BY timestamp DESC LIMIT ?", (*params, limit))
+        return [ArchiveEvent(*row) for row in reversed(rows)]
+
+    def event(self, event_id):
+        """Événement d'après son numéro (None s'il n'existe pas ou a expiré)"""
+        rows = self._query("SELECT * FROM events WHERE id = ?", (event_id,))
+        return ArchiveEvent(*rows[0]) if rows else None
+
+    def frames_around(self, timestamp, before=5.0, after=5.0, tournament=None):
+        """
+        Captures prises autour d'un instant
+
+        :param timestamp: Instant (time.time), par exemple celui d'un événement
+        :param before: Secondes avant l'instant
+        :param after: Secondes après l'instant
+        :param tournament: Tournoi (None = tous)
+        :return: Liste d'instances de FrameRecord, par instant croissant
+        """
+        sql = "SELECT * FROM frames WHERE timestamp BETWEEN ? AND ?"
+        params = [timestamp - before, timestamp + after]
+        if tournament is not None:
+            sql += " AND tournament = ?"
+            params.append(tournament)
+        return [FrameRecord(*row) for row in self._query(sql + " ORDER BY timestamp", params)]
+
+    def frames_for_cycle(self, cycle_id):
+        """Captures d'un cycle de surveillance, par instant croissant"""
+        rows = self._query("SELECT * FROM frames WHERE cycle_id = ? ORDER BY timestamp", (cycle_id,))
+        return [FrameRecord(*row) for row in rows]
+
+    def read_bytes(self, record):
+        """Données PNG d'une capture (None si son bloc a été supprimé)"""
+        try:
+            with open(os.path.join(self.directory, record.chunk), "rb") as f:
+                f.seek(record.offset)
+                data = f.read(record.length)
+        except OSError:
+            return None
+        return data if len(data) == record.length else None
+
+    def read(self, record):
+        """Image BGR d'une capture (None si son bloc a été supprimé)"""
+        data = self.read_bytes(record)
+        if data is None:
+            return None
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def export(self, records, directory="resources/screenshots"):
+        """
+        Écrit des captures en fichiers PNG individuels (calibration, ajustement des seuils)
+
+        :return: Liste des fichiers écrits
+        """
+        os.makedirs(directory, exist_ok=True)
+        written = []
+        for record in records:
+            data = self.read_bytes(record)
+            if data is None:
+                continue
+            when = datetime.fromtimestamp(record.timestamp).strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            path = os.path.join(directory, f"window_capture_{when}.png")
+            with open(path, "wb") as f:
+                f.write(data)
+            written.append(path)
+        return written
+
+    def stats(self):
+        """Nombre de captures, nombre de blocs et taille de l'archive (en octets)"""
+        frames, chunks = self._query("SELECT COUNT(*), COUNT(DISTINCT chunk) FROM frames")[0]
+        size = sum(
+            os.path.getsize(os.path.join(self.directory, name))
+            for name in os.listdir(self.directory) if name.startswith("chunk_")
+        )
+        return {"frames": frames, "chunks": chunks, "bytes": size, "dropped": self.dropped}
+
+    def close(self):
+        """Écrit les captures en attente puis ferme l'archive"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._chunk_file is not None:
+            self._chunk_file.close()
+            self._chunk_file = None
+        with self._lock:
+            self._db.close()
+
+
+_archive = None
+_archive_enabled = True
+_archive_settings = {}
+_archive_lock = threading.Lock()
+
+
+def configure_frame_archive(directory=DEFAULT_ARCHIVE_DIR, retention_hours=DEFAULT_RETENTION_HOURS, max_mb=DEFAULT_MAX_MB):
+    """
+    Réglages de l'archive partagée, appliqués à sa création (max_mb <= 0 désactive l'archivage)
+    """
+    global _archive_enabled
+    with _archive_lock:
+        _archive_enabled = max_mb > 0
+        _archive_settings.update(directory=directory, retention_hours=retention_hours, max_mb=max_mb)
+
+
+def get_frame_archive():
+    """Retourne l'archive partagée par tous les hoppers du processus (None si l'archivage est désactivé)"""
+    global _archive
+    if _archive is None and _archive_enabled:
+        with _archive_lock:
+            if _archive is None and _archive_enabled:
+                _archive = FrameArchive(**_archive_settings)
+    return _archive
+
+
+def set_frame_archive(archive):
+    """
+    Remplace l'archive partagée (par exemple pour la simulation)
+
+    :param archive: Instance de FrameArchive, None pour revenir à l'archive par défaut
+    """
+    global _archive
+    with _archive_lock:
+        _archive = archive
+
+
+def close_frame_archive():
+    """Ferme l'archive partagée si elle a été ouverte"""
+    global _archive
+    with _archive_lock:
+        archive, _archive = _archive, None
+    if archive is not None:
+        archive.close()
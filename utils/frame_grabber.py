@@ -0,0 +1,198 @@
+"""
+Capture continue de la fenêtre CoinPoker dans un thread producteur
+
+Le producteur capture la fenêtre à une fréquence fixe et publie chaque capture
+dans un emplacement unique « dernière capture »: les consommateurs (détection)
+prennent toujours la capture la plus récente, jamais une capture en attente
+devenue obsolète. Le temps de capture est ainsi recouvert par la détection, et
+un changement d'état d'une ligne est visible au plus une période de capture
+plus tard.
+
+Les captures publiées sont en lecture seule: un consommateur peut conserver
+une capture pendant que le producteur en publie de nouvelles, sans copie.
+"""
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Fréquence de capture par défaut (captures par seconde)
+DEFAULT_FPS = 5
+
+# Âge maximal d'une capture (en périodes de capture) pour être servie à la place d'une capture directe
+MAX_AGE_PERIODS = 2
+
+
+class Frame:
+    """Capture publiée par le producteur"""
+
+    __slots__ = ("image", "seq", "timestamp")
+
+    def __init__(self, image, seq, timestamp):
+        # Image BGR en lecture seule
+        self.image = image
+        # Numéro de la capture (strictement croissant)
+        self.seq = seq
+        # Instant de la capture (time.perf_counter)
+        self.timestamp = timestamp
+
+
+class FrameGrabber:
+    def __init__(self, capture, fps=DEFAULT_FPS, name="frame-grabber", phase=0.0):
+        """
+        Producteur de captures à fréquence fixe
+
+        :param capture: Fonction sans argument retournant une image BGR, ou None en cas d'échec
+        :param fps: Nombre de captures par seconde
+        :param name: Nom du thread producteur
+        :param phase: Décalage (en secondes) de la première capture, pour décaler plusieurs producteurs au démarrage
+        """
+        if fps <= 0:
+            raise ValueError("La fréquence de capture doit être positive")
+        self.capture = capture
+        self.period = 1.0 / fps
+        self.name = name
+        self.phase = phase
+
+        self._latest = None
+        self._seq = 0
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # Fonctions sans argument appelées à chaque publication et à l'arrêt (voir add_listener)
+        self._listeners = []
+
+        # Statistiques de capture
+        self.captured = 0
+        self.failures = 0
+        self.capture_time_total = 0.0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Démarre le thread producteur"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"Capture continue démarrée ({1 / self.period:.1f} captures/s)")
+
+    def stop(self, timeout=2):
+        """Arrête le thread producteur et réveille les consommateurs en attente"""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        self._notify_listeners()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        logger.info(f"Capture continue arrêtée: {self.stats()}")
+
+    def _run(self):
+        if self.phase > 0 and self._stop_event.wait(self.phase):
+            return
+        next_time = time.perf_counter()
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            try:
+                image = self.capture()
+            except Exception as e:
+                logger.error(f"Erreur lors de la capture continue: {str(e)}")
+                image = None
+            elapsed = time.perf_counter() - start
+
+            if image is None:
+                self.failures += 1
+            else:
+                image.setflags(write=False)
+                self.captured += 1
+                self.capture_time_total += elapsed
+                with self._condition:
+                    self._seq += 1
+                    self._latest = Frame(image, self._seq, start)
+                    self._condition.notify_all()
+                self._notify_listeners()
+
+            # Cadence fixe; si la capture prend plus d'une période, on ne rattrape pas le retard
+            next_time = max(next_time + self.period, time.perf_counter())
+            self._stop_event.wait(next_time - time.perf_counter())
+
+    def latest(self, max_age=None):
+        """
+        Retourne la capture la plus récente
+
+        :param max_age: Âge maximal en secondes (None = quel que soit son âge)
+        :return: Instance de Frame, ou None si aucune capture récente n'est disponible
+        """
+        with self._condition:
+            frame = self._latest
+        if frame is None:
+            return None
+        if max_age is not None and time.perf_counter() - frame.timestamp > max_age:
+            return None
+        return frame
+
+    def fresh(self):
+        """Capture la plus récente si elle date de moins de MAX_AGE_PERIODS périodes, None sinon"""
+        if not self.running:
+            return None
+        return self.latest(max_age=MAX_AGE_PERIODS * self.period)
+
+    def wait_for_new(self, after_seq, timeout=None):
+        """
+        Attend une capture plus récente que after_seq
+
+        :param after_seq: Numéro de la dernière capture traitée par le consommateur (0 = aucune)
+        :param timeout: Délai maximal d'attente en secondes (None = illimité)
+        :return: Instance de Frame, ou None si le délai expire ou si le producteur est arrêté
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._condition:
+            while self._seq <= after_seq:
+                if self._stop_event.is_set():
+                    return None
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            return self._latest
+
+    def add_listener(self, callback):
+        """
+        Enregistre une fonction appelée par le producteur à chaque nouvelle capture et à l'arrêt
+
+        Permet d'attendre les captures sans bloquer de thread, par exemple depuis une
+        boucle asyncio (la fonction doit alors se contenter de réveiller la boucle).
+
+        :param callback: Fonction sans argument, appelée dans le thread producteur
+        """
+        with self._condition:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Retire une fonction enregistrée par add_listener"""
+        with self._condition:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify_listeners(self):
+        with self._condition:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Erreur lors de la notification d'une capture: {str(e)}")
+
+    def stats(self):
+        """Retourne les statistiques de capture (captures, échecs, durée moyenne en ms)"""
+        return {
+            "captured": self.captured,
+            "failures": self.failures,
+            "capture_ms_mean": 1000 * self.capture_time_total / self.captured if self.captured else 0.0,
+        }
@@ -3,15 +3,57 @@ Utilitaires pour les captures d'écran et le traitement d'images
 """
 
 import os
-import pyautogui
 import numpy as np
 from datetime import datetime
 import logging
 import cv2
-from PIL import Image, ImageGrab
+
+from input_dispatcher import get_input_dispatcher, PRIORITY_NAVIGATION
+from backends import get_backend
+from utils.detections import Detections
+from utils.template_matching import locate_best, locate_first, locate_all, load_template, match_regions, resolve_confidence
+from utils.frame_grabber import FrameGrabber
+from utils.row_index import row_index
 
 logger = logging.getLogger("coinpoker_hopper")
 
+# Pool de processus de détection (optionnel), voir set_detection_pool()
+_detection_pool = None
+
+def set_detection_pool(pool):
+    """
+    Délègue la correspondance de templates à un pool de processus
+
+    :param pool: Instance de DetectionPool, ou None pour détecter dans le processus courant
+    """
+    global _detection_pool
+    _detection_pool = pool
+
+def _source_cache(window_manager):
+    """Cache de détection propre à la fenêtre capturée (None = cache global)"""
+    return getattr(window_manager, "detection_cache", None)
+
+def _locate_best(haystack_cv, image_path, confidence, cache=None):
+    """Meilleure correspondance, calculée localement ou par le pool de détection"""
+    confidence = resolve_confidence(image_path, confidence)
+    if _detection_pool is not None:
+        return _detection_pool.detect(haystack_cv, [(image_path, confidence, "best")])[0]
+    return locate_best(haystack_cv, image_path, confidence, cache)
+
+def _locate_first(haystack_cv, image_path, confidence):
+    """Première correspondance franche, calculée localement ou par le pool de détection (sans cache de détection)"""
+    confidence = resolve_confidence(image_path, confidence)
+    if _detection_pool is not None:
+        return _detection_pool.detect(haystack_cv, [(image_path, confidence, "first")])[0]
+    return locate_first(haystack_cv, image_path, confidence)
+
+def _locate_all(haystack_cv, image_path, confidence, cache=None):
+    """Toutes les correspondances, calculées localement ou par le pool de détection"""
+    confidence = resolve_confidence(image_path, confidence)
+    if _detection_pool is not None:
+        return _detection_pool.detect(haystack_cv, [(image_path, confidence, "all")])[0]
+    return locate_all(haystack_cv, image_path, confidence, cache)
+
 def take_screenshot(directory="resources/screenshots", prefix="coinpoker"):
     """
     Prend une capture d'écran et la sauvegarde avec un horodatage
@@ -28,155 +70,246 @@ def take_screenshot(directory="resources/screenshots", prefix="coinpoker"):
     filename = f"{directory}/{prefix}_{timestamp}.png"
     
     # Capturer l'écran et sauvegarder
-    screenshot = pyautogui.screenshot()
+    screenshot = get_backend().screenshot()
     screenshot.save(filename)
     
     logger.info(f"Capture d'écran sauvegardée: {filename}")
     return filename
 
-def find_on_screen(image_path, confidence=0.8, window_manager=None):
+def find_on_screen(image_path, confidence=None, window_manager=None, first_hit=True):
     """
     Cherche une image à l'écran ou dans la zone de la fenêtre CoinPoker
     
     :param image_path: Chemin vers l'image à chercher
-    :param confidence: Niveau de confiance (0-1)
+    :param confidence: Niveau de confiance (0-1), None = seuil calibré de l'image ou 0.8
     :param window_manager: Instance de WindowManager (si fournie, cherche uniquement dans la fenêtre)
+    :param first_hit: Si True, s'arrête à la première correspondance franche (voir locate_first);
+                      sinon, parcourt toute l'image pour la meilleure correspondance
     :return: Position (x, y) sur l'écran si trouvé, None sinon
     """
     try:
-        # Si un window_manager est fourni, chercher uniquement dans la fenêtre
-        if window_manager and window_manager.window_rect:
-            logger.debug(f"Recherche de l'image {image_path} dans la zone de la fenêtre CoinPoker")
-            
-            # Capturer la zone de la fenêtre
-            window_image = window_manager.capture_window_area()
-            if window_image is None:
-                logger.warning("Impossible de capturer la zone de la fenêtre, retour à la recherche sur tout l'écran")
-                position = pyautogui.locateCenterOnScreen(image_path, confidence=confidence)
-                return position
-            
-            # Charger l'image à rechercher
-            needle = Image.open(image_path)
-            
-            # Convertir en OpenCV pour la recherche de template
-            haystack_cv = cv2.cvtColor(np.array(window_image), cv2.COLOR_RGB2BGR)
-            needle_cv = cv2.cvtColor(np.array(needle), cv2.COLOR_RGB2BGR)
-            
-            # Utiliser la méthode de correspondance de template de OpenCV
-            result = cv2.matchTemplate(haystack_cv, needle_cv, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        # Capturer la fenêtre si un window_manager est fourni, sinon tout l'écran
+        frame, source = _capture_search_area(window_manager)
+        logger.debug(f"Recherche de l'image {image_path} ({'fenêtre CoinPoker' if source else 'écran'})")
+        
+        # Chercher la première correspondance franche ou la meilleure (template mis en cache, méthode directe ou FFT)
+        if first_hit:
+            center, max_val = _locate_first(frame, image_path, confidence)
+        else:
+            center, max_val = _locate_best(frame, image_path, confidence, _source_cache(source))
+        
+        # Vérifier si la correspondance est suffisamment bonne
+        if center:
+            # Convertir en coordonnées écran
+            screen_pos = _to_screen(source, *center)
             
-            # Vérifier si la correspondance est suffisamment bonne
-            if max_val >= confidence:
-                # Calculer le centre de l'image trouvée
-                needle_w, needle_h = needle.size
-                center_x = max_loc[0] + needle_w // 2
-                center_y = max_loc[1] + needle_h // 2
-                
-                # Convertir en coordonnées écran
-                screen_pos = window_manager.convert_to_screen_coordinates(center_x, center_y)
-                
-                logger.debug(f"Image {image_path} trouvée dans la fenêtre à la position {screen_pos}")
-                return screen_pos
-            else:
-                logger.debug(f"Image {image_path} non trouvée dans la fenêtre (confiance max: {max_val})")
-                return None
+            logger.debug(f"Image {image_path} trouvée à la position {screen_pos}")
+            return screen_pos
         else:
-            # Recherche standard sur tout l'écran
-            position = pyautogui.locateCenterOnScreen(image_path, confidence=confidence)
-            if position:
-                logger.debug(f"Image {image_path} trouvée à la position {position}")
-            return position
+            logger.debug(f"Image {image_path} non trouvée (confiance max: {max_val})")
+            return None
     except Exception as e:
         logger.error(f"Erreur lors de la recherche de l'image {image_path}: {str(e)}")
         return None
 
-def click_on_image(image_path, confidence=0.8, click=True, window_manager=None):
+def click_on_image(image_path, confidence=None, click=True, window_manager=None, priority=PRIORITY_NAVIGATION,
+                   first_hit=True):
     """
     Trouve et clique sur une image à l'écran
     
     :param image_path: Chemin vers l'image à chercher
-    :param confidence: Niveau de confiance (0-1)
+    :param confidence: Niveau de confiance (0-1), None = seuil calibré de l'image ou 0.8
     :param click: Si True, clique sur l'image; sinon, retourne juste la position
     :param window_manager: Instance de WindowManager (si fournie, cherche uniquement dans la fenêtre)
+    :param priority: Priorité du clic dans le dispatcher d'entrées
+    :param first_hit: Si True, s'arrête à la première correspondance franche (voir find_on_screen)
     :return: Position (x, y) si trouvé, None sinon
     """
-    position = find_on_screen(image_path, confidence, window_manager)
+    position = find_on_screen(image_path, confidence, window_manager, first_hit)
     
     if position and click:
-        # Si un window_manager est fourni et que la fenêtre n'est pas au premier plan,
-        # la mettre au premier plan avant de cliquer
-        if window_manager:
-            window_manager.focus_coinpoker_window()
-            
-        pyautogui.click(position)
+        dispatcher = get_input_dispatcher()
+        with dispatcher.session():
+            # Si un window_manager est fourni et que la fenêtre n'est pas au premier plan,
+            # la mettre au premier plan avant de cliquer
+            if window_manager:
+                window_manager.focus_coinpoker_window(priority=priority)
+                
+            dispatcher.click(position, priority=priority)
         logger.info(f"Clic effectué à la position {position}")
     
     return position
 
-def find_all_on_screen(image_path, confidence=0.8, window_manager=None):
+def capture_screen():
+    """
+    Capture tout l'écran en mémoire sous forme d'image BGR (numpy)
+    
+    :return: Image BGR
+    """
+    return cv2.cvtColor(np.array(get_backend().screenshot()), cv2.COLOR_RGB2BGR)
+
+def capture_window_frame(window_manager, save_screenshot=True):
+    """
+    Capture directement la fenêtre CoinPoker sous forme d'image BGR (numpy)
+    
+    :param window_manager: Instance de WindowManager
+    :param save_screenshot: Si True, enregistre la capture pour le débogage
+    :return: Image BGR, ou None en cas d'échec
+    """
+    window_image = window_manager.capture_window_area(save_screenshot=save_screenshot)
+    if window_image is None:
+        return None
+    return cv2.cvtColor(np.array(window_image), cv2.COLOR_RGB2BGR)
+
+def capture_frame(window_manager=None):
+    """
+    Capture la fenêtre CoinPoker (ou tout l'écran) sous forme d'image BGR (numpy)
+    
+    Si une capture continue est attachée au window_manager (voir attach_frame_grabber),
+    sa dernière capture est utilisée lorsqu'elle est récente.
+    
+    :param window_manager: Instance de WindowManager (None = tout l'écran)
+    :return: Image BGR, ou None en cas d'échec
+    """
+    if window_manager is None:
+        return capture_screen()
+    
+    grabber = getattr(window_manager, "frame_grabber", None)
+    if grabber is not None:
+        frame = grabber.fresh()
+        if frame is not None:
+            return frame.image
+    
+    return capture_window_frame(window_manager)
+
+def attach_frame_grabber(window_manager, fps, phase=0.0):
+    """
+    Démarre une capture continue de la fenêtre et l'attache au window_manager
+    
+    :param window_manager: Instance de WindowManager
+    :param fps: Nombre de captures par seconde
+    :param phase: Décalage (en secondes) de la première capture (voir WindowRegistry.capture_phase)
+    :return: Instance de FrameGrabber
+    """
+    detach_frame_grabber(window_manager)
+    grabber = FrameGrabber(
+        lambda: capture_window_frame(window_manager, save_screenshot=False) if window_manager.window_rect else None,
+        fps,
+        phase=phase
+    )
+    window_manager.frame_grabber = grabber
+    grabber.start()
+    return grabber
+
+def detach_frame_grabber(window_manager):
+    """Arrête la capture continue attachée au window_manager, s'il y en a une"""
+    grabber = getattr(window_manager, "frame_grabber", None)
+    if grabber is not None:
+        window_manager.frame_grabber = None
+        grabber.stop()
+
+def _capture_search_area(window_manager):
+    """
+    Capture la zone de recherche: la fenêtre si possible, sinon tout l'écran
+    
+    :return: Tuple (image BGR, window_manager ayant servi à la capture ou None pour l'écran)
+    """
+    if window_manager and window_manager.window_rect:
+        frame = capture_frame(window_manager)
+        if frame is not None:
+            return frame, window_manager
+        logger.warning("Impossible de capturer la zone de la fenêtre, retour à la recherche sur tout l'écran")
+    return capture_screen(), None
+
+def _to_screen(window_manager, x, y):
+    """Convertit des coordonnées de capture en coordonnées écran"""
+    if window_manager is None:
+        return (x, y)
+    return window_manager.convert_to_screen_coordinates(x, y)
+
+def _screen_offset(window_manager):
+    """Décalage (dx, dy) des coordonnées de capture vers les coordonnées écran"""
+    if window_manager is None or not window_manager.window_rect:
+        return (0, 0)
+    return window_manager.window_rect[0], window_manager.window_rect[1]
+
+def find_all_in_frame(frame, image_path, confidence, window_manager=None):
+    """
+    Cherche toutes les occurrences d'une image dans une capture déjà effectuée
+    
+    :param frame: Capture BGR (voir capture_frame)
+    :param image_path: Chemin vers l'image à chercher
+    :param confidence: Niveau de confiance (0-1), None = seuil calibré de l'image ou 0.8
+    :param window_manager: Instance de WindowManager ayant effectué la capture (None = capture de l'écran)
+    :return: Instance de Detections en coordonnées écran, itérable comme une liste de positions (x, y)
+    """
+    detections = _locate_all(frame, image_path, confidence, _source_cache(window_manager))
+    return detections.translate(*_screen_offset(window_manager))
+
+def find_in_frame(frame, image_path, confidence=None, window_manager=None):
+    """
+    Cherche la première correspondance franche d'une image dans une capture déjà effectuée
+
+    :param frame: Capture BGR (voir capture_frame)
+    :param image_path: Chemin vers l'image à chercher
+    :param confidence: Niveau de confiance (0-1), None = seuil calibré de l'image ou 0.8
+    :param window_manager: Instance de WindowManager ayant effectué la capture (None = capture de l'écran)
+    :return: Position (x, y) sur l'écran si trouvé, None sinon
+    """
+    center, _ = _locate_first(frame, image_path, confidence)
+    return _to_screen(window_manager, *center) if center else None
+
+def find_rows_in_frame(frame, fingerprint, window_manager=None, rivals=()):
+    """
+    Cherche les lignes d'une capture dont le texte a l'empreinte d'un nom (voir utils.row_index)
+    
+    L'index des lignes est construit une seule fois par capture et partagé par tous les noms recherchés.
+    
+    :param frame: Capture BGR (voir capture_frame)
+    :param fingerprint: Instance de NameFingerprint du nom recherché
+    :param window_manager: Instance de WindowManager ayant effectué la capture (None = capture de l'écran)
+    :param rivals: Empreintes des autres noms surveillés, pour départager les noms presque identiques
+    :return: Instance de Detections en coordonnées écran
+    """
+    detections = row_index(frame).lookup(fingerprint, rivals)
+    return detections.translate(*_screen_offset(window_manager))
+
+def check_regions_in_frame(frame, screen_positions, image_path, confidence, window_manager=None, region_size=(100, 20)):
+    """
+    Vérifie la présence d'une image autour de plusieurs positions d'une capture, en une seule passe
+    
+    :param frame: Capture BGR (voir capture_frame)
+    :param screen_positions: Positions (x, y) écran (liste ou Detections), centres des régions à vérifier
+    :param image_path: Chemin vers l'image à chercher
+    :param confidence: Niveau de confiance (0-1), None = seuil calibré de l'image ou 0.8
+    :param window_manager: Instance de WindowManager ayant effectué la capture (None = capture de l'écran)
+    :param region_size: Taille (largeur, hauteur) des régions vérifiées
+    :return: Liste de booléens, un par position
+    """
+    confidence = resolve_confidence(image_path, confidence)
+    dx, dy = _screen_offset(window_manager)
+    centers = [(x - dx, y - dy) for x, y in screen_positions]
+    scores = match_regions(frame, centers, load_template(image_path), region_size)
+    return [bool(score >= confidence) for score in scores]
+
+def find_all_on_screen(image_path, confidence=None, window_manager=None):
     """
     Cherche toutes les occurrences d'une image à l'écran ou dans la zone de la fenêtre CoinPoker
     
     :param image_path: Chemin vers l'image à chercher
-    :param confidence: Niveau de confiance (0-1)
+    :param confidence: Niveau de confiance (0-1), None = seuil calibré de l'image ou 0.8
     :param window_manager: Instance de WindowManager (si fournie, cherche uniquement dans la fenêtre)
-    :return: Liste de positions (x, y) sur l'écran si trouvées, liste vide sinon
+    :return: Instance de Detections en coordonnées écran (vide si aucune occurrence n'est trouvée)
     """
     try:
-        # Si un window_manager est fourni, chercher uniquement dans la fenêtre
-        if window_manager and window_manager.window_rect:
-            logger.debug(f"Recherche de toutes les occurrences de l'image {image_path} dans la zone de la fenêtre CoinPoker")
-            
-            # Capturer la zone de la fenêtre
-            window_image = window_manager.capture_window_area()
-            if window_image is None:
-                logger.warning("Impossible de capturer la zone de la fenêtre, retour à la recherche sur tout l'écran")
-                all_positions = list(pyautogui.locateAllOnScreen(image_path, confidence=confidence))
-                return [pyautogui.center(pos) for pos in all_positions]
-            
-            # Charger l'image à rechercher
-            needle = Image.open(image_path)
-            
-            # Convertir en OpenCV pour la recherche de template
-            haystack_cv = cv2.cvtColor(np.array(window_image), cv2.COLOR_RGB2BGR)
-            needle_cv = cv2.cvtColor(np.array(needle), cv2.COLOR_RGB2BGR)
-            
-            # Utiliser la méthode de correspondance de template de OpenCV
-            result = cv2.matchTemplate(haystack_cv, needle_cv, cv2.TM_CCOEFF_NORMED)
-            locations = np.where(result >= confidence)
-            
-            # Obtenir toutes les positions
-            positions = []
-            needle_w, needle_h = needle.size
-            
-            # Fusionner les points proches
-            threshold_dist = 10  # Distance en pixels pour considérer deux points comme identiques
-            for pt in zip(*locations[::-1]):  # Inverser car OpenCV donne (y, x)
-                center_x = pt[0] + needle_w // 2
-                center_y = pt[1] + needle_h // 2
-                
-                # Vérifier si le point est proche d'un point déjà trouvé
-                is_close = False
-                for existing_pt in positions:
-                    if ((existing_pt[0] - center_x) ** 2 + (existing_pt[1] - center_y) ** 2) < threshold_dist ** 2:
-                        is_close = True
-                        break
-                
-                if not is_close:
-                    positions.append((center_x, center_y))
-            
-            # Convertir en coordonnées écran
-            screen_positions = [window_manager.convert_to_screen_coordinates(x, y) for x, y in positions]
-            
-            logger.debug(f"Trouvé {len(screen_positions)} occurrences de l'image {image_path} dans la fenêtre")
-            return screen_positions
-        else:
-            # Recherche standard sur tout l'écran
-            all_positions = list(pyautogui.locateAllOnScreen(image_path, confidence=confidence))
-            centers = [pyautogui.center(pos) for pos in all_positions]
-            logger.debug(f"Trouvé {len(centers)} occurrences de l'image {image_path} sur l'écran")
-            return centers
+        # Capturer la fenêtre si un window_manager est fourni, sinon tout l'écran
+        frame, source = _capture_search_area(window_manager)
+        
+        # Chercher toutes les correspondances (points proches fusionnés), en coordonnées écran
+        screen_positions = find_all_in_frame(frame, image_path, confidence, source)
+        
+        logger.debug(f"Trouvé {len(screen_positions)} occurrences de l'image {image_path} ({'fenêtre CoinPoker' if source else 'écran'})")
+        return screen_positions
     except Exception as e:
         logger.error(f"Erreur lors de la recherche des occurrences de l'image {image_path}: {str(e)}")
-        return []
+        return Detections()
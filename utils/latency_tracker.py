@@ -0,0 +1,187 @@
+"""
+Suivi de la latence d'inscription (SLO)
+
+Mesure, pour chaque inscription, le temps écoulé entre la première capture où la
+ligne du tournoi affiche REGISTERING et le clic sur ACCEPT, décomposé en phases:
+- detection: de la capture à la fin de la détection (cycles précédents inclus)
+- focus: mise au premier plan de la fenêtre (attente du dispatcher d'entrées incluse)
+- click: recherche et clic sur le bouton d'inscription
+- dialog: attente de la fenêtre de confirmation et clic sur ACCEPT
+
+Les mesures sont ajoutées à un fichier JSONL local et peuvent être résumées en
+percentiles avec latency_report().
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger("coinpoker_hopper")
+
+LATENCY_FILE = "logs/registration_latency.jsonl"
+
+# Jalons successifs d'une inscription et phase mesurée entre chaque jalon et le précédent
+MARKS = ("seen", "detected", "focused", "register_clicked", "accept_clicked")
+PHASES = {
+    "detected": "detection",
+    "focused": "focus",
+    "register_clicked": "click",
+    "accept_clicked": "dialog",
+}
+
+REPORT_PERCENTILES = (50, 90, 95, 99)
+
+
+class RegistrationTiming:
+    """Jalons horodatés (time.perf_counter) d'une tentative d'inscription"""
+
+    def __init__(self, tournament_name, seen_at, strategy=None):
+        self.tournament_name = tournament_name
+        self.strategy = strategy
+        self.timestamp = time.time()
+        self.marks = {"seen": seen_at}
+
+    def mark(self, name):
+        """Enregistre l'instant d'un jalon (le premier enregistrement est conservé)"""
+        self.marks.setdefault(name, time.perf_counter())
+
+    def to_record(self, outcome):
+        """
+        Construit l'enregistrement JSON de l'inscription
+
+        :param outcome: Résultat ("confirmed", "no_confirmation", "failed")
+        :return: Dictionnaire sérialisable
+        """
+        record = {
+            "timestamp": self.timestamp,
+            "tournament": self.tournament_name,
+            "strategy": self.strategy,
+            "outcome": outcome,
+        }
+        previous = self.marks["seen"]
+        for name in MARKS[1:]:
+            if name in self.marks:
+                record[f"{PHASES[name]}_ms"] = round(1000 * (self.marks[name] - previous), 1)
+                previous = self.marks[name]
+        record["total_ms"] = round(1000 * (max(self.marks.values()) - self.marks["seen"]), 1)
+        return record
+
+
+class LatencyTracker:
+    def __init__(self, path=LATENCY_FILE):
+        """
+        :param path: Fichier JSONL où ajouter les mesures
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def begin(self, tournament_name, seen_at=None, strategy=None):
+        """
+        Démarre le suivi d'une tentative d'inscription
+
+        :param tournament_name: Nom du tournoi
+        :param seen_at: Instant (time.perf_counter) de la première capture montrant REGISTERING
+        :param strategy: Stratégie d'inscription du plan de détection
+        :return: Instance de RegistrationTiming
+        """
+        return RegistrationTiming(tournament_name, seen_at or time.perf_counter(), strategy)
+
+    def finish(self, timing, outcome):
+        """
+        Enregistre une tentative d'inscription terminée
+
+        :param timing: Instance de RegistrationTiming
+        :param outcome: Résultat ("confirmed", "no_confirmation", "failed")
+        :return: Enregistrement ajouté au fichier
+        """
+        record = timing.to_record(outcome)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._lock, open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement de la latence d'inscription: {str(e)}")
+
+        logger.info(
+            f"Latence d'inscription '{timing.tournament_name}' ({outcome}): {record['total_ms']:.0f} ms "
+            f"(" + ", ".join(f"{phase} {record[f'{phase}_ms']:.0f} ms" for phase in PHASES.values() if f"{phase}_ms" in record) + ")"
+        )
+        return record
+
+
+def load_latency_records(path=LATENCY_FILE, tournament_name=None):
+    """
+    Charge les mesures de latence enregistrées
+
+    :param path: Fichier JSONL des mesures
+    :param tournament_name: Ne garder que ce tournoi (None = tous)
+    :return: Liste d'enregistrements
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if tournament_name is None or record.get("tournament") == tournament_name:
+                records.append(record)
+    return records
+
+
+def _percentile(sorted_values, percentile):
+    """Percentile par la méthode du rang le plus proche"""
+    index = max(0, min(len(sorted_values) - 1, int(round(percentile / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def latency_report(path=LATENCY_FILE, tournament_name=None):
+    """
+    Résume les latences d'inscription en percentiles, par tournoi et par phase
+
+    :param path: Fichier JSONL des mesures
+    :param tournament_name: Ne garder que ce tournoi (None = tous)
+    :return: Dictionnaire tournoi -> champ -> {count, p50, p90, p95, p99, max}
+    """
+    by_tournament = {}
+    for record in load_latency_records(path, tournament_name):
+        by_tournament.setdefault(record.get("tournament"), []).append(record)
+
+    report = {}
+    for tournament, records in by_tournament.items():
+        fields = {}
+        for field in ["total_ms"] + [f"{phase}_ms" for phase in PHASES.values()]:
+            values = sorted(r[field] for r in records if field in r)
+            if not values:
+                continue
+            summary = {"count": len(values), "max": values[-1]}
+            for percentile in REPORT_PERCENTILES:
+                summary[f"p{percentile}"] = _percentile(values, percentile)
+            fields[field] = summary
+        report[tournament] = fields
+    return report
+
+
+def format_latency_report(report):
+    """Met en forme le rapport de latence pour l'affichage"""
+    lines = []
+    header = f"{'phase':<14}{'n':>6}" + "".join(f"{'p' + str(p):>10}" for p in REPORT_PERCENTILES) + f"{'max':>10}"
+    for tournament, fields in sorted(report.items(), key=lambda item: str(item[0])):
+        lines.append(f"Tournoi '{tournament}' (ms)")
+        lines.append(header)
+        for field, summary in fields.items():
+            lines.append(
+                f"{field[:-3]:<14}{summary['count']:>6}"
+                + "".join(f"{summary[f'p{p}']:>10.0f}" for p in REPORT_PERCENTILES)
+                + f"{summary['max']:>10.0f}"
+            )
+        lines.append("")
+    return "\n".join(lines) if lines else "Aucune mesure de latence enregistrée"
@@ -0,0 +1,57 @@
+"""
+Import différé des modules lourds
+
+lazy_import() retourne un substitut de module: le module réel n'est importé
+qu'au premier accès à l'un de ses attributs. Les modules coûteux à importer
+(pyautogui, pygetwindow, PIL...) ne ralentissent ainsi pas le démarrage de
+l'interface.
+"""
+
+import importlib
+import threading
+
+
+class LazyModule:
+    """Substitut d'un module, importé au premier accès à un attribut"""
+
+    def __init__(self, name, install_hint=None):
+        self.__dict__["_name"] = name
+        self.__dict__["_install_hint"] = install_hint
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            with self.__dict__["_lock"]:
+                module = self.__dict__["_module"]
+                if module is None:
+                    try:
+                        module = importlib.import_module(self._name)
+                    except ImportError as e:
+                        if self._install_hint:
+                            raise ImportError(self._install_hint) from e
+                        raise
+                    self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+
+    def __repr__(self):
+        state = "importé" if self.__dict__["_module"] is not None else "non importé"
+        return f"<module différé '{self._name}' ({state})>"
+
+
+def lazy_import(name, install_hint=None):
+    """
+    Déclare un module à importer au premier usage
+
+    :param name: Nom complet du module (par exemple "PIL.ImageGrab")
+    :param install_hint: Message de l'ImportError levée si le module est absent
+    :return: Instance de LazyModule
+    """
+    return LazyModule(name, install_hint)
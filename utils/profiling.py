@@ -0,0 +1,251 @@
+"""
+Profilage à la demande des sessions de surveillance
+
+Deux modes, activables et désactivables sans redémarrage (interface, option
+--profile, signal SIGUSR1 sous Linux/macOS) :
+  - « sampling » : un thread échantillonne les piles de tous les threads
+    (sys._current_frames) à intervalle fixe. Le surcoût est faible et
+    indépendant du code profilé. Les piles sont écrites au format « collapsed »
+    (une ligne par pile, fonctions séparées par « ; » suivies du nombre
+    d'échantillons), lisible par flamegraph.pl ou speedscope.
+  - « cprofile » : chaque cycle de surveillance est exécuté sous cProfile et
+    les statistiques des cycles sont cumulées dans un fichier pstats.
+
+Le temps échantillonné est aussi attribué aux étapes du hopper (détection,
+capture, navigation, inscription, attente...) d'après la méthode du hopper la
+plus interne de chaque pile. Les fichiers sont écrits dans logs/ à l'arrêt.
+"""
+
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+import cProfile
+import pstats
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger("coinpoker_hopper")
+
+MODE_SAMPLING = "sampling"
+MODE_CPROFILE = "cprofile"
+MODES = (MODE_SAMPLING, MODE_CPROFILE)
+
+# Intervalle d'échantillonnage par défaut (en secondes)
+DEFAULT_SAMPLE_INTERVAL = 0.01
+
+# Profondeur maximale des piles enregistrées
+MAX_STACK_DEPTH = 64
+
+# Étapes du hopper, d'après le nom de ses méthodes (la méthode la plus interne d'une pile l'emporte)
+STAGES = {
+    "_capture": "capture",
+    "capture_frame": "capture",
+    "find_tournament_in_list": "détection",
+    "_find_all": "détection",
+    "_buttons_at_offsets": "détection",
+    "navigate_to_tournaments": "navigation",
+    "focus_coinpoker_window": "focus",
+    "activate_window": "focus",
+    "register_for_tournament": "inscription",
+    "_confirm_registration": "confirmation",
+    "recover": "récupération",
+    "scroll_tournament_list": "défilement",
+    "_wait": "attente",
+    "_wait_for_next_cycle": "attente",
+    "_async_wait": "attente",
+}
+
+
+class Profiler:
+    def __init__(self, output_dir="logs"):
+        """
+        Profileur des sessions de surveillance (voir get_profiler)
+
+        :param output_dir: Dossier des fichiers de profilage
+        """
+        self.output_dir = output_dir
+        self.mode = None
+        self.interval = DEFAULT_SAMPLE_INTERVAL
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+        # Mode « sampling »: nombre d'échantillons par pile et par étape
+        self._stacks = {}
+        self._stages = {}
+        self._samples = 0
+        self._sampling_time = 0.0
+
+        # Mode « cprofile »: statistiques cumulées des cycles
+        self._stats = None
+        self._cycles = 0
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def start(self, mode=MODE_SAMPLING, interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Démarre le profilage (sans effet s'il est déjà actif)
+
+        :param mode: MODE_SAMPLING ou MODE_CPROFILE
+        :param interval: Intervalle d'échantillonnage en secondes (mode « sampling »)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Mode de profilage inconnu: {mode}")
+        with self._lock:
+            if self.mode is not None:
+                return
+            self.mode = mode
+            self.interval = interval
+            self._started_at = time.perf_counter()
+            self._stacks, self._stages, self._samples, self._sampling_time = {}, {}, 0, 0.0
+            self._stats, self._cycles = None, 0
+            if mode == MODE_SAMPLING:
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+                self._thread.start()
+        logger.info(f"Profilage démarré (mode {mode}" + (f", {1 / interval:.0f} échantillons/s)" if mode == MODE_SAMPLING else ")"))
+
+    def stop(self):
+        """
+        Arrête le profilage et écrit les fichiers de résultats
+
+        :return: Liste des fichiers écrits
+        """
+        with self._lock:
+            mode = self.mode
+            if mode is None:
+                return []
+            self.mode = None
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop_event.set()
+            thread.join(timeout=2)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        duration = time.perf_counter() - self._started_at
+        written = []
+        if mode == MODE_SAMPLING:
+            path = f"{prefix}.collapsed"
+            with open(path, "w") as f:
+                for stack, count in sorted(self._stacks.items(), key=lambda item: -item[1]):
+                    f.write(f"{stack} {count}\n")
+            written.append(path)
+            overhead = 100 * self._sampling_time / duration if duration else 0.0
+            logger.info(f"Profilage: {self._samples} échantillons en {duration:.1f} s (surcoût {overhead:.2f} %)")
+            for stage, share in self.stage_summary().items():
+                logger.info(f"Profilage: étape '{stage}' {share:.1f} % des échantillons des threads du hopper")
+        elif self._stats is not None:
+            path = f"{prefix}.pstats"
+            self._stats.dump_stats(path)
+            written.append(path)
+            logger.info(f"Profilage: {self._cycles} cycles profilés en {duration:.1f} s")
+        for path in written:
+            logger.info(f"Profil enregistré: {path}")
+        return written
+
+    def toggle(self, mode=MODE_SAMPLING, interval=DEFAULT_SAMPLE_INTERVAL):
+        """Démarre le profilage s'il est arrêté, l'arrête sinon; retourne les fichiers écrits à l'arrêt"""
+        if self.enabled:
+            return self.stop()
+        self.start(mode, interval)
+        return []
+
+    @contextmanager
+    def cycle(self):
+        """Exécute un cycle de surveillance sous cProfile lorsque ce mode est actif"""
+        if self.mode != MODE_CPROFILE:
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+                self._cycles += 1
+
+    def stage_summary(self):
+        """Part (en %) des échantillons des threads du hopper passés dans chaque étape"""
+        total = sum(self._stages.values())
+        if not total:
+            return {}
+        return {stage: 100 * count / total for stage, count in sorted(self._stages.items(), key=lambda item: -item[1])}
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            start = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                functions = []
+                stage = None
+                while frame is not None and len(functions) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    functions.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    if stage is None:
+                        stage = STAGES.get(code.co_name)
+                    frame = frame.f_back
+                functions.reverse()
+                stack = ";".join([names.get(thread_id, str(thread_id))] + functions)
+                self._stacks[stack] = self._stacks.get(stack, 0) + 1
+                if stage is not None:
+                    self._stages[stage] = self._stages.get(stage, 0) + 1
+            self._samples += 1
+            self._sampling_time += time.perf_counter() - start
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """Retourne le profileur partagé par tous les hoppers du processus"""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = Profiler()
+    return _profiler
+
+
+def install_signal_toggle(mode=MODE_SAMPLING, interval=DEFAULT_SAMPLE_INTERVAL):
+    """
+    Active ou désactive le profilage à la réception de SIGUSR1 (kill -USR1 <pid>)
+
+    Le gestionnaire du signal se contente de réveiller un thread dédié: l'arrêt du
+    profilage (verrou, attente du thread d'échantillonnage, écriture des fichiers)
+    ne s'exécute jamais dans le gestionnaire, qui interrompt le thread principal
+    à un point quelconque, éventuellement pendant que ce verrou est détenu.
+
+    :return: True si le signal est disponible sur la plateforme, False sinon
+    """
+    if not hasattr(signal, "SIGUSR1"):
+        return False
+    requested = threading.Event()
+
+    def toggle_loop():
+        while True:
+            requested.wait()
+            requested.clear()
+            try:
+                get_profiler().toggle(mode, interval)
+            except Exception as e:
+                logger.error(f"Erreur lors du basculement du profilage: {str(e)}")
+
+    threading.Thread(target=toggle_loop, name="profiler-toggle", daemon=True).start()
+    signal.signal(signal.SIGUSR1, lambda signum, frame: requested.set())
+    return True
@@ -0,0 +1,266 @@
+"""
+Index des lignes de texte d'une capture par empreinte perceptuelle
+
+La capture est découpée une seule fois en segments de texte (lignes de la liste,
+puis colonnes séparées par un espace large). Chaque segment reçoit une empreinte
+de type dHash calculée sur l'intensité de l'encre (écart au fond de la ligne):
+elle ne dépend ni de la couleur de fond (lignes alternées), ni de la taille du
+texte. Les empreintes sont rangées dans des tables de hachage par tranches de
+bits: avec une tolérance de d bits, une empreinte à distance de Hamming au plus d
+a au moins une tranche identique parmi d + 1. La recherche d'un nom coûte donc
+quelques accès aux tables, et le coût par capture est proportionnel au nombre de
+lignes, indépendamment du nombre de tournois surveillés.
+
+L'empreinte d'un tournoi est calculée à partir de son image de référence (voir
+fingerprint_template); aucune correspondance de template n'est effectuée sur la
+capture pour les noms.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from utils.detections import Detections, DETECTION_DTYPE, template_id
+from utils.template_matching import load_template
+
+# Taille de la grille de l'empreinte: HASH_ROWS lignes de HASH_COLS comparaisons horizontales
+HASH_ROWS = 6
+HASH_COLS = 48
+HASH_BITS = HASH_ROWS * HASH_COLS
+
+# Écart minimal d'intensité entre deux cellules voisines pour un bit à 1
+HASH_MARGIN = 8
+
+# Distance de Hamming maximale (en bits) pour considérer deux empreintes identiques
+DEFAULT_MAX_DISTANCE = 24
+
+# Écart minimal au fond (niveaux de gris) d'un pixel d'encre
+INK_THRESHOLD = 40
+
+# Hauteur minimale et maximale d'une ligne de texte, écart maximal (en pixels) à l'intérieur d'une ligne
+MIN_TEXT_HEIGHT = 5
+MAX_TEXT_HEIGHT = 60
+LINE_GAP = 2
+
+# Espace horizontal minimal (en pixels) séparant deux colonnes, largeur minimale d'un segment
+MIN_COLUMN_GAP = 20
+MIN_SEGMENT_WIDTH = 8
+
+# Marge (en pixels) autour d'un segment pour estimer son fond local
+SEGMENT_PADDING = 3
+
+# Nombre d'index conservés (captures analysées récemment)
+INDEX_CACHE_SIZE = 4
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _runs(mask, max_gap=0):
+    """
+    Suites de valeurs vraies d'un tableau booléen 1D, fusionnées si séparées d'au plus max_gap valeurs fausses
+
+    :return: Liste de tuples (début, fin exclue)
+    """
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    runs = []
+    for start, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+        if runs and start - runs[-1][1] <= max_gap:
+            runs[-1] = (runs[-1][0], end)
+        else:
+            runs.append((start, end))
+    return runs
+
+
+def _ink(gray, background):
+    """Intensité de l'encre: écart absolu au fond (float32)"""
+    return np.abs(gray.astype(np.float32) - background)
+
+
+def _segments(ink):
+    """
+    Découpe une carte d'encre en segments de texte
+
+    :return: Liste de boîtes (x0, y0, x1, y1), fins exclues
+    """
+    mask = ink > INK_THRESHOLD
+    boxes = []
+    for y0, y1 in _runs(np.count_nonzero(mask, axis=1) >= 2, LINE_GAP):
+        if not MIN_TEXT_HEIGHT <= y1 - y0 <= MAX_TEXT_HEIGHT:
+            continue
+        line = mask[y0:y1]
+        for x0, x1 in _runs(line.any(axis=0), MIN_COLUMN_GAP - 1):
+            if x1 - x0 < MIN_SEGMENT_WIDTH:
+                continue
+            rows = np.flatnonzero(line[:, x0:x1].any(axis=1))
+            boxes.append((x0, y0 + int(rows[0]), x1, y0 + int(rows[-1]) + 1))
+    return boxes
+
+
+def _hash(ink):
+    """Empreinte dHash (entier de HASH_BITS bits) d'une carte d'encre rognée au texte"""
+    # Encre faible (écart de couleur de fond, bruit) ignorée: les zones uniformes donnent des bits stables
+    ink = np.where(ink > INK_THRESHOLD / 2, ink, 0)
+    small = cv2.resize(ink, (HASH_COLS + 1, HASH_ROWS), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] - small[:, :-1] > HASH_MARGIN).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def _fingerprint_box(image):
+    """Empreinte et boîte (x0, y0, x1, y1) du segment de texte le plus large d'une image, (None, None) sans texte"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    # Fond estimé sur le bord de l'image
+    border = np.concatenate((gray[0], gray[-1], gray[:, 0], gray[:, -1]))
+    ink = _ink(gray, float(np.median(border)))
+    boxes = _segments(ink)
+    if not boxes:
+        return None, None
+    x0, y0, x1, y1 = box = max(boxes, key=lambda box: box[2] - box[0])
+    return _hash(ink[y0:y1, x0:x1]), box
+
+
+def fingerprint_image(image):
+    """
+    Empreinte du segment de texte le plus large d'une image
+
+    :param image: Image BGR ou niveaux de gris
+    :return: Empreinte (entier), None si l'image ne contient pas de texte
+    """
+    return _fingerprint_box(image)[0]
+
+
+class NameFingerprint:
+    """Empreinte du nom d'un tournoi, tirée de son image de référence"""
+
+    __slots__ = ("value", "center_offset", "key")
+
+    def __init__(self, value, center_offset, key):
+        self.value = value
+        # Décalage (dx, dy) du centre du texte vers le centre de l'image de référence: les positions
+        # retournées sont celles qu'aurait données la correspondance de template (offsets compatibles)
+        self.center_offset = center_offset
+        self.key = key
+
+
+def fingerprint_template(image_path):
+    """
+    Empreinte du nom d'un tournoi à partir de son image de référence
+
+    :param image_path: Chemin de l'image de référence du nom
+    :return: Instance de NameFingerprint, None si l'image ne contient pas de texte
+    """
+    template = load_template(image_path)
+    value, box = _fingerprint_box(template.image)
+    if value is None:
+        return None
+    x0, y0, x1, y1 = box
+    center_offset = (template.width // 2 - (x0 + x1) // 2, template.height // 2 - (y0 + y1) // 2)
+    return NameFingerprint(value, center_offset, template.key)
+
+
+def hamming(a, b):
+    """Distance de Hamming entre deux empreintes"""
+    return bin(a ^ b).count("1")
+
+
+def _chunks(max_distance):
+    """Tranches de bits (décalage, masque) utilisées par les tables de hachage"""
+    count = max_distance + 1
+    bounds = np.linspace(0, HASH_BITS, count + 1).astype(int)
+    return [(int(start), (1 << int(end - start)) - 1) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class RowIndex:
+    def __init__(self, frame, max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Index des segments de texte d'une capture
+
+        :param frame: Capture BGR
+        :param max_distance: Distance de Hamming maximale des recherches
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        # Fond de chaque ligne de pixels: le texte n'en couvre qu'une petite partie
+        ink = _ink(gray, np.median(gray, axis=1, keepdims=True))
+        self.max_distance = max_distance
+        self.boxes = []
+        self.hashes = []
+        height, width = gray.shape
+        for x0, y0, x1, y1 in _segments(ink):
+            # Empreinte calculée comme pour une image de référence, sur le segment et son entourage proche
+            value = fingerprint_image(gray[max(0, y0 - SEGMENT_PADDING):min(height, y1 + SEGMENT_PADDING),
+                                           max(0, x0 - SEGMENT_PADDING):min(width, x1 + SEGMENT_PADDING)])
+            if value is not None:
+                self.boxes.append((x0, y0, x1, y1))
+                self.hashes.append(value)
+
+        self._chunks = _chunks(max_distance)
+        self._tables = [{} for _ in self._chunks]
+        for index, value in enumerate(self.hashes):
+            for table, (shift, mask) in zip(self._tables, self._chunks):
+                table.setdefault((value >> shift) & mask, []).append(index)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def lookup(self, fingerprint, rivals=(), max_distance=None):
+        """
+        Segments dont l'empreinte est proche de celle d'un nom
+
+        :param fingerprint: Instance de NameFingerprint (voir fingerprint_template)
+        :param rivals: Empreintes d'autres noms: un segment plus proche de l'un d'eux est écarté
+                       (noms ne différant que d'un caractère, par exemple « $20 » et « $50 »)
+        :param max_distance: Distance maximale (au plus celle de l'index)
+        :return: Instance de Detections (score = 1 - distance / HASH_BITS)
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        value = fingerprint.value
+        candidates = set()
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            candidates.update(table.get((value >> shift) & mask, ()))
+
+        matches = []
+        for index in sorted(candidates):
+            distance = hamming(self.hashes[index], value)
+            if distance <= max_distance and all(hamming(self.hashes[index], rival.value) > distance for rival in rivals):
+                matches.append((index, distance))
+
+        dx, dy = fingerprint.center_offset
+        records = np.zeros(len(matches), dtype=DETECTION_DTYPE)
+        for record, (index, distance) in zip(records, matches):
+            x0, y0, x1, y1 = self.boxes[index]
+            record["x"], record["y"] = (x0 + x1) // 2 + dx, (y0 + y1) // 2 + dy
+            record["w"], record["h"] = x1 - x0, y1 - y0
+            record["score"] = 1.0 - distance / HASH_BITS
+        records["template_id"] = template_id(fingerprint.key)
+        return Detections(records)
+
+
+def _frame_key(frame):
+    """Clé d'une capture: taille et hash de tous les pixels (deux noms proches ne diffèrent que de quelques pixels)"""
+    return frame.shape, hashlib.blake2b(np.ascontiguousarray(frame).data, digest_size=16).digest()
+
+
+def row_index(frame, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Index de la capture, construit une seule fois et partagé par toutes les recherches de noms
+
+    :param frame: Capture BGR
+    :return: Instance de RowIndex
+    """
+    key = (_frame_key(frame), max_distance)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = RowIndex(frame, max_distance)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
@@ -0,0 +1,149 @@
+"""
+Calendrier d'ouverture des inscriptions d'un tournoi
+
+Un tournoi de config/tournaments.json peut porter un calendrier, par exemple :
+    {"name": "Sunday Main", "schedule": {"start": "2026-10-25 20:00", "lead_minutes": 60,
+                                         "recurrence": "weekly"}}
+Les inscriptions sont attendues lead_minutes avant chaque début. En dehors des
+périodes d'ouverture, la surveillance est mise en veille (attente sur un
+événement, sans capture ni correspondance); elle reprend ramp_minutes avant
+l'ouverture avec les réglages normaux, puis accélère (vérifications et captures
+plus fréquentes) dans les secondes qui entourent l'ouverture attendue.
+"""
+
+import math
+import logging
+from datetime import datetime, timedelta
+
+from utils.config_utils import load_tournament_schedule
+
+logger = logging.getLogger("coinpoker_hopper")
+
+RECURRENCE_ONCE = "once"
+RECURRENCE_PERIODS = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+}
+
+# Reprise de la surveillance avant l'ouverture et durée de surveillance après l'ouverture (en minutes)
+DEFAULT_RAMP_MINUTES = 2
+DEFAULT_WINDOW_MINUTES = 15
+
+# Autour de l'ouverture attendue (en secondes de part et d'autre): intervalle maximal entre deux
+# vérifications et nombre minimal de captures continues par seconde
+CRITICAL_SECONDS = 30
+CRITICAL_CHECK_INTERVAL = 1
+CRITICAL_CAPTURE_FPS = 5
+
+# Durée maximale d'une veille, pour prendre en compte un changement d'heure ou de configuration
+MAX_SLEEP_SECONDS = 15 * 60
+
+
+class ScheduleDecision:
+    """Réglages du prochain cycle selon le calendrier"""
+
+    __slots__ = ("sleep", "check_interval", "capture_fps", "opens_at")
+
+    def __init__(self, sleep, check_interval, capture_fps, opens_at):
+        # Veille (en secondes) avant le prochain cycle, 0 si le cycle doit être effectué maintenant
+        self.sleep = sleep
+        self.check_interval = check_interval
+        self.capture_fps = capture_fps
+        # Ouverture attendue des inscriptions concernée (None si le calendrier est terminé)
+        self.opens_at = opens_at
+
+
+class TournamentSchedule:
+    def __init__(self, start, lead_minutes=0, recurrence=RECURRENCE_ONCE,
+                 ramp_minutes=DEFAULT_RAMP_MINUTES, window_minutes=DEFAULT_WINDOW_MINUTES):
+        """
+        Calendrier d'un tournoi
+
+        :param start: Début de la première occurrence (datetime, heure locale)
+        :param lead_minutes: Ouverture des inscriptions, en minutes avant le début
+        :param recurrence: "once", "hourly", "daily" ou "weekly"
+        :param ramp_minutes: Reprise de la surveillance, en minutes avant l'ouverture
+        :param window_minutes: Durée de la surveillance après l'ouverture, en minutes
+        """
+        if recurrence != RECURRENCE_ONCE and recurrence not in RECURRENCE_PERIODS:
+            raise ValueError(f"Récurrence inconnue: {recurrence}")
+        self.start = start
+        self.lead = timedelta(minutes=lead_minutes)
+        self.recurrence = recurrence
+        self.ramp = timedelta(minutes=ramp_minutes)
+        self.window = timedelta(minutes=window_minutes)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Construit un calendrier à partir de l'entrée "schedule" d'un tournoi
+
+        :param config: Dictionnaire (start, lead_minutes, recurrence, ramp_minutes, window_minutes)
+        :return: Instance de TournamentSchedule
+        """
+        return cls(
+            datetime.fromisoformat(config["start"]),
+            config.get("lead_minutes", 0),
+            config.get("recurrence", RECURRENCE_ONCE),
+            config.get("ramp_minutes", DEFAULT_RAMP_MINUTES),
+            config.get("window_minutes", DEFAULT_WINDOW_MINUTES),
+        )
+
+    def next_opening(self, now):
+        """
+        Ouverture des inscriptions de la prochaine occurrence dont la période de surveillance n'est pas terminée
+
+        :param now: Instant courant (datetime)
+        :return: datetime de l'ouverture, None si le calendrier est terminé
+        """
+        opening = self.start - self.lead
+        if now <= opening + self.window:
+            return opening
+        period = RECURRENCE_PERIODS.get(self.recurrence)
+        if period is None:
+            return None
+        occurrences = math.ceil((now - opening - self.window) / period)
+        return opening + occurrences * period
+
+    def decide(self, check_interval, capture_fps, now=None):
+        """
+        Réglages du prochain cycle
+
+        :param check_interval: Intervalle normal entre deux vérifications (en secondes)
+        :param capture_fps: Captures continues par seconde normales (0 = aucune)
+        :param now: Instant courant (par défaut, maintenant dans le fuseau horaire de start)
+        :return: Instance de ScheduleDecision
+        """
+        now = now or datetime.now(self.start.tzinfo)
+        opening = self.next_opening(now)
+        if opening is None:
+            # Calendrier terminé: surveillance normale (inscriptions tardives encore possibles)
+            return ScheduleDecision(0, check_interval, capture_fps, None)
+
+        wake_at = opening - self.ramp
+        if now < wake_at:
+            sleep = min((wake_at - now).total_seconds(), MAX_SLEEP_SECONDS)
+            return ScheduleDecision(sleep, check_interval, 0, opening)
+
+        if abs((now - opening).total_seconds()) <= CRITICAL_SECONDS:
+            return ScheduleDecision(
+                0, min(check_interval, CRITICAL_CHECK_INTERVAL), max(capture_fps, CRITICAL_CAPTURE_FPS), opening
+            )
+        return ScheduleDecision(0, check_interval, capture_fps, opening)
+
+
+def load_schedule(tournament_name):
+    """
+    Calendrier d'un tournoi d'après config/tournaments.json
+
+    :return: Instance de TournamentSchedule, None si le tournoi n'a pas de calendrier (ou s'il est invalide)
+    """
+    config = load_tournament_schedule(tournament_name)
+    if not config:
+        return None
+    try:
+        return TournamentSchedule.from_config(config)
+    except (KeyError, TypeError, ValueError) as e:
+        logger.error(f"Calendrier invalide pour le tournoi '{tournament_name}': {str(e)}")
+        return None
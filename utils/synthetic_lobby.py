@@ -0,0 +1,281 @@
+"""
+Génération de lobbies CoinPoker synthétiques
+
+Compose des captures de liste de tournois de taille arbitraire (plusieurs
+centaines de lignes) à partir des images de référence de resources/images, avec
+les positions exactes des noms de tournois et des boutons REGISTERING. Les
+lobbies servent aux benchmarks et tests de régression de la détection sans
+client CoinPoker (voir benchmarks/bench_lobby.py).
+
+Les images de référence absentes sont remplacées par des images générées (texte
+du nom du tournoi, bouton REGISTERING dessiné). Les annotations sont au format
+de utils.threshold_tuning.load_labels: un lobby enregistré avec save() peut
+servir directement à l'ajustement des seuils.
+"""
+
+import os
+import json
+import shutil
+import logging
+
+import cv2
+import numpy as np
+
+from detection_plan import tournament_file_prefix
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Noms des images de référence (voir detection_plan)
+BUTTON_IMAGE = "registering_button.png"
+ACCEPT_IMAGE = "accept_button.png"
+TOURNAMENTS_TAB_IMAGE = "tournaments_tab.png"
+ERROR_OK_IMAGE = "error_ok_button.png"
+
+# Mise en page d'une ligne: marges, espace entre colonnes et hauteur minimale
+ROW_PADDING = 6
+COLUMN_GAP = 60
+LEFT_MARGIN = 20
+HEADER_HEIGHT = 60
+
+# Couleurs (BGR) du fond des lignes, du texte et des boutons générés
+ROW_COLORS = ((38, 32, 30), (46, 40, 37))
+TEXT_COLOR = (225, 225, 225)
+BUTTON_COLOR = (60, 160, 40)
+STATUS_COLOR = (90, 90, 90)
+
+# Mots utilisés pour les noms des tournois concurrents
+FILLER_WORDS = ("Daily", "Turbo", "Bounty", "Freeroll", "Sunday", "Hyper", "Deepstack", "Classic", "Knockout", "Sprint")
+
+_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def render_text(text, size=None, color=TEXT_COLOR, background=ROW_COLORS[0], scale=0.5):
+    """
+    Dessine un texte sur un fond uni
+
+    :param text: Texte à dessiner
+    :param size: Taille (largeur, hauteur) de l'image (None = ajustée au texte)
+    :return: Image BGR
+    """
+    (text_w, text_h), baseline = cv2.getTextSize(text, _FONT, scale, 1)
+    width, height = size or (text_w + 8, text_h + baseline + 8)
+    image = np.full((height, width, 3), background, dtype=np.uint8)
+    cv2.putText(image, text, (4, (height + text_h) // 2 - 1), _FONT, scale, color, 1, cv2.LINE_AA)
+    return image
+
+
+def render_button(text="REGISTERING", size=(110, 22)):
+    """Dessine un bouton (texte sur fond coloré, entouré du fond de ligne)"""
+    image = np.full((size[1], size[0], 3), ROW_COLORS[0], dtype=np.uint8)
+    cv2.rectangle(image, (1, 1), (size[0] - 2, size[1] - 2), BUTTON_COLOR, -1)
+    (text_w, text_h), _ = cv2.getTextSize(text, _FONT, 0.4, 1)
+    cv2.putText(image, text, ((size[0] - text_w) // 2, (size[1] + text_h) // 2), _FONT, 0.4, TEXT_COLOR, 1, cv2.LINE_AA)
+    return image
+
+
+def _provide_image(filename, generate, out_dir, images_dir):
+    """Copie une image de référence de images_dir dans out_dir, ou l'y génère si elle est absente"""
+    os.makedirs(out_dir, exist_ok=True)
+    source = os.path.join(images_dir, filename)
+    target = os.path.join(out_dir, filename)
+    if os.path.exists(source):
+        if os.path.abspath(source) != os.path.abspath(target):
+            shutil.copy2(source, target)
+    else:
+        cv2.imwrite(target, generate())
+    return target
+
+
+def prepare_lobby_images(tournament_names, out_dir, images_dir="resources/images"):
+    """
+    Rassemble dans out_dir les images de référence nécessaires à un lobby synthétique
+
+    Les images existantes de images_dir sont copiées; les images absentes sont générées.
+    out_dir peut ensuite servir de dossier d'images d'un hopper.
+
+    :param tournament_names: Noms des tournois à placer dans le lobby
+    :param out_dir: Dossier de destination
+    :param images_dir: Dossier des images de référence réelles
+    :return: Tuple (dictionnaire nom du tournoi -> chemin de l'image, chemin de l'image du bouton)
+    """
+    name_paths = {
+        name: _provide_image(f"{tournament_file_prefix(name)}.png", lambda name=name: render_text(name), out_dir, images_dir)
+        for name in tournament_names
+    }
+    button_path = _provide_image(BUTTON_IMAGE, render_button, out_dir, images_dir)
+    return name_paths, button_path
+
+
+def prepare_client_images(out_dir, images_dir="resources/images"):
+    """
+    Rassemble dans out_dir les images du bouton ACCEPT et de l'onglet Tournaments (voir prepare_lobby_images)
+
+    :return: Tuple (chemin de l'image du bouton ACCEPT, chemin de l'image de l'onglet)
+    """
+    accept_path = _provide_image(ACCEPT_IMAGE, lambda: render_button("ACCEPT", (80, 26)), out_dir, images_dir)
+    tab_path = _provide_image(
+        TOURNAMENTS_TAB_IMAGE, lambda: render_text("Tournaments", size=(100, 30), background=(24, 20, 18)), out_dir, images_dir
+    )
+    return accept_path, tab_path
+
+
+def prepare_popup_image(out_dir, images_dir="resources/images"):
+    """
+    Rassemble dans out_dir l'image du bouton OK des fenêtres d'erreur (voir prepare_lobby_images)
+
+    :return: Chemin de l'image du bouton OK
+    """
+    return _provide_image(ERROR_OK_IMAGE, lambda: render_button("OK", (60, 30)), out_dir, images_dir)
+
+
+class LobbyRow:
+    """Ligne d'un lobby synthétique"""
+
+    __slots__ = ("name", "registering", "name_center", "button_center")
+
+    def __init__(self, name, registering, name_center, button_center):
+        # Nom du tournoi (None pour un tournoi concurrent)
+        self.name = name
+        self.registering = registering
+        # Centres (x, y) du nom et du bouton REGISTERING (None si pas de bouton)
+        self.name_center = name_center
+        self.button_center = button_center
+
+
+class SyntheticLobby:
+    def __init__(self, frame, rows, name_paths, button_path):
+        """
+        Lobby synthétique (voir render_lobby)
+
+        :param frame: Capture BGR du lobby complet
+        :param rows: Liste de LobbyRow, de haut en bas
+        :param name_paths: Dictionnaire nom du tournoi -> chemin de l'image de référence
+        :param button_path: Chemin de l'image du bouton REGISTERING
+        """
+        self.frame = frame
+        self.rows = rows
+        self.name_paths = name_paths
+        self.button_path = button_path
+
+    def labels(self, top=0, bottom=None):
+        """
+        Annotations des occurrences dont le centre est entre les lignes de pixels top et bottom
+
+        :return: Dictionnaire nom d'image -> liste de centres (x, y) relatifs à la zone
+        """
+        bottom = self.frame.shape[0] if bottom is None else bottom
+        labels = {os.path.basename(path): [] for path in self.name_paths.values()}
+        labels[os.path.basename(self.button_path)] = []
+        for row in self.rows:
+            if row.name is not None and top <= row.name_center[1] < bottom:
+                x, y = row.name_center
+                labels[os.path.basename(self.name_paths[row.name])].append((x, y - top))
+            if row.button_center is not None and top <= row.button_center[1] < bottom:
+                x, y = row.button_center
+                labels[os.path.basename(self.button_path)].append((x, y - top))
+        return labels
+
+    def first_registrable(self, tournament_name, top=0, bottom=None):
+        """
+        Centre du nom de la première ligne inscriptible d'un tournoi entre top et bottom
+
+        :return: Centre (x, y) relatif à la zone, None si le tournoi n'y est pas inscriptible
+        """
+        bottom = self.frame.shape[0] if bottom is None else bottom
+        for row in self.rows:
+            if row.name == tournament_name and row.registering and top <= row.name_center[1] < bottom:
+                return (row.name_center[0], row.name_center[1] - top)
+        return None
+
+    def viewports(self, height, overlap=0):
+        """
+        Découpe le lobby en zones visibles successives, comme un défilement de la liste
+
+        :param height: Hauteur d'une zone visible
+        :param overlap: Lignes de pixels communes à deux zones successives
+        :return: Liste de tuples (première ligne de pixels, image de la zone)
+        """
+        total = self.frame.shape[0]
+        if height >= total:
+            return [(0, self.frame)]
+        step = max(1, height - overlap)
+        tops = list(range(0, total - height, step)) + [total - height]
+        return [(top, self.frame[top:top + height]) for top in tops]
+
+    def save(self, path):
+        """Enregistre la capture et ses annotations (fichier .json de même nom, voir load_labels)"""
+        cv2.imwrite(path, self.frame)
+        with open(os.path.splitext(path)[0] + ".json", "w") as f:
+            json.dump({name: [list(center) for center in centers] for name, centers in self.labels().items()}, f)
+
+
+def render_lobby(name_paths, button_path, row_count=200, target_fraction=0.1, registering_fraction=0.5,
+                 noise=0.0, scale=1.0, seed=0):
+    """
+    Compose un lobby synthétique
+
+    Les lignes des tournois surveillés (noms de name_paths, donc souvent en double)
+    sont réparties au hasard parmi des tournois concurrents au nom généré. Une
+    ligne inscriptible porte le bouton REGISTERING; les autres un statut générique.
+
+    :param name_paths: Dictionnaire nom du tournoi -> chemin de l'image de référence
+    :param button_path: Chemin de l'image du bouton REGISTERING
+    :param row_count: Nombre de lignes
+    :param target_fraction: Fraction des lignes occupées par les tournois surveillés
+    :param registering_fraction: Fraction des lignes inscriptibles
+    :param noise: Écart type du bruit gaussien ajouté (en niveaux de gris, 0 = aucun)
+    :param scale: Facteur d'échelle appliqué au lobby (les images de référence restent à l'échelle 1)
+    :param seed: Graine du générateur aléatoire
+    :return: Instance de SyntheticLobby
+    """
+    rng = np.random.default_rng(seed)
+    names = list(name_paths)
+    name_images = {name: cv2.imread(path) for name, path in name_paths.items()}
+    button = cv2.imread(button_path)
+    status = render_text("RUNNING", size=(button.shape[1], button.shape[0]), color=STATUS_COLOR)
+
+    name_width = max([image.shape[1] for image in name_images.values()] + [200])
+    row_height = max([image.shape[0] for image in name_images.values()] + [button.shape[0]]) + 2 * ROW_PADDING
+    button_x = LEFT_MARGIN + name_width + COLUMN_GAP
+    width = button_x + button.shape[1] + LEFT_MARGIN
+    height = HEADER_HEIGHT + row_count * row_height
+
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[:HEADER_HEIGHT] = (24, 20, 18)
+    rows = []
+    for index in range(row_count):
+        top = HEADER_HEIGHT + index * row_height
+        background = ROW_COLORS[index % 2]
+        frame[top:top + row_height] = background
+        middle = top + row_height // 2
+
+        if names and rng.random() < target_fraction:
+            name = names[rng.integers(len(names))]
+            name_image = name_images[name]
+        else:
+            name = None
+            filler = f"{FILLER_WORDS[rng.integers(len(FILLER_WORDS))]} ${int(rng.integers(1, 500))} #{index}"
+            name_image = render_text(filler, background=background)[:, :name_width]
+        name_top = middle - name_image.shape[0] // 2
+        frame[name_top:name_top + name_image.shape[0], LEFT_MARGIN:LEFT_MARGIN + name_image.shape[1]] = name_image
+        name_center = (LEFT_MARGIN + name_image.shape[1] // 2, name_top + name_image.shape[0] // 2)
+
+        registering = bool(rng.random() < registering_fraction)
+        cell = button if registering else status
+        cell_top = middle - cell.shape[0] // 2
+        frame[cell_top:cell_top + cell.shape[0], button_x:button_x + cell.shape[1]] = cell
+        button_center = (button_x + cell.shape[1] // 2, cell_top + cell.shape[0] // 2) if registering else None
+
+        rows.append(LobbyRow(name, registering, name_center, button_center))
+
+    if noise > 0:
+        frame = np.clip(frame + rng.normal(0, noise, frame.shape), 0, 255).astype(np.uint8)
+
+    if scale != 1.0:
+        frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        for row in rows:
+            row.name_center = (int(row.name_center[0] * scale), int(row.name_center[1] * scale))
+            if row.button_center is not None:
+                row.button_center = (int(row.button_center[0] * scale), int(row.button_center[1] * scale))
+
+    return SyntheticLobby(frame, rows, name_paths, button_path)
@@ -0,0 +1,264 @@
+"""
+Paquets d'images de référence par profil (thème du client, résolution)
+
+Un paquet réunit dans un seul fichier .npz non compressé toutes les images de
+référence déjà décodées (BGR), les seuils calibrés, les offsets des tournois et
+l'échelle du profil, avec un hash de version calculé sur l'ensemble. Le fichier
+est projeté en mémoire (mmap) à l'activation: aucune image n'est décodée ni
+copiée, et plusieurs processus (voir utils.detection_pool) partagent les mêmes
+pages. Le changement de profil remplace le paquet actif en une seule affectation;
+les clés des templates incluent la version du paquet, les caches (spectres FFT,
+détections) ne mélangent donc jamais deux profils. Les plans de détection des
+surveillances en cours sont recompilés au cycle suivant (voir
+CoinPokerHopper.refresh_plan), les processus de détection suivent le paquet
+indiqué avec chaque tâche.
+
+Une image, un seuil ou un offset modifié après la construction du paquet (par
+exemple avec l'assistant de configuration) prend le pas sur le contenu du paquet.
+"""
+
+import io
+import os
+import json
+import mmap
+import time
+import struct
+import hashlib
+import logging
+import zipfile
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from detection_plan import tournament_file_prefix
+from utils.config_utils import (
+    CONFIG_DIR, BUNDLES_DIR, TEMPLATE_THRESHOLDS_FILE, bundle_path, list_profiles, load_template_thresholds,
+    load_tournaments, load_tournament_offsets
+)
+from utils.template_matching import Template, set_template_bundle, get_template_bundle
+
+logger = logging.getLogger("coinpoker_hopper")
+
+DEFAULT_PROFILE = "default"
+
+# Version du format des paquets
+BUNDLE_FORMAT = 1
+
+# Nom du membre contenant les métadonnées (JSON)
+_META_MEMBER = "__meta__"
+
+# Taille maximale lue pour décoder l'en-tête d'un tableau .npy
+_NPY_HEADER_MAX = 65536
+
+
+def _version_hash(images, metadata):
+    """Hash de version d'un paquet: images (noms, tailles, pixels) et métadonnées"""
+    digest = hashlib.sha256()
+    for name in sorted(images):
+        image = images[name]
+        digest.update(name.encode())
+        digest.update(str(image.shape).encode())
+        digest.update(image.tobytes())
+    digest.update(json.dumps(metadata, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def build_bundle(profile=DEFAULT_PROFILE, images_dir="resources/images", scale=1.0, bundles_dir=BUNDLES_DIR):
+    """
+    Construit le paquet d'un profil à partir des images de référence et de la configuration
+
+    :param profile: Nom du profil
+    :param images_dir: Dossier des images de référence
+    :param scale: Facteur d'échelle appliqué aux images et aux offsets (résolution du profil)
+    :param bundles_dir: Dossier des paquets
+    :return: Chemin du paquet écrit
+    """
+    images = {}
+    for filename in sorted(os.listdir(images_dir)):
+        path = os.path.join(images_dir, filename)
+        if not filename.lower().endswith(".png") or not os.path.isfile(path):
+            continue
+        image = cv2.cvtColor(np.array(Image.open(path).convert("RGB")), cv2.COLOR_RGB2BGR)
+        if scale != 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        images[filename] = np.ascontiguousarray(image)
+    if not images:
+        raise ValueError(f"Aucune image de référence dans {images_dir}")
+
+    thresholds = {name: values for name, values in load_template_thresholds().items() if name in images}
+    offsets = {}
+    for tournament_name in load_tournaments():
+        values = load_tournament_offsets(tournament_name)
+        if values:
+            offsets[tournament_name] = {
+                "x_offset": int(round(values["x_offset"] * scale)),
+                "y_offset": int(round(values["y_offset"] * scale)),
+            }
+
+    metadata = {
+        "format": BUNDLE_FORMAT,
+        "profile": profile,
+        "images_dir": os.path.normpath(images_dir),
+        "scale": scale,
+        "thresholds": thresholds,
+        "offsets": offsets,
+    }
+    metadata["version"] = _version_hash(images, metadata)
+    metadata["built_at"] = time.time()
+
+    os.makedirs(bundles_dir, exist_ok=True)
+    path = bundle_path(profile, bundles_dir)
+    members = dict(images)
+    members[_META_MEMBER] = np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8)
+    # Écriture dans un fichier temporaire puis remplacement: un paquet en cours d'utilisation reste valide
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        np.savez(f, **members)
+    os.replace(temp_path, path)
+
+    logger.info(f"Paquet '{profile}' construit: {len(images)} images, version {metadata['version'][:12]} ({path})")
+    return path
+
+
+def _map_members(path):
+    """
+    Projette en mémoire les tableaux d'un fichier .npz non compressé
+
+    :return: Tuple (mmap, dictionnaire nom du membre -> tableau en lecture seule)
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Membre compressé dans le paquet {path}: {info.filename}")
+            # En-tête local: 30 octets, puis nom et champ extra de longueurs variables
+            name_length, extra_length = struct.unpack("<HH", mapped[info.header_offset + 26:info.header_offset + 30])
+            start = info.header_offset + 30 + name_length + extra_length
+
+            header = io.BytesIO(mapped[start:start + min(_NPY_HEADER_MAX, info.file_size)])
+            version = np.lib.format.read_magic(header)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+            count = int(np.prod(shape)) if shape else 1
+            array = np.frombuffer(mapped, dtype=dtype, count=count, offset=start + header.tell())
+            arrays[info.filename[:-4] if info.filename.endswith(".npy") else info.filename] = array.reshape(
+                shape, order="F" if fortran_order else "C"
+            )
+    return mapped, arrays
+
+
+def _newer_than(path, timestamp):
+    try:
+        return os.path.getmtime(path) > timestamp
+    except OSError:
+        return False
+
+
+class TemplateBundle:
+    def __init__(self, path):
+        """
+        Paquet d'images de référence projeté en mémoire (voir build_bundle)
+
+        :param path: Chemin du fichier .npz
+        """
+        self.path = path
+        self._mmap, arrays = _map_members(path)
+        metadata = json.loads(arrays.pop(_META_MEMBER).tobytes().decode())
+        if metadata.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"Format de paquet non pris en charge: {metadata.get('format')}")
+
+        self.profile = metadata["profile"]
+        self.version = metadata["version"]
+        self.scale = metadata.get("scale", 1.0)
+        self.images_dir = metadata["images_dir"]
+        built_at = metadata.get("built_at", 0)
+
+        # Templates prêts à l'emploi, par nom de fichier; les images modifiées depuis la construction sont ignorées
+        self.templates = {}
+        for filename, image in arrays.items():
+            source = os.path.join(self.images_dir, filename)
+            if _newer_than(source, built_at):
+                logger.warning(f"Paquet '{self.profile}': '{filename}' modifiée depuis la construction, fichier utilisé")
+                continue
+            key = f"{source}@{self.version[:12]}"
+            self.templates[filename] = Template(key, source, image)
+
+        self.thresholds = metadata.get("thresholds", {})
+        if self.thresholds and _newer_than(TEMPLATE_THRESHOLDS_FILE, built_at):
+            logger.warning(f"Paquet '{self.profile}': seuils modifiés depuis la construction, fichier de seuils utilisé")
+            self.thresholds = {}
+
+        self.offsets = {}
+        for tournament_name, values in metadata.get("offsets", {}).items():
+            offsets_file = os.path.join(CONFIG_DIR, f"{tournament_file_prefix(tournament_name)}_offsets.json")
+            if not _newer_than(offsets_file, built_at):
+                self.offsets[tournament_name] = values
+
+    def _filename(self, image_path):
+        """Nom de fichier d'une image si elle fait partie du dossier d'images du paquet, None sinon"""
+        if not image_path:
+            return None
+        directory, filename = os.path.split(os.path.normpath(image_path))
+        return filename if directory == self.images_dir else None
+
+    def contains(self, image_path):
+        return self._filename(image_path) in self.templates
+
+    def template(self, image_path):
+        """Template d'une image de référence (None si l'image n'est pas dans le paquet)"""
+        return self.templates.get(self._filename(image_path))
+
+    def threshold(self, image_path):
+        """Paramètres calibrés d'une image (None si absents du paquet)"""
+        filename = self._filename(image_path)
+        return self.thresholds.get(filename) if filename else None
+
+    def tournament_offsets(self, tournament_name):
+        """Offsets d'un tournoi, à l'échelle du profil (None si absents du paquet)"""
+        return self.offsets.get(tournament_name)
+
+    def describe(self):
+        return f"profil '{self.profile}', version {self.version[:12]}, {len(self.templates)} images, échelle {self.scale}"
+
+
+def activate_bundle(path):
+    """
+    Projette un paquet en mémoire et le rend actif (remplace le paquet précédent)
+
+    :param path: Chemin du paquet, None pour revenir aux fichiers individuels
+    :return: Instance de TemplateBundle, ou None
+    """
+    bundle = TemplateBundle(path) if path else None
+    set_template_bundle(bundle)
+    if bundle is not None:
+        logger.info(f"Paquet d'images actif: {bundle.describe()}")
+    return bundle
+
+
+def activate_profile(profile, bundles_dir=BUNDLES_DIR):
+    """
+    Active le paquet d'un profil (changement de thème ou de résolution sans redémarrage)
+
+    :param profile: Nom du profil (voir list_profiles)
+    :return: Instance de TemplateBundle, ou None si le paquet n'existe pas ou est illisible
+    """
+    path = bundle_path(profile, bundles_dir)
+    if not os.path.exists(path):
+        logger.warning(f"Paquet du profil '{profile}' introuvable: {path}")
+        return None
+    try:
+        return activate_bundle(path)
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement du paquet '{path}': {str(e)}")
+        return None
+
+
+def active_bundle_path():
+    """Chemin du paquet actif (None si aucun)"""
+    bundle = get_template_bundle()
+    return bundle.path if bundle is not None else None
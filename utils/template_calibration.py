@@ -0,0 +1,247 @@
+"""
+Calibration des images de référence
+
+L'assistant de configuration capture des zones de taille fixe autour du curseur,
+qui contiennent souvent du fond de liste: ce fond réduit la discrimination et
+ralentit la correspondance. La calibration recherche, à partir de captures
+enregistrées, le plus petit sous-rectangle de l'image de référence dont la
+correspondance reste unique avec le plus grand écart de score entre les vraies
+occurrences et le meilleur concurrent, puis en déduit un seuil de confiance.
+"""
+
+import os
+import glob
+import shutil
+import logging
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.template_matching import Template, load_template, match_template, match_template_direct, find_peaks
+from utils.config_utils import (
+    load_tournaments, load_tournament_offsets, save_tournament_offsets, save_template_threshold
+)
+from detection_plan import tournament_file_prefix
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Captures enregistrées utilisées par défaut (exportées de l'archive des captures, voir utils.frame_archive)
+DEFAULT_FRAMES = "resources/screenshots/window_capture_*.png"
+
+# Score à partir duquel l'image de référence d'origine est considérée présente dans une capture
+PRESENCE_SCORE = 0.9
+
+# Taille minimale (largeur, hauteur) d'une image calibrée
+MIN_SIZE = (8, 8)
+
+# Fraction de la dimension retirée à chaque essai de rognage
+TRIM_FRACTION = 0.1
+
+# Perte d'écart tolérée pour préférer un rognage plus petit
+MARGIN_TOLERANCE = 0.05
+
+# Tolérance de position (en pixels) autour d'une occurrence attendue
+POSITION_TOLERANCE = 2
+
+# Bornes du seuil suggéré
+THRESHOLD_BOUNDS = (0.5, 0.99)
+
+# Dossier de sauvegarde des images d'origine avant calibration
+ORIGINALS_DIR = "resources/images/originals"
+
+
+class CalibrationResult:
+    """Résultat de la calibration d'une image de référence"""
+
+    def __init__(self, template_path, rect, image, positive_score, negative_score, frames_used, original_size):
+        self.template_path = template_path
+        # Sous-rectangle (x0, y0, x1, y1) retenu, relatif à l'image d'origine
+        self.rect = rect
+        self.image = image
+        # Plus faible score des vraies occurrences, plus fort score des concurrents
+        self.positive_score = positive_score
+        self.negative_score = negative_score
+        self.frames_used = frames_used
+        self.original_size = original_size
+
+    @property
+    def margin(self):
+        return self.positive_score - self.negative_score
+
+    @property
+    def unique(self):
+        """True si toutes les vraies occurrences dépassent tous les concurrents"""
+        return self.margin > 0
+
+    @property
+    def threshold(self):
+        """Seuil suggéré: milieu de l'écart entre vraies occurrences et concurrents"""
+        low, high = THRESHOLD_BOUNDS
+        return float(min(high, max(low, self.negative_score + self.margin / 2)))
+
+    @property
+    def center_shift(self):
+        """Déplacement (dx, dy) du centre de l'image calibrée par rapport au centre d'origine"""
+        x0, y0, x1, y1 = self.rect
+        width, height = self.original_size
+        return (x0 + (x1 - x0) // 2 - width // 2, y0 + (y1 - y0) // 2 - height // 2)
+
+    def describe(self):
+        x0, y0, x1, y1 = self.rect
+        width, height = self.original_size
+        return (
+            f"{os.path.basename(self.template_path)}: {width}x{height} -> {x1 - x0}x{y1 - y0} "
+            f"(rognage {self.rect}), score min {self.positive_score:.3f}, concurrent max {self.negative_score:.3f}, "
+            f"écart {self.margin:.3f}, seuil suggéré {self.threshold:.2f}, {self.frames_used} captures"
+        )
+
+
+def load_frames(pattern=DEFAULT_FRAMES):
+    """
+    Charge des captures enregistrées en BGR
+
+    :param pattern: Motif glob des fichiers de capture
+    :return: Liste de tuples (chemin, image BGR)
+    """
+    frames = []
+    for path in sorted(glob.glob(pattern)):
+        image = Image.open(path).convert("RGB")
+        frames.append((path, cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)))
+    return frames
+
+
+def _occurrences(frame, template):
+    """Coins supérieurs gauches des occurrences de l'image d'origine dans une capture"""
+    if frame.shape[0] < template.height or frame.shape[1] < template.width:
+        return []
+    centers = find_peaks(match_template(frame, template), PRESENCE_SCORE, template)
+    return [(x - template.width // 2, y - template.height // 2) for x, y in centers]
+
+
+def _evaluate(frames, anchors, original, rect):
+    """
+    Scores d'un sous-rectangle de l'image d'origine sur les captures
+
+    :return: Tuple (plus faible score des vraies occurrences, plus fort score des concurrents)
+    """
+    x0, y0, x1, y1 = rect
+    sub = Template(("calibration", rect), None, np.ascontiguousarray(original.image[y0:y1, x0:x1]))
+    half_w, half_h = sub.width // 2, sub.height // 2
+
+    positive, negative = 1.0, -1.0
+    for frame, tops in zip(frames, anchors):
+        result = match_template_direct(frame, sub)
+        competitors = np.ones(result.shape, dtype=bool)
+        for tx, ty in tops:
+            ex, ey = tx + x0, ty + y0
+            window = result[max(0, ey - POSITION_TOLERANCE):ey + POSITION_TOLERANCE + 1,
+                            max(0, ex - POSITION_TOLERANCE):ex + POSITION_TOLERANCE + 1]
+            positive = min(positive, float(window.max()) if window.size else -1.0)
+            # Les positions voisines d'une vraie occurrence ne sont pas des concurrents
+            competitors[max(0, ey - half_h):ey + half_h + 1, max(0, ex - half_w):ex + half_w + 1] = False
+        if competitors.any():
+            negative = max(negative, float(result[competitors].max()))
+    return positive, negative
+
+
+def _trim_candidates(rect):
+    """Sous-rectangles obtenus en rognant un côté du rectangle"""
+    x0, y0, x1, y1 = rect
+    step_x = max(1, int((x1 - x0) * TRIM_FRACTION))
+    step_y = max(1, int((y1 - y0) * TRIM_FRACTION))
+    candidates = [
+        (x0 + step_x, y0, x1, y1),
+        (x0, y0, x1 - step_x, y1),
+        (x0, y0 + step_y, x1, y1),
+        (x0, y0, x1, y1 - step_y),
+    ]
+    return [(a, b, c, d) for a, b, c, d in candidates if c - a >= MIN_SIZE[0] and d - b >= MIN_SIZE[1]]
+
+
+def calibrate_template(template_path, frames):
+    """
+    Recherche le plus petit rognage de l'image de référence qui reste unique avec le plus grand écart
+
+    Rognage glouton: à chaque étape, chaque côté est rogné à tour de rôle et le
+    meilleur rognage est retenu tant que son écart reste à MARGIN_TOLERANCE près
+    du meilleur écart observé.
+
+    :param template_path: Chemin vers l'image de référence d'origine
+    :param frames: Liste d'images BGR (voir load_frames)
+    :return: Instance de CalibrationResult, ou None si l'image n'apparaît dans aucune capture
+    """
+    original = load_template(template_path)
+    anchors = [_occurrences(frame, original) for frame in frames]
+    if not any(anchors):
+        logger.warning(f"Image {template_path} absente des captures (score < {PRESENCE_SCORE}), calibration impossible")
+        return None
+
+    rect = (0, 0, original.width, original.height)
+    positive, negative = _evaluate(frames, anchors, original, rect)
+    best_margin = positive - negative
+
+    while True:
+        scored = []
+        for candidate in _trim_candidates(rect):
+            candidate_positive, candidate_negative = _evaluate(frames, anchors, original, candidate)
+            scored.append((candidate_positive - candidate_negative, candidate, candidate_positive, candidate_negative))
+        if not scored:
+            break
+
+        margin, candidate, candidate_positive, candidate_negative = max(scored, key=lambda item: item[0])
+        if margin < best_margin - MARGIN_TOLERANCE:
+            break
+        rect, positive, negative = candidate, candidate_positive, candidate_negative
+        best_margin = max(best_margin, margin)
+
+    x0, y0, x1, y1 = rect
+    image = np.ascontiguousarray(original.image[y0:y1, x0:x1])
+    return CalibrationResult(
+        template_path, rect, image, positive, negative,
+        sum(1 for tops in anchors if tops), (original.width, original.height)
+    )
+
+
+def apply_calibration(result, images_dir="resources/images"):
+    """
+    Remplace l'image de référence par l'image calibrée et enregistre le seuil suggéré
+
+    L'image d'origine est conservée dans ORIGINALS_DIR. Si l'image est celle du nom
+    d'un tournoi, ses offsets sont corrigés du déplacement de son centre.
+
+    :param result: Instance de CalibrationResult
+    :param images_dir: Dossier des images de référence
+    :return: True si réussi, False sinon
+    """
+    template_path = result.template_path
+    template_name = os.path.basename(template_path)
+
+    try:
+        os.makedirs(ORIGINALS_DIR, exist_ok=True)
+        original_copy = os.path.join(ORIGINALS_DIR, template_name)
+        if not os.path.exists(original_copy):
+            shutil.copy2(template_path, original_copy)
+
+        Image.fromarray(cv2.cvtColor(result.image, cv2.COLOR_BGR2RGB)).save(template_path)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'enregistrement de l'image calibrée {template_path}: {str(e)}")
+        return False
+
+    # Le bouton d'un tournoi est repéré à partir du centre de son nom: corriger les offsets
+    dx, dy = result.center_shift
+    if dx or dy:
+        for tournament_name in load_tournaments():
+            tournament_image = os.path.join(images_dir, f"{tournament_file_prefix(tournament_name)}.png")
+            if os.path.abspath(template_path) != os.path.abspath(tournament_image):
+                continue
+            offsets = load_tournament_offsets(tournament_name)
+            if offsets:
+                save_tournament_offsets(tournament_name, offsets["x_offset"] - dx, offsets["y_offset"] - dy)
+
+    return save_template_threshold(template_name, {
+        "threshold": round(result.threshold, 3),
+        "expected_score": round(result.positive_score, 3),
+        "margin": round(result.margin, 3),
+        "crop": list(result.rect),
+    })
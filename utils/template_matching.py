@@ -0,0 +1,683 @@
+"""
+Moteur de correspondance de templates utilisé par les fonctions de recherche d'images
+
+Deux méthodes de calcul de la corrélation croisée normalisée (équivalente à
+cv2.TM_CCOEFF_NORMED) sont disponibles :
+- la méthode directe (cv2.matchTemplate)
+- une méthode par FFT, plus rapide pour les grands templates (nom du tournoi 300x20)
+
+Le choix entre les deux est fait pour chaque couple (template, taille d'image)
+en mesurant le coût réel des deux méthodes lors de la première utilisation.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from utils.detection_cache import DetectionCache, BAND_ROWS, locations_size
+from utils.detections import Detections
+from utils.config_utils import TEMPLATE_THRESHOLDS_FILE, load_template_thresholds
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Surface minimale (en pixels) du template pour envisager la méthode FFT
+FFT_MIN_TEMPLATE_AREA = 2000
+
+# Nombre maximum de spectres de templates conservés en cache
+FFT_SPECTRUM_CACHE_SIZE = 32
+
+# Surface minimale (en pixels) de l'image pour la découper en bandes traitées en parallèle
+TILE_MIN_PIXELS = 1920 * 1080
+
+# Hauteur minimale (en lignes de résultat) d'une bande
+TILE_MIN_ROWS = 64
+
+# Seuil de confiance utilisé lorsqu'aucun seuil calibré n'existe pour une image
+DEFAULT_CONFIDENCE = 0.8
+
+# Recherche du premier résultat (locate_first): nombre de bandes, marge de la zone
+# du dernier résultat (en tailles de template) et écart au seuil d'un résultat franc
+FIRST_HIT_STRIPS = 8
+FIRST_HIT_ROI_PADDING = 2
+FIRST_HIT_MARGIN = 0.1
+
+_tile_workers = os.cpu_count() or 1
+_tile_executor = None
+_tile_executor_lock = threading.Lock()
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+_spectrum_cache = {}
+_spectrum_lock = threading.Lock()
+
+# Méthode retenue par couple (clé du template, ordre de grandeur de l'image): "direct" ou "fft"
+_method_choice = {}
+
+# Cache des résultats par bande de capture (None = désactivé)
+_detection_cache = DetectionCache()
+
+# Historique des résultats de locate_first par (template, taille de l'image):
+# [coin du dernier résultat (ligne, colonne) ou None, nombre de résultats par bande]
+_hit_history = {}
+_hit_history_lock = threading.Lock()
+
+# Paquet d'images de référence actif (None = fichiers individuels, voir utils.template_bundle)
+_template_bundle = None
+
+# Seuils calibrés par image (config/template_thresholds.json), rechargés si le fichier change
+_thresholds = {}
+_thresholds_mtime = None
+_thresholds_lock = threading.Lock()
+
+
+class Template:
+    """Template décodé une seule fois et prêt pour la correspondance OpenCV"""
+
+    __slots__ = ("key", "path", "image", "width", "height", "mtime")
+
+    def __init__(self, key, path, image, mtime=None):
+        self.key = key
+        self.path = path
+        self.image = image
+        self.height, self.width = image.shape[:2]
+        self.mtime = mtime
+
+
+def load_template(image_path):
+    """
+    Charge une image de référence en BGR, avec mise en cache
+
+    Le cache est invalidé si le fichier est modifié (par exemple après avoir
+    relancé l'assistant de configuration des images). Les images du paquet actif
+    sont retournées directement, sans accès au fichier.
+
+    :param image_path: Chemin vers l'image de référence
+    :return: Instance de Template
+    """
+    bundle = _template_bundle
+    if bundle is not None:
+        template = bundle.template(image_path)
+        if template is not None:
+            return template
+
+    mtime = os.path.getmtime(image_path)
+    with _templates_lock:
+        template = _templates.get(image_path)
+        if template is not None and template.mtime == mtime:
+            return template
+
+    needle = Image.open(image_path).convert("RGB")
+    image = cv2.cvtColor(np.array(needle), cv2.COLOR_RGB2BGR)
+    template = Template(image_path, image_path, image, mtime)
+
+    with _templates_lock:
+        _templates[image_path] = template
+    _forget_template(image_path)
+    return template
+
+
+def _forget_template(key):
+    """Supprime les spectres et choix de méthode associés à un template"""
+    with _spectrum_lock:
+        for cache_key in [k for k in _spectrum_cache if k[0] == key]:
+            del _spectrum_cache[cache_key]
+        for choice_key in [k for k in _method_choice if k[0] == key]:
+            del _method_choice[choice_key]
+
+
+def _template_spectrum(template, fft_shape):
+    """
+    Retourne le spectre du template centré, pour une taille de FFT donnée
+
+    :param template: Instance de Template
+    :param fft_shape: Taille (hauteur, largeur) de la FFT
+    :return: Tuple (liste des spectres par canal, norme du template centré)
+    """
+    cache_key = (template.key, fft_shape)
+    with _spectrum_lock:
+        cached = _spectrum_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    needle = template.image.astype(np.float32)
+    needle -= needle.reshape(-1, needle.shape[2]).mean(axis=0)
+    norm = float(np.sqrt(np.sum(needle.astype(np.float64) ** 2)))
+
+    # Un spectre par canal, calculé sur le template complété par des zéros
+    spectrum = []
+    for channel in range(needle.shape[2]):
+        padded = np.zeros(fft_shape, dtype=np.float32)
+        padded[:template.height, :template.width] = needle[:, :, channel]
+        spectrum.append(cv2.dft(padded, flags=cv2.DFT_COMPLEX_OUTPUT))
+
+    with _spectrum_lock:
+        if len(_spectrum_cache) >= FFT_SPECTRUM_CACHE_SIZE:
+            _spectrum_cache.pop(next(iter(_spectrum_cache)))
+        _spectrum_cache[cache_key] = (spectrum, norm)
+    return spectrum, norm
+
+
+def match_template_fft(haystack, template):
+    """
+    Calcule la corrélation croisée normalisée (TM_CCOEFF_NORMED) par FFT
+
+    :param haystack: Image BGR (numpy) dans laquelle chercher
+    :param template: Instance de Template
+    :return: Carte de corrélation float32 de taille (H - h + 1, W - w + 1)
+    """
+    H, W = haystack.shape[:2]
+    h, w = template.height, template.width
+    fft_shape = (cv2.getOptimalDFTSize(H), cv2.getOptimalDFTSize(W))
+
+    spectrum, template_norm = _template_spectrum(template, fft_shape)
+
+    # Corrélation canal par canal: IDFT(DFT(image) * conj(DFT(template)))
+    numerator = np.zeros((H - h + 1, W - w + 1), dtype=np.float64)
+    padded = np.zeros(fft_shape, dtype=np.float32)
+    for channel, template_spectrum in enumerate(spectrum):
+        padded[:H, :W] = haystack[:, :, channel]
+        image_spectrum = cv2.dft(padded, flags=cv2.DFT_COMPLEX_OUTPUT, nonzeroRows=H)
+        product = cv2.mulSpectrums(image_spectrum, template_spectrum, 0, conjB=True)
+        correlation = cv2.idft(product, flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)
+        numerator += correlation[:H - h + 1, :W - w + 1]
+
+    # Variance locale de l'image sous chaque position du template (images intégrales)
+    n = float(h * w)
+    sums, sq_sums = cv2.integral2(haystack, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    window_sum = sums[h:, w:] - sums[:-h, w:] - sums[h:, :-w] + sums[:-h, :-w]
+    window_sq_sum = sq_sums[h:, w:] - sq_sums[:-h, w:] - sq_sums[h:, :-w] + sq_sums[:-h, :-w]
+    variance = (window_sq_sum - window_sum * window_sum / n).sum(axis=2)
+
+    denominator = np.sqrt(np.maximum(variance, 0)) * template_norm
+    result = np.zeros_like(numerator)
+    valid = denominator > 1e-6 * max(template_norm, 1.0)
+    result[valid] = numerator[valid] / denominator[valid]
+    return np.clip(result, -1.0, 1.0).astype(np.float32)
+
+
+def match_template_direct(haystack, template):
+    """
+    Calcule la corrélation croisée normalisée avec cv2.matchTemplate
+
+    :param haystack: Image BGR (numpy) dans laquelle chercher
+    :param template: Instance de Template
+    :return: Carte de corrélation float32
+    """
+    return cv2.matchTemplate(haystack, template.image, cv2.TM_CCOEFF_NORMED)
+
+
+def _choose_method(haystack, template):
+    """
+    Choisit la méthode la plus rapide pour ce couple (template, taille d'image)
+
+    Les deux méthodes sont chronométrées lors du premier appel, le résultat est
+    ensuite réutilisé pour toutes les images du même ordre de grandeur (les bandes
+    recalculées par le cache de détection ont des hauteurs variables).
+    """
+    if template.width * template.height < FFT_MIN_TEMPLATE_AREA:
+        return "direct", None
+
+    choice_key = (template.key, int(math.log2(max(haystack.shape[0] * haystack.shape[1], 1))))
+    method = _method_choice.get(choice_key)
+    if method is not None:
+        return method, None
+
+    start = time.perf_counter()
+    direct_result = match_template_direct(haystack, template)
+    direct_cost = time.perf_counter() - start
+
+    # Premier appel FFT: calcule le spectre, non représentatif du coût en régime établi
+    match_template_fft(haystack, template)
+    start = time.perf_counter()
+    match_template_fft(haystack, template)
+    fft_cost = time.perf_counter() - start
+
+    method = "fft" if fft_cost < direct_cost else "direct"
+    _method_choice[choice_key] = method
+    logger.debug(
+        f"Méthode de correspondance pour {template.key} sur {haystack.shape[1]}x{haystack.shape[0]}: "
+        f"{method} (direct {direct_cost * 1000:.1f} ms, fft {fft_cost * 1000:.1f} ms)"
+    )
+    return method, direct_result
+
+
+def _match_single(haystack, template):
+    """Calcule la carte de corrélation en un seul appel, avec la méthode la plus rapide"""
+    method, result = _choose_method(haystack, template)
+    if result is not None:
+        return result
+    if method == "fft":
+        return match_template_fft(haystack, template)
+    return match_template_direct(haystack, template)
+
+
+def set_tile_workers(workers):
+    """
+    Définit le nombre de threads utilisés pour la correspondance par bandes
+
+    :param workers: Nombre de threads (1 désactive le découpage en bandes)
+    """
+    global _tile_workers, _tile_executor
+    with _tile_executor_lock:
+        _tile_workers = max(1, int(workers))
+        if _tile_executor is not None:
+            _tile_executor.shutdown(wait=False)
+            _tile_executor = None
+
+
+def _get_tile_executor():
+    """Retourne le pool de threads partagé, créé à la première utilisation"""
+    global _tile_executor
+    with _tile_executor_lock:
+        if _tile_executor is None:
+            _tile_executor = ThreadPoolExecutor(max_workers=_tile_workers, thread_name_prefix="match-tile")
+        return _tile_executor
+
+
+def strip_bounds(result_rows, strips):
+    """
+    Découpe les lignes d'une carte de corrélation en bandes contiguës
+
+    La bande couvrant les lignes de résultat [r0, r1) nécessite les lignes
+    [r0, r1 + hauteur du template - 1) de l'image: les bandes d'image se
+    chevauchent donc de (hauteur du template - 1) lignes.
+
+    :param result_rows: Nombre de lignes de la carte de corrélation
+    :param strips: Nombre de bandes souhaité
+    :return: Liste de tuples (r0, r1)
+    """
+    strips = max(1, min(strips, result_rows))
+    edges = np.linspace(0, result_rows, strips + 1).astype(int)
+    return [(int(r0), int(r1)) for r0, r1 in zip(edges[:-1], edges[1:]) if r1 > r0]
+
+
+def match_template_tiled(haystack, template, strips=None):
+    """
+    Calcule la carte de corrélation par bandes horizontales réparties sur plusieurs threads
+
+    OpenCV libère le GIL pendant le calcul: les bandes sont traitées en parallèle.
+    Chaque ligne de la carte finale provient d'une seule bande, la carte assemblée
+    est donc identique à celle d'un appel unique et les pics situés sur les
+    jonctions ne sont pas dupliqués.
+
+    :param haystack: Image BGR (numpy) dans laquelle chercher
+    :param template: Instance de Template
+    :param strips: Nombre de bandes (par défaut, le nombre de threads)
+    :return: Carte de corrélation float32
+    """
+    result_rows = haystack.shape[0] - template.height + 1
+    bounds = strip_bounds(result_rows, strips or _tile_workers)
+    if len(bounds) <= 1:
+        return _match_single(haystack, template)
+
+    overlap = template.height - 1
+    executor = _get_tile_executor()
+    futures = [
+        executor.submit(_match_single, haystack[r0:r1 + overlap], template)
+        for r0, r1 in bounds
+    ]
+    return np.vstack([future.result() for future in futures])
+
+
+def match_template(haystack, template):
+    """
+    Calcule la carte de corrélation normalisée avec la méthode la plus rapide
+
+    Les grandes images (fenêtre maximisée sur un écran 4K) sont découpées en
+    bandes traitées en parallèle.
+
+    :param haystack: Image BGR (numpy) dans laquelle chercher
+    :param template: Instance de Template
+    :return: Carte de corrélation float32 (équivalente à TM_CCOEFF_NORMED)
+    """
+    result_rows = haystack.shape[0] - template.height + 1
+    if (_tile_workers > 1
+            and haystack.shape[0] * haystack.shape[1] >= TILE_MIN_PIXELS
+            and result_rows >= 2 * TILE_MIN_ROWS):
+        strips = min(_tile_workers, result_rows // TILE_MIN_ROWS)
+        return match_template_tiled(haystack, template, strips)
+    return _match_single(haystack, template)
+
+
+def _merge_locations(locations, threshold_dist=10):
+    """
+    Fusionne les positions proches (ordre ligne par ligne, la première position est conservée)
+
+    :param locations: Tableau (N, 2) de positions (ligne, colonne) du coin supérieur gauche
+    :param threshold_dist: Distance en pixels pour considérer deux points comme identiques
+    :return: Liste des indices des positions conservées
+    """
+    kept = []
+    kept_points = []
+    for index, (row, col) in enumerate(locations.tolist()):
+        # Vérifier si le point est proche d'un point déjà trouvé
+        is_close = False
+        for existing_row, existing_col in kept_points:
+            if ((existing_col - col) ** 2 + (existing_row - row) ** 2) < threshold_dist ** 2:
+                is_close = True
+                break
+
+        if not is_close:
+            kept.append(index)
+            kept_points.append((row, col))
+    return kept
+
+
+def find_peaks(result, confidence, template, threshold_dist=10):
+    """
+    Extrait les positions de correspondance au-dessus du seuil, en fusionnant les points proches
+
+    :param result: Carte de corrélation
+    :param confidence: Niveau de confiance (0-1)
+    :param template: Instance de Template (pour calculer les centres)
+    :param threshold_dist: Distance en pixels pour considérer deux points comme identiques
+    :return: Liste de centres (x, y) relatifs à l'image
+    """
+    locations = np.argwhere(result >= confidence)
+    return [
+        (int(col) + template.width // 2, int(row) + template.height // 2)
+        for row, col in locations[_merge_locations(locations, threshold_dist)]
+    ]
+
+
+def template_thresholds():
+    """Seuils calibrés par nom de fichier d'image, rechargés lorsque le fichier de configuration change"""
+    global _thresholds, _thresholds_mtime
+    try:
+        mtime = os.path.getmtime(TEMPLATE_THRESHOLDS_FILE)
+    except OSError:
+        mtime = None
+
+    with _thresholds_lock:
+        if mtime != _thresholds_mtime:
+            _thresholds = load_template_thresholds() if mtime is not None else {}
+            _thresholds_mtime = mtime
+        return _thresholds
+
+
+def resolve_confidence(image_path, confidence=None, default=DEFAULT_CONFIDENCE):
+    """
+    Seuil de confiance à utiliser pour une image
+
+    :param image_path: Chemin vers l'image de référence
+    :param confidence: Seuil explicite (prioritaire s'il est fourni)
+    :param default: Seuil utilisé si l'image n'a pas de seuil calibré
+    :return: Seuil de confiance (0-1)
+    """
+    if confidence is not None:
+        return confidence
+    bundle = _template_bundle
+    if bundle is not None:
+        entry = bundle.threshold(image_path)
+        if entry and entry.get("threshold") is not None:
+            return entry["threshold"]
+    if image_path:
+        entry = template_thresholds().get(os.path.basename(image_path))
+        if entry and entry.get("threshold") is not None:
+            return entry["threshold"]
+    return default
+
+
+def set_detection_cache(cache):
+    """
+    Remplace le cache des résultats de détection
+
+    :param cache: Instance de DetectionCache, ou None pour désactiver le cache
+    """
+    global _detection_cache
+    _detection_cache = cache
+
+
+def get_detection_cache():
+    """Retourne le cache des résultats de détection (None si désactivé)"""
+    return _detection_cache
+
+
+def set_template_bundle(bundle):
+    """
+    Remplace le paquet d'images de référence actif
+
+    :param bundle: Instance de TemplateBundle, ou None pour utiliser les fichiers individuels
+    """
+    global _template_bundle
+    _template_bundle = bundle
+
+
+def get_template_bundle():
+    """Retourne le paquet d'images de référence actif (None si aucun)"""
+    return _template_bundle
+
+
+def _contiguous_runs(indices):
+    """Regroupe une liste d'indices croissants en suites contiguës"""
+    runs = []
+    for index in indices:
+        if runs and runs[-1][-1] == index - 1:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+    return runs
+
+
+def _band_results(haystack, template, extract, mode_key, cache=None):
+    """
+    Calcule un résultat par bande de la carte de corrélation, en réutilisant le cache
+
+    Les bandes dont les lignes de capture n'ont pas changé sont lues dans le cache;
+    les bandes modifiées contiguës sont recalculées en un seul appel.
+
+    :param haystack: Image BGR (numpy)
+    :param template: Instance de Template
+    :param extract: Fonction (carte de la bande, première ligne) -> (valeur, taille estimée)
+    :param mode_key: Tuple distinguant le type de résultat dans la clé du cache
+    :param cache: Instance de DetectionCache (par défaut, le cache global)
+    :return: Liste des valeurs, une par bande, de haut en bas
+    """
+    cache = cache or _detection_cache
+    result_rows = haystack.shape[0] - template.height + 1
+    if result_rows <= 0 or haystack.shape[1] < template.width:
+        return []
+
+    if cache is None:
+        return [extract(match_template(haystack, template), 0)[0]]
+
+    hashes = cache.block_hashes(haystack)
+    bands = [(r0, min(r0 + BAND_ROWS, result_rows)) for r0 in range(0, result_rows, BAND_ROWS)]
+    keys = [cache.band_key(hashes, template, haystack.shape[1], r0, r1, *mode_key) for r0, r1 in bands]
+    values = [cache.get(key) for key in keys]
+
+    overlap = template.height - 1
+    for run in _contiguous_runs([index for index, value in enumerate(values) if value is None]):
+        run_start = bands[run[0]][0]
+        run_end = bands[run[-1]][1]
+        result = match_template(haystack[run_start:run_end + overlap], template)
+        for index in run:
+            r0, r1 = bands[index]
+            value, size = extract(result[r0 - run_start:r1 - run_start], r0)
+            cache.put(keys[index], value, size)
+            values[index] = value
+    return values
+
+
+def locate_best(haystack, image_path, confidence=None, cache=None):
+    """
+    Cherche la meilleure correspondance d'une image de référence dans une image
+
+    :param haystack: Image BGR (numpy) dans laquelle chercher
+    :param image_path: Chemin vers l'image de référence
+    :param confidence: Niveau de confiance (0-1), None = seuil calibré de l'image (voir resolve_confidence)
+    :param cache: Instance de DetectionCache (par défaut, le cache global)
+    :return: Tuple (centre (x, y) relatif à l'image ou None, score maximal)
+    """
+    needle = load_template(image_path)
+    confidence = resolve_confidence(image_path, confidence)
+
+    def extract(band, first_row):
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(band)
+        return (max_val, (max_loc[0], max_loc[1] + first_row)), 0
+
+    best_val, best_loc = -1.0, None
+    for max_val, max_loc in _band_results(haystack, needle, extract, ("best",), cache):
+        if max_val > best_val:
+            best_val, best_loc = max_val, max_loc
+
+    if best_loc is None or best_val < confidence:
+        return None, best_val
+    return (best_loc[0] + needle.width // 2, best_loc[1] + needle.height // 2), best_val
+
+
+def _clear_hit_score(image_path, confidence):
+    """Score à partir duquel un résultat est assez franc pour arrêter la recherche"""
+    clear = min(0.99, confidence + FIRST_HIT_MARGIN)
+    entry = template_thresholds().get(os.path.basename(image_path)) if image_path else None
+    if entry and entry.get("expected_score"):
+        # Score habituel des vraies occurrences, à une petite tolérance près
+        clear = min(clear, max(confidence, entry["expected_score"] - FIRST_HIT_MARGIN / 4))
+    return clear
+
+
+def locate_first(haystack, image_path, confidence=None):
+    """
+    Cherche une correspondance franche en s'arrêtant au premier résultat
+
+    Pour les images présentes au plus une fois (bouton ACCEPT, onglet...), la
+    carte de corrélation complète est inutile. La recherche commence autour du
+    dernier résultat, puis parcourt les bandes de l'image de la plus souvent
+    gagnante à la moins souvent gagnante, et s'arrête dès qu'une bande contient
+    un résultat franc (voir _clear_hit_score). Sans résultat franc, l'image
+    entière est parcourue et le résultat est celui de locate_best.
+
+    :param haystack: Image BGR (numpy) dans laquelle chercher
+    :param image_path: Chemin vers l'image de référence
+    :param confidence: Niveau de confiance (0-1), None = seuil calibré de l'image (voir resolve_confidence)
+    :return: Tuple (centre (x, y) relatif à l'image ou None, score maximal)
+    """
+    needle = load_template(image_path)
+    confidence = resolve_confidence(image_path, confidence)
+    H, W = haystack.shape[:2]
+    if H < needle.height or W < needle.width:
+        return None, -1.0
+
+    clear = _clear_hit_score(image_path, confidence)
+    bounds = strip_bounds(H - needle.height + 1, FIRST_HIT_STRIPS)
+    history_key = (needle.key, needle.mtime, H, W)
+    with _hit_history_lock:
+        last_hit, strip_hits = _hit_history.get(history_key, (None, None))
+        if strip_hits is None or len(strip_hits) != len(bounds):
+            strip_hits = [0] * len(bounds)
+
+    best_val, best_loc = -1.0, None
+
+    # Zone du dernier résultat
+    if last_hit is not None:
+        pad_y, pad_x = FIRST_HIT_ROI_PADDING * needle.height, FIRST_HIT_ROI_PADDING * needle.width
+        top, left = max(0, last_hit[0] - pad_y), max(0, last_hit[1] - pad_x)
+        bottom = min(H, last_hit[0] + needle.height + pad_y)
+        right = min(W, last_hit[1] + needle.width + pad_x)
+        result = _match_single(haystack[top:bottom, left:right], needle)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        best_val, best_loc = max_val, (max_loc[1] + top, max_loc[0] + left)
+
+    # Bandes, par nombre de résultats décroissant (de haut en bas à égalité)
+    if best_val < clear:
+        overlap = needle.height - 1
+        order = sorted(range(len(bounds)), key=lambda index: -strip_hits[index])
+        for index in order:
+            r0, r1 = bounds[index]
+            result = _match_single(haystack[r0:r1 + overlap], needle)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            if max_val > best_val:
+                best_val, best_loc = max_val, (max_loc[1] + r0, max_loc[0])
+            if best_val >= clear:
+                break
+
+    if best_loc is None or best_val < confidence:
+        return None, best_val
+
+    with _hit_history_lock:
+        for index, (r0, r1) in enumerate(bounds):
+            if r0 <= best_loc[0] < r1:
+                strip_hits[index] += 1
+        _hit_history[history_key] = (best_loc, strip_hits)
+
+    return (best_loc[1] + needle.width // 2, best_loc[0] + needle.height // 2), best_val
+
+
+def locate_all(haystack, image_path, confidence=None, cache=None):
+    """
+    Cherche toutes les correspondances d'une image de référence dans une image
+
+    :param haystack: Image BGR (numpy) dans laquelle chercher
+    :param image_path: Chemin vers l'image de référence
+    :param confidence: Niveau de confiance (0-1), None = seuil calibré de l'image (voir resolve_confidence)
+    :param cache: Instance de DetectionCache (par défaut, le cache global)
+    :return: Instance de Detections (centres relatifs à l'image et scores), itérable comme une liste de centres (x, y)
+    """
+    needle = load_template(image_path)
+    confidence = resolve_confidence(image_path, confidence)
+
+    def extract(band, first_row):
+        locations = np.argwhere(band >= confidence).astype(np.int32)
+        scores = band[locations[:, 0], locations[:, 1]].astype(np.float32)
+        locations[:, 0] += first_row
+        return (locations, scores), locations_size(locations) + scores.nbytes
+
+    bands = _band_results(haystack, needle, extract, ("all", confidence), cache)
+    if not bands:
+        return Detections()
+    locations = np.concatenate([band_locations for band_locations, _ in bands])
+    scores = np.concatenate([band_scores for _, band_scores in bands])
+    kept = _merge_locations(locations)
+    return Detections.from_locations(locations[kept], scores[kept], needle)
+
+
+def match_regions(haystack, centers, template, region_size):
+    """
+    Score de correspondance d'un template dans plusieurs petites régions, en un seul appel
+
+    Les régions sont extraites de l'image par indexation numpy (sans copie PIL ni
+    fichier temporaire), empilées verticalement puis comparées au template en un
+    seul appel de correspondance. Les positions qui chevauchent deux régions sont
+    ignorées.
+
+    :param haystack: Image BGR (numpy)
+    :param centers: Liste de centres (x, y) des régions, relatifs à l'image
+    :param template: Instance de Template
+    :param region_size: Taille (largeur, hauteur) des régions (agrandie si le template est plus grand)
+    :return: Tableau numpy du score maximal pour chaque région
+    """
+    if not len(centers):
+        return np.zeros(0, dtype=np.float32)
+
+    H, W = haystack.shape[:2]
+    region_w = max(region_size[0], template.width)
+    region_h = max(region_size[1], template.height)
+    if region_w > W or region_h > H:
+        return np.zeros(len(centers), dtype=np.float32)
+
+    centers = np.asarray(centers, dtype=np.int64).reshape(-1, 2)
+    lefts = np.clip(centers[:, 0] - region_w // 2, 0, W - region_w)
+    tops = np.clip(centers[:, 1] - region_h // 2, 0, H - region_h)
+
+    rows = tops[:, None] + np.arange(region_h)
+    cols = lefts[:, None] + np.arange(region_w)
+    regions = haystack[rows[:, :, None], cols[:, None, :]]
+    stacked = np.ascontiguousarray(regions.reshape((-1, region_w) + haystack.shape[2:]))
+
+    result = match_template_direct(stacked, template)
+
+    # Ramener la carte à une hauteur multiple de region_h, puis ne garder que les lignes
+    # dont la fenêtre du template tient entièrement dans une seule région
+    count = len(centers)
+    padded = np.full((count * region_h, result.shape[1]), -1.0, dtype=np.float32)
+    padded[:result.shape[0]] = result
+    per_region = padded.reshape(count, region_h, -1)[:, :region_h - template.height + 1]
+    return per_region.max(axis=(1, 2))
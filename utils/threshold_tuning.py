@@ -0,0 +1,189 @@
+"""
+Ajustement des seuils de confiance par image de référence
+
+Les seuils sont choisis à partir de captures rejouées et annotées: chaque capture
+(resources/screenshots/window_capture_*.png par défaut) peut être accompagnée
+d'un fichier d'annotations de même nom en .json, qui indique pour chaque image
+de référence les centres (x, y) de ses vraies occurrences:
+
+    {"accept_button.png": [[412, 318]], "registering_button.png": []}
+
+Une image absente des annotations d'une capture n'est pas évaluée sur cette
+capture. Pour chaque image de référence, les seuils sont balayés et celui qui
+maximise le score F1 (au milieu du plateau en cas d'égalité) est enregistré,
+avec le score attendu des vraies occurrences, dans config/template_thresholds.json.
+"""
+
+import os
+import glob
+import json
+import logging
+
+import numpy as np
+
+from utils.template_matching import load_template, match_template
+from utils.template_calibration import load_frames, DEFAULT_FRAMES
+from utils.config_utils import save_template_threshold
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Seuils balayés
+SWEEP_THRESHOLDS = np.round(np.arange(0.5, 1.0, 0.01), 2)
+
+# Distance maximale (en pixels) entre une détection et une occurrence annotée
+MATCH_DISTANCE = 10
+
+
+class ThresholdTuning:
+    """Résultat du balayage des seuils pour une image de référence"""
+
+    def __init__(self, template_name, threshold, precision, recall, f1, expected_score, frames_used):
+        self.template_name = template_name
+        self.threshold = threshold
+        self.precision = precision
+        self.recall = recall
+        self.f1 = f1
+        # Score médian des vraies occurrences détectées au seuil retenu
+        self.expected_score = expected_score
+        self.frames_used = frames_used
+
+    def describe(self):
+        return (
+            f"{self.template_name}: seuil {self.threshold:.2f}, F1 {self.f1:.3f} "
+            f"(précision {self.precision:.3f}, rappel {self.recall:.3f}), "
+            f"score attendu {self.expected_score:.3f}, {self.frames_used} captures"
+        )
+
+
+def load_labels(frame_path):
+    """
+    Charge les annotations d'une capture (fichier .json de même nom)
+
+    :return: Dictionnaire nom d'image -> liste de centres (x, y), vide si la capture n'est pas annotée
+    """
+    label_path = os.path.splitext(frame_path)[0] + ".json"
+    if not os.path.exists(label_path):
+        return {}
+    try:
+        with open(label_path, "r") as f:
+            return {name: [tuple(center) for center in centers] for name, centers in json.load(f).items()}
+    except Exception as e:
+        logger.error(f"Erreur lors du chargement des annotations {label_path}: {str(e)}")
+        return {}
+
+
+def _scored_peaks(result, template, min_score):
+    """
+    Détections au-dessus de min_score, fusionnées par score décroissant
+
+    :return: Liste de tuples (score, centre (x, y))
+    """
+    locations = np.argwhere(result >= min_score)
+    scores = result[locations[:, 0], locations[:, 1]]
+    peaks = []
+    for index in np.argsort(-scores, kind="stable"):
+        row, col = locations[index]
+        center = (int(col) + template.width // 2, int(row) + template.height // 2)
+        if all((x - center[0]) ** 2 + (y - center[1]) ** 2 >= MATCH_DISTANCE ** 2 for _, (x, y) in peaks):
+            peaks.append((float(scores[index]), center))
+    return peaks
+
+
+def _count_matches(peaks, labels, threshold):
+    """
+    Compte vrais positifs, faux positifs et faux négatifs à un seuil donné
+
+    :return: Tuple (vrais positifs, faux positifs, faux négatifs, scores des vrais positifs)
+    """
+    unmatched = list(labels)
+    true_positives, false_positives, matched_scores = 0, 0, []
+    for score, (x, y) in peaks:
+        if score < threshold:
+            break
+        nearest = min(unmatched, key=lambda label: (label[0] - x) ** 2 + (label[1] - y) ** 2, default=None)
+        if nearest is not None and (nearest[0] - x) ** 2 + (nearest[1] - y) ** 2 <= MATCH_DISTANCE ** 2:
+            unmatched.remove(nearest)
+            true_positives += 1
+            matched_scores.append(score)
+        else:
+            false_positives += 1
+    return true_positives, false_positives, len(unmatched), matched_scores
+
+
+def tune_template(template_path, labelled_frames):
+    """
+    Balaye les seuils d'une image de référence sur les captures annotées
+
+    :param template_path: Chemin vers l'image de référence
+    :param labelled_frames: Liste de tuples (image BGR, annotations) (voir load_labels)
+    :return: Instance de ThresholdTuning, ou None si aucune capture n'annote cette image
+    """
+    template = load_template(template_path)
+    template_name = os.path.basename(template_path)
+
+    evaluated = []
+    for frame, labels in labelled_frames:
+        if template_name not in labels:
+            continue
+        if frame.shape[0] < template.height or frame.shape[1] < template.width:
+            continue
+        peaks = _scored_peaks(match_template(frame, template), template, SWEEP_THRESHOLDS[0])
+        evaluated.append((peaks, labels[template_name]))
+    if not evaluated:
+        return None
+
+    sweep = []
+    for threshold in SWEEP_THRESHOLDS:
+        true_positives = false_positives = false_negatives = 0
+        matched_scores = []
+        for peaks, labels in evaluated:
+            tp, fp, fn, scores = _count_matches(peaks, labels, threshold)
+            true_positives += tp
+            false_positives += fp
+            false_negatives += fn
+            matched_scores.extend(scores)
+        precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 1.0
+        recall = true_positives / (true_positives + false_negatives) if true_positives + false_negatives else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        sweep.append((f1, float(threshold), precision, recall, matched_scores))
+
+    # Meilleur F1; en cas d'égalité, le seuil au milieu du plateau est le plus robuste
+    best_f1 = max(item[0] for item in sweep)
+    plateau = [item for item in sweep if item[0] >= best_f1 - 1e-9]
+    f1, threshold, precision, recall, matched_scores = plateau[len(plateau) // 2]
+    expected_score = float(np.median(matched_scores)) if matched_scores else 0.0
+
+    return ThresholdTuning(template_name, threshold, precision, recall, f1, expected_score, len(evaluated))
+
+
+def tune_thresholds(frames_pattern=DEFAULT_FRAMES, images_dir="resources/images", save=True):
+    """
+    Ajuste les seuils de toutes les images de référence sur les captures annotées
+
+    :param frames_pattern: Motif glob des captures
+    :param images_dir: Dossier des images de référence
+    :param save: Si True, enregistre les seuils retenus dans la configuration
+    :return: Liste d'instances de ThresholdTuning
+    """
+    labelled_frames = []
+    for frame_path, frame in load_frames(frames_pattern):
+        labels = load_labels(frame_path)
+        if labels:
+            labelled_frames.append((frame, labels))
+    if not labelled_frames:
+        logger.warning(f"Aucune capture annotée trouvée ({frames_pattern})")
+        return []
+
+    results = []
+    for template_path in sorted(glob.glob(os.path.join(images_dir, "*.png"))):
+        result = tune_template(template_path, labelled_frames)
+        if result is None:
+            continue
+        results.append(result)
+        if save:
+            save_template_threshold(result.template_name, {
+                "threshold": result.threshold,
+                "expected_score": round(result.expected_score, 3),
+                "f1": round(result.f1, 3),
+            })
+    return results
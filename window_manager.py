@@ -5,28 +5,95 @@ Permet de surveiller et d'interagir avec une fenêtre spécifique, même en arri
 
 import logging
 import time
-import pyautogui
 import os
-from PIL import Image, ImageGrab
 
-try:
-    import pygetwindow as gw
-except ImportError:
-    raise ImportError("Le module pygetwindow est requis. Installez-le avec: pip install pygetwindow")
+from input_dispatcher import get_input_dispatcher
+from backends import get_backend
+from utils.frame_archive import get_frame_archive
 
 logger = logging.getLogger("coinpoker_hopper")
 
+# Mots-clés probables dans le titre d'une fenêtre CoinPoker
+WINDOW_TITLE_KEYWORDS = ("CoinPoker", "Coin Poker", "Poker")
+
+# Délai (en secondes) laissé à une fenêtre qui vient d'être mise au premier plan avant d'y cliquer
+FOCUS_SETTLE_DELAY = 0.5
+
+
+def window_handle(window):
+    """Identifiant système d'une fenêtre (None si la plateforme n'en fournit pas)"""
+    return getattr(window, "_hWnd", None)
+
+
+def list_coinpoker_windows():
+    """
+    Énumère toutes les fenêtres dont le titre contient un mot-clé CoinPoker
+
+    :return: Liste de fenêtres pygetwindow, dans l'ordre d'énumération du système
+    """
+    keywords = [keyword.lower() for keyword in WINDOW_TITLE_KEYWORDS]
+    return [
+        window for window in get_backend().list_windows()
+        if window.title and any(keyword in window.title.lower() for keyword in keywords)
+    ]
+
+
 class WindowManager:
-    def __init__(self):
+    def __init__(self, window=None):
+        """
+        Gestionnaire d'une fenêtre CoinPoker
+
+        :param window: Fenêtre pygetwindow à laquelle lier le gestionnaire (voir window_registry);
+                       None = première fenêtre CoinPoker trouvée
+        """
         # Stocke le titre de la fenêtre CoinPoker une fois trouvée
         self.coinpoker_window_title = None
         # Stocke les coordonnées et dimensions de la fenêtre
         self.window_rect = None
         # Stocke une référence à la fenêtre
         self.window = None
+        # Identifiant de la fenêtre liée: plusieurs clients peuvent avoir le même titre
+        self.window_handle = None
         # Dossier pour enregistrer les captures d'écran
         self.screenshots_dir = "resources/screenshots"
         os.makedirs(self.screenshots_dir, exist_ok=True)
+        # Producteur de captures continues (voir utils.image_utils.attach_frame_grabber)
+        self.frame_grabber = None
+        # Cache des résultats de détection propre à la fenêtre (None = cache global)
+        self.detection_cache = None
+        # Instant (time.perf_counter) de la dernière mise au premier plan effective
+        self.activated_at = None
+        # Événement d'arrêt de la surveillance de la fenêtre: interrompt le délai d'affichage après la mise au premier plan
+        self.stop_event = None
+        # Tournoi et cycle de surveillance associés aux captures archivées (voir utils.frame_archive)
+        self.archive_tournament = None
+        self.archive_cycle = None
+        
+        if window is not None:
+            self.coinpoker_window_title = window.title
+            self.window = window
+            self.window_handle = window_handle(window)
+            self.update_window_position()
+    
+    @property
+    def window_key(self):
+        """Clé identifiant la fenêtre liée (identifiant système, sinon titre)"""
+        return self.window_handle if self.window_handle is not None else self.coinpoker_window_title
+    
+    def _find_bound_window(self):
+        """
+        Retrouve la fenêtre liée à partir de son identifiant
+        
+        :return: True si la fenêtre est toujours ouverte, False sinon
+        """
+        for window in get_backend().list_windows():
+            if window_handle(window) == self.window_handle:
+                self.window = window
+                self.coinpoker_window_title = window.title
+                self.update_window_position()
+                return True
+        logger.warning(f"Fenêtre CoinPoker '{self.coinpoker_window_title}' introuvable (fermée ?)")
+        return False
         
     def find_coinpoker_window(self):
         """
@@ -35,22 +102,18 @@ class WindowManager:
         :return: True si la fenêtre est trouvée, False sinon
         """
         try:
-            # Chercher la fenêtre par des mots-clés probables dans le titre
-            possible_titles = ["CoinPoker", "Coin Poker", "Poker"]
-            all_windows = gw.getAllTitles()
+            # Gestionnaire lié à une fenêtre précise (plusieurs clients ouverts)
+            if self.window_handle is not None:
+                return self._find_bound_window()
             
-            for title in all_windows:
-                for keyword in possible_titles:
-                    if keyword.lower() in title.lower():
-                        self.coinpoker_window_title = title
-                        
-                        # Obtenir l'objet fenêtre et ses coordonnées
-                        windows = gw.getWindowsWithTitle(title)
-                        if windows:
-                            self.window = windows[0]
-                            self.update_window_position()
-                            logger.info(f"Fenêtre CoinPoker trouvée: '{title}' à {self.window_rect}")
-                            return True
+            # Chercher la fenêtre par des mots-clés probables dans le titre
+            windows = list_coinpoker_windows()
+            if windows:
+                self.window = windows[0]
+                self.coinpoker_window_title = self.window.title
+                self.update_window_position()
+                logger.info(f"Fenêtre CoinPoker trouvée: '{self.coinpoker_window_title}' à {self.window_rect}")
+                return True
             
             logger.warning("Fenêtre CoinPoker non trouvée dans la liste des fenêtres")
             return False
@@ -74,11 +137,12 @@ class WindowManager:
                 return False
         return False
     
-    def capture_window_area(self):
+    def capture_window_area(self, save_screenshot=True):
         """
         Capture la zone de l'écran où se trouve la fenêtre CoinPoker,
         même si elle n'est pas au premier plan
         
+        :param save_screenshot: Si True, ajoute la capture à l'archive des captures (voir utils.frame_archive)
         :return: L'image capturée ou None en cas d'échec
         """
         if not self.window_rect:
@@ -90,23 +154,50 @@ class WindowManager:
             self.update_window_position()
             
             # Capturer la région de l'écran correspondant à la fenêtre
-            screenshot = ImageGrab.grab(bbox=self.window_rect)
-            
-            # Enregistrer la capture pour le débogage
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            screenshot_path = f"{self.screenshots_dir}/window_capture_{timestamp}.png"
-            screenshot.save(screenshot_path)
+            screenshot = get_backend().grab(self.window_rect)
             
-            logger.debug(f"Capture de la zone de la fenêtre enregistrée: {screenshot_path}")
+            # Archiver la capture pour le débogage (compression et écriture en arrière-plan)
+            if save_screenshot:
+                archive = get_frame_archive()
+                if archive is not None:
+                    archive.add(screenshot, self.archive_tournament, self.archive_cycle)
             return screenshot
         except Exception as e:
             logger.error(f"Erreur lors de la capture de la fenêtre: {str(e)}")
             return None
     
-    def focus_coinpoker_window(self):
+    def focus_coinpoker_window(self, priority=None):
         """
         Met la fenêtre CoinPoker au premier plan
         
+        La demande passe par le dispatcher d'entrées, qui sérialise les changements
+        de focus avec les clics et fusionne les demandes redondantes. Le délai laissé
+        à la fenêtre pour s'afficher est attendu ici, dans le thread appelant: le
+        thread du dispatcher reste disponible pour les actions des autres hoppers. Ce délai
+        est écourté par l'arrêt de la surveillance (voir stop_event).
+        
+        :param priority: Priorité de la demande (par défaut, priorité de navigation)
+        :return: True si réussi, False sinon
+        """
+        dispatcher = get_input_dispatcher()
+        if priority is None:
+            result = dispatcher.focus(self)
+        else:
+            result = dispatcher.focus(self, priority=priority)
+        
+        if result and self.activated_at is not None:
+            remaining = FOCUS_SETTLE_DELAY - (time.perf_counter() - self.activated_at)
+            if remaining > 0:
+                if self.stop_event is not None:
+                    self.stop_event.wait(remaining)
+                else:
+                    time.sleep(remaining)
+        return result
+    
+    def activate_window(self):
+        """
+        Met immédiatement la fenêtre CoinPoker au premier plan (exécuté par le dispatcher d'entrées)
+        
         :return: True si réussi, False sinon
         """
         # D'abord, vérifier que nous avons trouvé la fenêtre
@@ -114,15 +205,11 @@ class WindowManager:
             return False
         
         try:
-            # Si la fenêtre est minimisée, la restaurer
-            if self.window.isMinimized:
-                self.window.restore()
-            
-            # Mettre la fenêtre au premier plan
-            self.window.activate()
-            
-            # Attendre un peu pour s'assurer que la fenêtre est bien au premier plan
-            time.sleep(0.5)
+            # Restaurer la fenêtre si elle est minimisée et la mettre au premier plan (sauf si elle y est déjà);
+            # le délai d'affichage est attendu par l'appelant (voir focus_coinpoker_window)
+            if self.window.isMinimized or not self.is_coinpoker_window_focused():
+                get_backend().activate(self.window)
+                self.activated_at = time.perf_counter()
             
             # Mettre à jour les coordonnées
             self.update_window_position()
@@ -143,7 +230,9 @@ class WindowManager:
             if not self.window:
                 return False
                 
-            active_window = gw.getActiveWindow()
+            active_window = get_backend().active_window()
+            if active_window and self.window_handle is not None:
+                return window_handle(active_window) == self.window_handle
             return active_window and active_window.title == self.coinpoker_window_title
         except Exception as e:
             logger.error(f"Erreur lors de la vérification du focus de la fenêtre CoinPoker: {str(e)}")
@@ -174,15 +263,17 @@ class WindowManager:
                 return False
         
         try:
-            # Mettre la fenêtre au premier plan avant de cliquer
-            self.focus_coinpoker_window()
-            
-            # Calculer les coordonnées absolues
-            abs_x = self.window_rect[0] + x
-            abs_y = self.window_rect[1] + y
-            
-            # Effectuer le clic
-            pyautogui.click(abs_x, abs_y)
+            dispatcher = get_input_dispatcher()
+            with dispatcher.session():
+                # Mettre la fenêtre au premier plan avant de cliquer
+                self.focus_coinpoker_window()
+                
+                # Calculer les coordonnées absolues
+                abs_x = self.window_rect[0] + x
+                abs_y = self.window_rect[1] + y
+                
+                # Effectuer le clic
+                dispatcher.click(abs_x, abs_y)
             logger.info(f"Clic effectué à la position relative ({x}, {y}), absolue ({abs_x}, {abs_y})")
             return True
         except Exception as e:
@@ -0,0 +1,132 @@
+"""
+Registre des fenêtres CoinPoker ouvertes
+
+Plusieurs clients CoinPoker (un par compte) peuvent être ouverts côte à côte.
+Le registre suit chaque fenêtre cliente avec son propre WindowManager: position,
+capture continue et cache de détection sont propres à la fenêtre, et chaque
+inscription détectée est effectuée dans la fenêtre où le tournoi a été vu.
+Un seul processus surveille ainsi toutes les fenêtres.
+
+Les captures continues des fenêtres sont soit décalées (la première capture de
+chaque fenêtre est retardée d'une fraction de période), soit simultanées. Le
+décalage n'est appliqué qu'au démarrage: chaque fenêtre garde ensuite sa propre
+cadence, sans coordination ni exclusion entre les captures.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+from window_manager import WindowManager, list_coinpoker_windows, window_handle
+from utils.detection_cache import DetectionCache
+
+logger = logging.getLogger("coinpoker_hopper")
+
+# Ordonnancement des captures continues des fenêtres
+SCHEDULE_STAGGERED = "staggered"
+SCHEDULE_PARALLEL = "parallel"
+
+
+class WindowRegistry:
+    def __init__(self, schedule=SCHEDULE_STAGGERED):
+        """
+        Registre des fenêtres CoinPoker
+
+        :param schedule: Ordonnancement des captures continues (SCHEDULE_STAGGERED ou SCHEDULE_PARALLEL)
+        """
+        if schedule not in (SCHEDULE_STAGGERED, SCHEDULE_PARALLEL):
+            raise ValueError(f"Ordonnancement de capture inconnu: {schedule}")
+        self.schedule = schedule
+        self._managers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Met à jour le registre à partir des fenêtres ouvertes
+
+        Les fenêtres déjà suivies conservent leur WindowManager (capture continue,
+        cache); les fenêtres fermées sont retirées.
+
+        :return: Liste des WindowManager des fenêtres ouvertes
+        """
+        try:
+            windows = list_coinpoker_windows()
+        except Exception as e:
+            logger.error(f"Erreur lors de l'énumération des fenêtres CoinPoker: {str(e)}")
+            return self.managers()
+
+        with self._lock:
+            current = OrderedDict()
+            for window in windows:
+                key = window_handle(window)
+                if key is None:
+                    key = window.title
+                if key in current:
+                    continue
+                manager = self._managers.get(key)
+                if manager is None:
+                    manager = WindowManager(window)
+                    manager.detection_cache = DetectionCache()
+                    logger.info(f"Fenêtre CoinPoker ajoutée au registre: '{window.title}' à {manager.window_rect}")
+                current[key] = manager
+
+            for key, manager in self._managers.items():
+                if key not in current:
+                    logger.info(f"Fenêtre CoinPoker retirée du registre: '{manager.coinpoker_window_title}'")
+            self._managers = current
+            return list(current.values())
+
+    def managers(self):
+        """Retourne les WindowManager des fenêtres suivies"""
+        with self._lock:
+            return list(self._managers.values())
+
+    def get(self, key):
+        """Retourne le WindowManager d'une fenêtre (identifiant système ou titre), None si elle n'est pas suivie"""
+        with self._lock:
+            return self._managers.get(key)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._managers)
+
+    def capture_phase(self, window_manager, fps):
+        """
+        Décalage de la première capture continue d'une fenêtre
+
+        En mode décalé, la première capture de la fenêtre d'index i parmi N est
+        retardée de i/N période; en mode simultané, aucune n'est retardée. Ce
+        décalage initial n'est pas maintenu ensuite: une capture plus longue que
+        la période ou une fenêtre ajoutée plus tard peut recouvrir les autres.
+
+        :param window_manager: WindowManager d'une fenêtre suivie
+        :param fps: Nombre de captures par seconde de chaque fenêtre
+        :return: Décalage en secondes
+        """
+        if fps <= 0 or self.schedule == SCHEDULE_PARALLEL:
+            return 0.0
+        managers = self.managers()
+        if window_manager not in managers:
+            return 0.0
+        return managers.index(window_manager) / (fps * len(managers))
+
+    def create_hoppers(self, tournament_name, hopper_class=None, capture_fps=0):
+        """
+        Crée un hopper par fenêtre suivie pour un tournoi
+
+        :param tournament_name: Nom du tournoi à surveiller
+        :param hopper_class: Classe de hopper (par défaut CoinPokerHopper)
+        :param capture_fps: Captures continues par seconde de chaque fenêtre (0 = capture à chaque cycle)
+        :return: Liste d'instances de hopper, une par fenêtre
+        """
+        if hopper_class is None:
+            from hopper import CoinPokerHopper
+            hopper_class = CoinPokerHopper
+
+        hoppers = []
+        for manager in self.refresh():
+            hopper = hopper_class(tournament_name, window_manager=manager)
+            hopper.capture_fps = capture_fps
+            hopper.capture_phase = self.capture_phase(manager, capture_fps)
+            hoppers.append(hopper)
+        return hoppers